@@ -10,7 +10,9 @@ const ViewRecord = () => {
   useEffect(() => {
     const fetchStudents = async () => {
       try {
-        const response = await AxiosInstance.get("admin/views-student/");
+        const response = await AxiosInstance.get(
+          "admin/views-student/?fields=id,name,username,class_grade"
+        );
         console.log("Fetched students:", response.data);
         setStudentList(response.data);
       } catch (error) {
@@ -90,7 +92,6 @@ const ViewRecord = () => {
                   <th className="py-3 px-6 text-left">Sr No.</th>
                   <th className="py-3 px-6 text-left">Name</th>
                   <th className="py-3 px-6 text-left">Username</th>
-                  <th className="py-3 px-6 text-left">Password</th>
                   <th className="py-3 px-6 text-left">Class</th>
                   <th className="py-3 px-6 text-center">Action</th>
                 </tr>
@@ -104,7 +105,6 @@ const ViewRecord = () => {
                     <td className="py-3 px-6">{index + 1}</td>
                     <td className="py-3 px-6">{s.name}</td>
                     <td className="py-3 px-6">{s.username}</td>
-                    <td className="py-3 px-6">{s.password}</td>
                     <td className="py-3 px-6">{s.class_grade}th</td>
                     <td className="py-3 px-6 text-center">
                       <button
@@ -0,0 +1,108 @@
+# app/async_db.py
+# Async counterparts of app/db.py for the ASGI read views (app/async_views.py).
+# The clients are bound to the event loop that created them, so each loop gets
+# its own. Under ASGI that is one set per process; under WSGI/runserver Django
+# runs every async view on a fresh loop, so the set of a loop is closed when the
+# loop shuts down (it cancels its leftover tasks, see _close_with_loop) instead of
+# leaving its sockets open.
+import asyncio
+import logging
+import time
+import weakref
+
+import redis.asyncio as aioredis
+from pymongo import AsyncMongoClient
+
+from . import metrics
+from .db import MONGO_URI, REDIS_HOST, REDIS_PORT, connections, event_listeners, mongo_client_options, get_setting
+
+logger = logging.getLogger(__name__)
+
+_loops = weakref.WeakKeyDictionary()  # event loop -> LoopConnections
+
+
+class TimedAsyncRedis(aioredis.Redis):
+    """ Async counterpart of db.TimedRedis (same metric names) """
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except aioredis.RedisError:
+            metrics.inc("redis_command_failures_total", command=str(args[0]).upper())
+            raise
+        finally:
+            metrics.observe("redis_command_duration_seconds", time.perf_counter() - start, command=str(args[0]).upper())
+
+
+class LoopConnections:
+    """ Async Mongo client and Redis pool of one event loop """
+
+    def __init__(self):
+        # The slow-query log is written from a background thread with the sync client
+        self.client = AsyncMongoClient(MONGO_URI, event_listeners=event_listeners(connections.database),
+                                       **mongo_client_options())
+        self.db = self.client["studentApp"]
+        self.redis = TimedAsyncRedis(
+            host=REDIS_HOST, port=REDIS_PORT, db=0,
+            max_connections=get_setting("REDIS_MAX_CONNECTIONS"),
+            socket_timeout=get_setting("REDIS_SOCKET_TIMEOUT"),
+        )
+        self.closer = None
+
+    async def aclose(self):
+        try:
+            await self.redis.aclose()
+        finally:
+            await self.client.close()
+
+
+async def _close_with_loop(loop, conns):
+    """ Waits until the loop cancels it on shutdown (asyncio.run, asgiref, uvicorn), then closes the clients """
+    try:
+        await asyncio.Event().wait()
+    finally:
+        _loops.pop(loop, None)
+        await conns.aclose()
+
+
+def loop_connections():
+    loop = asyncio.get_running_loop()
+    conns = _loops.get(loop)
+    if conns is None:  # Check if the connection already exists for this loop
+        for other in [other for other in _loops if other.is_closed()]:
+            _loops.pop(other, None)  # Closed without cancelling its tasks; nothing left to await on
+        conns = _loops[loop] = LoopConnections()
+        conns.closer = loop.create_task(_close_with_loop(loop, conns))  # Held here, the loop only keeps weak refs
+        logger.info("Async MongoDB client created")
+    return conns
+
+
+def connect_to_mongo_async():
+    return loop_connections().db
+
+
+def get_async_redis():
+    return loop_connections().redis
+
+
+def async_subscriber():
+    """ Async Redis client for pub/sub with a connection of its own; close it when done """
+    return aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0,
+                          socket_connect_timeout=get_setting("REDIS_SOCKET_TIMEOUT"))
+
+
+def get_students_collection_async():
+    return connect_to_mongo_async().students
+
+
+def get_assignments_collection_async():
+    return connect_to_mongo_async().assignments
+
+
+def get_schedules_collection_async():
+    return connect_to_mongo_async().schedules
+
+
+def get_videos_lectures_collection_async():
+    return connect_to_mongo_async().videos_lectures
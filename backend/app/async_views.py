@@ -0,0 +1,127 @@
+# app/async_views.py
+# Native async versions of the student read endpoints, for ASGI deployments
+# (backend/asgi.py). They return the same payloads as their sync counterparts in
+# app/views.py but await the Mongo/Redis I/O instead of blocking a thread, so one
+# worker can keep many slow mobile clients in flight.
+# Routed instead of the sync views when settings.ASYNC_STUDENT_READS is on.
+# DRF authentication doesn't run here, so bearer tokens are checked by async_authenticate.
+from bson import ObjectId
+from django.views import View
+
+from .authentication import async_authenticate, identity_param, request_claims
+from .async_db import (
+    get_students_collection_async, get_assignments_collection_async,
+    get_schedules_collection_async, get_videos_lectures_collection_async,
+)
+from .cache import async_read_through_cache
+from .lectures import student_lecture_tree_pipeline
+from .projection import InvalidFields
+from .renderers import MongoJsonResponse
+from .views import (
+    VALID_CLASS_GRADES, format_profile, profile_from_claims, format_assignment, format_schedule,
+    PROFILE_FIELDS, ASSIGNMENT_FIELDS, SCHEDULE_FIELDS,
+)
+
+
+class AsyncStudentProfileView(View):
+    @async_authenticate
+    @async_read_through_cache("student-profile", "students", params=("fields",), class_param="student_id")
+    async def get(self, request):
+        student_id = identity_param(request, "student_id")
+
+        if not student_id:
+            return MongoJsonResponse({"error": "Student ID is required"}, status=400)
+
+        if not ObjectId.is_valid(student_id):
+            return MongoJsonResponse({"error": "Invalid Student ID format"}, status=400)
+
+        try:
+            projection, format_doc = PROFILE_FIELDS.resolve(request.GET, format_profile)
+        except InvalidFields as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
+
+        claims = request_claims(request)
+        if claims is not None:
+            return MongoJsonResponse(format_doc(profile_from_claims(claims)), status=200)
+
+        student = await get_students_collection_async().find_one({"_id": ObjectId(student_id)}, projection)
+
+        if student:
+            return MongoJsonResponse(format_doc(student), status=200)
+
+        return MongoJsonResponse({"error": "Student not found"}, status=404)
+
+
+class AsyncStudentListAssignmentsView(View):
+    @async_authenticate
+    @async_read_through_cache("student-assignments", "assignments", params=("fields",), required=("student_id",))
+    async def get(self, request):
+        student_id = identity_param(request, "student_id")
+        class_grade = identity_param(request, "class_grade")
+
+        if not student_id or not class_grade:
+            return MongoJsonResponse({"error": "Student ID and class_grade are required."}, status=400)
+
+        if class_grade not in VALID_CLASS_GRADES:
+            return MongoJsonResponse({"error": "Invalid class_grade format."}, status=400)
+
+        try:
+            projection, format_doc = ASSIGNMENT_FIELDS.resolve(request.GET, format_assignment)
+        except InvalidFields as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
+
+        cursor = get_assignments_collection_async().find({"class_grade": class_grade}, projection)
+        assignment_list = [format_doc(assignment) async for assignment in cursor]
+
+        return MongoJsonResponse(assignment_list, safe=False, status=200)
+
+
+class AsyncStudentScheduleView(View):
+    @async_authenticate
+    @async_read_through_cache("student-schedule", "schedules", params=("fields",))
+    async def get(self, request):
+        class_grade = identity_param(request, "class_grade")
+
+        if not class_grade:
+            return MongoJsonResponse({"error": "Class grade is required."}, status=400)
+
+        try:
+            projection, format_doc = SCHEDULE_FIELDS.resolve(request.GET, format_schedule)
+        except InvalidFields as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
+
+        try:
+            cursor = get_schedules_collection_async().find({"class_grade": class_grade}, projection).sort(
+                [("start_minute", 1), ("_id", 1)]
+            )
+            schedule_list = [format_doc(schedule) async for schedule in cursor]
+            return MongoJsonResponse(schedule_list, safe=False, status=200)
+        except Exception as e:
+            return MongoJsonResponse({"error": "Failed to fetch schedule.", "details": str(e)}, status=500)
+
+
+class AsyncStudentListVideosLecturesView(View):
+    @async_authenticate
+    @async_read_through_cache("student-lectures", "videos_lectures", params=("subject",))
+    async def get(self, request):
+        subject = request.GET.get("subject")
+        class_grade = identity_param(request, "class_grade")
+
+        if not class_grade:
+            return MongoJsonResponse({"error": "class_grade is required"}, status=400)
+
+        # Admin side uses "class" instead of "class_grade"
+        query = {"class": class_grade}
+        if subject:
+            query["subject"] = subject
+
+        try:
+            cursor = await get_videos_lectures_collection_async().aggregate(student_lecture_tree_pipeline(query), allowDiskUse=True)
+            trees = await cursor.to_list(length=1)
+        except Exception as e:
+            return MongoJsonResponse({"error": f"Error fetching data: {str(e)}"}, status=500)
+
+        if not trees:
+            return MongoJsonResponse({"message": "No lectures found.", "data": {}}, status=200)
+
+        return MongoJsonResponse({"message": "Lectures fetched successfully", "data": trees[0]}, status=200)
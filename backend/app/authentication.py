@@ -0,0 +1,157 @@
+# app/authentication.py
+# Stateless JWT sessions for students and admins.
+#
+# Login issues an access/refresh pair whose claims carry the identity the views
+# need (student_id, username, class_grade, name), so authenticated requests are
+# resolved from the token alone, with no Mongo lookup. Deleting a student writes a
+# Redis revocation marker that outlives every token issued to them.
+import functools
+import logging
+
+import redis
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .db import get_redis
+from .async_db import get_async_redis
+from .renderers import MongoJsonResponse
+
+logger = logging.getLogger(__name__)
+
+STUDENT = "student"
+ADMIN = "admin"
+# Claims a student token can stand in for, instead of the old query params
+STUDENT_CLAIMS = ("student_id", "class_grade")
+
+
+def issue_tokens(role, subject_id, **claims):
+    """ {"access": ..., "refresh": ...} for one student/admin, `claims` copied into both tokens """
+    refresh = RefreshToken()
+    refresh[api_settings.USER_ID_CLAIM] = str(subject_id)
+    refresh["role"] = role
+    for name, value in claims.items():
+        refresh[name] = value
+    return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
+def revocation_key(role, subject_id):
+    return f"revoked:{role}:{subject_id}"
+
+
+def jti_revocation_key(jti):
+    return f"revoked:jti:{jti}"
+
+
+def revoke(role, subject_id):
+    """ Reject every token issued so far to `subject_id` (kept as long as a refresh token lives) """
+    ttl = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    try:
+        get_redis().setex(revocation_key(role, subject_id), ttl, 1)
+    except redis.RedisError as e:
+        logger.error("Failed to revoke tokens for %s %s: %s", role, subject_id, e)
+
+
+def revoke_jti(token):
+    """ Reject one token (a rotated refresh token) until it would have expired anyway """
+    ttl = max(1, int(token["exp"] - token.current_time.timestamp()))
+    try:
+        get_redis().setex(jti_revocation_key(token[api_settings.JTI_CLAIM]), ttl, 1)
+    except redis.RedisError as e:
+        logger.warning("Failed to retire refresh token: %s", e)
+
+
+def is_revoked(token):
+    """ Revocation check; fails open when Redis is down, like the read cache """
+    keys = [revocation_key(token.get("role"), token.get(api_settings.USER_ID_CLAIM))]
+    if token.get(api_settings.TOKEN_TYPE_CLAIM) == "refresh":
+        keys.append(jti_revocation_key(token.get(api_settings.JTI_CLAIM)))
+    try:
+        return any(get_redis().mget(keys))
+    except redis.RedisError as e:
+        logger.warning("Token revocation check unavailable: %s", e)
+        return False
+
+
+class ClaimsUser(TokenUser):
+    """ request.user for token requests, built from the claims only """
+
+    @property
+    def role(self):
+        return self.token.get("role")
+
+    @property
+    def is_student(self):
+        return self.role == STUDENT
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """ Bearer access tokens from issue_tokens(); no database lookup, one Redis GET for revocation """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return ClaimsUser(validated_token)
+
+
+def async_authenticate(get):
+    """
+    Decorator for the async student views: sets request.student_claims from a bearer
+    token (None without one) and answers 401 for bad or revoked tokens.
+    """
+    @functools.wraps(get)
+    async def wrapper(view, request, *args, **kwargs):
+        try:
+            request.student_claims = await async_claims(request)
+        except InvalidToken as e:
+            return MongoJsonResponse(e.detail, status=401)  # Same body as DRF gives the sync views
+        return await get(view, request, *args, **kwargs)
+    return wrapper
+
+
+async def async_claims(request):
+    """
+    Claims of a student bearer token on a plain async Django view, None without one.
+    Raises InvalidToken for bad or revoked tokens.
+    """
+    header = request.headers.get("Authorization", "")
+    parts = header.split()
+    if len(parts) != 2 or parts[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        token = AccessToken(parts[1])
+    except TokenError as e:
+        raise InvalidToken(str(e))
+    try:
+        revoked = await get_async_redis().get(revocation_key(token.get("role"), token.get(api_settings.USER_ID_CLAIM)))
+    except redis.RedisError as e:
+        logger.warning("Token revocation check unavailable: %s", e)
+        revoked = None
+    if revoked:
+        raise InvalidToken("Token has been revoked")
+    return token.payload if token.get("role") == STUDENT else None
+
+
+def request_claims(request):
+    """ Student claims for a DRF request, or those set by the async views on a Django request """
+    if isinstance(request, Request):
+        user = request.user
+        if isinstance(user, ClaimsUser) and user.is_student:
+            return user.token
+        return None
+    return getattr(request, "student_claims", None)
+
+
+def identity_param(request, name):
+    """ student_id / class_grade from the token when there is one, else from the query string """
+    claims = request_claims(request)
+    if claims is not None and name in STUDENT_CLAIMS and claims.get(name):
+        return str(claims[name])
+    return request.GET.get(name)
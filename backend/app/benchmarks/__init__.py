@@ -0,0 +1,5 @@
+# app/benchmarks
+# Route benchmark suite: `python manage.py bench_routes --help`.
+#   datagen.py  deterministic scale data (1k / 10k / 100k / 1m submissions)
+#   routes.py   one request builder per URL name in app/urls.py
+#   runner.py   timing, allocation sampling, JSON results and baseline comparison
@@ -0,0 +1,76 @@
+# app/benchmarks/backends.py
+# Where the benchmark commands seed and query: a throwaway *_bench database on a
+# local mongod, or in-process mongomock, never the configured studentApp database.
+from django.core.management.base import CommandError
+from pymongo import MongoClient
+
+BENCH_SUFFIX = "_bench"
+
+
+def add_arguments(parser, redis=True):
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod",
+                        help="Local mongod (default) or in-process mongomock (small scales only).")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017",
+                        help="mongod to seed and query (default mongodb://localhost:27017).")
+    parser.add_argument("--database", default="studentApp_bench",
+                        help=f"Database to (re)create; must end with {BENCH_SUFFIX} (default studentApp_bench).")
+    if redis:
+        parser.add_argument("--fake-redis", action="store_true", help="Use fakeredis instead of the configured Redis.")
+
+
+def connect(options):
+    if not options["database"].endswith(BENCH_SUFFIX):
+        raise CommandError(f"Refusing to reseed a database whose name doesn't end with {BENCH_SUFFIX}")
+
+    if options["backend"] == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            raise CommandError("--backend mongomock needs `pip install -r requirements-dev.txt`")
+        patch_mongomock()
+        return mongomock.MongoClient()[options["database"]]
+
+    client = MongoClient(options["mongo_uri"], serverSelectionTimeoutMS=3000)
+    client.admin.command("ping")
+    return client[options["database"]]
+
+
+def patch_mongomock():
+    """
+    Fill in what the views use and mongomock 4.3 lacks: the sort= pymongo 4.9+
+    passes to the bulk builder for UpdateOne, and the $unionWith stage of the
+    lecture trees. Other gaps (e.g. $text) are skipped per spec in routes.py.
+    """
+    from mongomock import aggregate
+    from mongomock.collection import BulkOperationBuilder
+
+    if "$unionWith" not in aggregate._PIPELINE_HANDLERS:
+        def union_with(in_collection, database, options):
+            if isinstance(options, str):
+                options = {"coll": options}
+            return in_collection + list(database[options["coll"]].aggregate(options.get("pipeline", [])))
+
+        aggregate._PIPELINE_HANDLERS["$unionWith"] = union_with
+
+    add_update = BulkOperationBuilder.add_update
+    if getattr(add_update, "accepts_sort", False):
+        return
+
+    def add_update_with_sort(self, *args, sort=None, **kwargs):
+        if sort:
+            raise NotImplementedError("mongomock can't sort a bulk update")
+        return add_update(self, *args, **kwargs)
+
+    add_update_with_sort.accepts_sort = True
+    BulkOperationBuilder.add_update = add_update_with_sort
+
+
+def redis_client(options):
+    """ fakeredis for --fake-redis, None for the configured Redis """
+    if not options.get("fake_redis"):
+        return None
+    try:
+        import fakeredis
+    except ImportError:
+        raise CommandError("--fake-redis needs `pip install -r requirements-dev.txt`")
+    return fakeredis.FakeRedis()
@@ -0,0 +1,195 @@
+# app/benchmarks/datagen.py
+# Deterministic scale-data generator for the route benchmarks.
+# The same (scale, seed) always produces the same documents, ObjectIds included,
+# so runs against different commits are comparable.
+import datetime
+import random
+from dataclasses import dataclass, field
+
+from bson import ObjectId
+
+from ..rollups import rebuild as rebuild_rollups
+from ..timetable import normalize as normalize_slot
+
+# Scale factor = number of submissions; every other collection is sized from it
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+SUBJECTS = ("Accounts", "Economics", "Business Studies", "Mathematics", "English")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+PERIODS = (("09:00", "10:00"), ("10:00", "11:00"), ("11:15", "12:15"), ("12:15", "13:15"), ("14:00", "15:00"))
+STATUSES = ("Pending", "Pending", "Reviewed", "Accepted", "Rejected")
+VIDEOS_PER_CHAPTER = 6
+BASE_TIME = datetime.datetime(2025, 1, 6, 8, 0)
+COLLECTIONS = ("admins", "students", "assignments", "submissions", "submission_rollups", "schedules", "queries",
+               "videos_lectures", "lecture_videos")
+BENCH_ADMIN = {"email": "bench@example.com", "password": "bench"}
+
+
+@dataclass
+class Volumes:
+    students: int
+    assignments_per_class: int
+    submissions: int
+    queries: int
+    chapters_per_subject: int
+
+    @classmethod
+    def for_scale(cls, scale, class_count):
+        return cls(
+            students=max(class_count, scale // 4),
+            assignments_per_class=max(3, scale // 2000),
+            submissions=scale,
+            queries=max(class_count, scale // 20),
+            chapters_per_subject=max(2, scale // 25000),
+        )
+
+
+@dataclass
+class Fixture:
+    """ Sample values the route specs build their requests from """
+    scale: int
+    seed: int
+    class_grade: str
+    volumes: Volumes
+    student: dict = field(default_factory=dict)
+    subject: str = SUBJECTS[0]
+    chapter: str = ""
+    counts: dict = field(default_factory=dict)
+
+
+class Generator:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def object_id(self):
+        return ObjectId(self.rng.randbytes(12))
+
+    def moment(self, max_days=120):
+        return BASE_TIME + datetime.timedelta(seconds=self.rng.randrange(max_days * 86400))
+
+
+def _insert(collection, docs, chunk_size):
+    chunk, total = [], 0
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            collection.insert_many(chunk, ordered=False)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        collection.insert_many(chunk, ordered=False)
+        total += len(chunk)
+    return total
+
+
+def generate(db, class_grades, scale, seed=42, chunk_size=5000):
+    """ Drop and re-seed the benchmark collections in `db`, returns a Fixture """
+    gen = Generator(seed)
+    volumes = Volumes.for_scale(scale, len(class_grades))
+    class_grades = list(class_grades)
+    fixture = Fixture(scale=scale, seed=seed, class_grade=class_grades[len(class_grades) // 2], volumes=volumes)
+
+    for name in COLLECTIONS:
+        db[name].drop()
+    db.admins.insert_one(dict(BENCH_ADMIN))
+
+    students = [
+        {
+            "_id": gen.object_id(),
+            "name": f"Student {i}",
+            "username": f"student{i:07d}",
+            "password": f"pw{i}",
+            "class_grade": class_grades[i % len(class_grades)],
+            "created_at": gen.moment().isoformat(),
+        }
+        for i in range(volumes.students)
+    ]
+    fixture.student = next(s for s in students if s["class_grade"] == fixture.class_grade)
+    fixture.counts["students"] = _insert(db.students, students, chunk_size)
+
+    assignment_titles = {
+        grade: [f"{grade} assignment {n}" for n in range(volumes.assignments_per_class)] for grade in class_grades
+    }
+    fixture.counts["assignments"] = _insert(db.assignments, (
+        {
+            "_id": gen.object_id(),
+            "class_grade": grade,
+            "title": title,
+            "description": f"Work through exercise set {n} and submit a PDF.",
+            "due_date": (BASE_TIME + datetime.timedelta(days=7 * n)).strftime("%Y-%m-%d"),
+            "created_at": gen.moment().isoformat(),
+        }
+        for grade in class_grades for n, title in enumerate(assignment_titles[grade])
+    ), chunk_size)
+
+    def submissions():
+        for _ in range(volumes.submissions):
+            student = students[gen.rng.randrange(len(students))]
+            file_id = gen.rng.randbytes(16).hex()
+            yield {
+                "_id": gen.object_id(),
+                "student_name": student["name"],
+                "class_grade": student["class_grade"],
+                "assignment_title": gen.rng.choice(assignment_titles[student["class_grade"]]),
+                "due_date": "2025-03-31",
+                "filename": f"{student['username']}_{file_id[:6]}.pdf",
+                "content_type": "application/pdf",
+                "file_url": f"https://drive.google.com/file/d/{file_id}/view?usp=sharing",
+                "viewable_url": f"https://drive.google.com/file/d/{file_id}/view?usp=sharing",
+                "download_url": f"https://drive.google.com/uc?id={file_id}&export=download",
+                "submitted_at": gen.moment(),
+                "status": gen.rng.choice(STATUSES),
+            }
+    fixture.counts["submissions"] = _insert(db.submissions, submissions(), chunk_size)
+    fixture.counts["submission_rollups"] = rebuild_rollups(db)
+
+    fixture.counts["schedules"] = _insert(db.schedules, (
+        {
+            "_id": gen.object_id(),
+            "class_grade": grade,
+            "subject": SUBJECTS[(d + p) % len(SUBJECTS)],
+            **normalize_slot(day, start, end),
+        }
+        for grade in class_grades for d, day in enumerate(DAYS) for p, (start, end) in enumerate(PERIODS)
+    ), chunk_size)
+
+    fixture.counts["queries"] = _insert(db.queries, (
+        {
+            "_id": gen.object_id(),
+            "studentName": students[i % len(students)]["name"],
+            "class_grade": students[i % len(students)]["class_grade"],
+            "query": f"Doubt {i}: could you explain question {gen.rng.randrange(1, 40)} again?",
+            "created_at": gen.moment().isoformat(),
+        }
+        for i in range(volumes.queries)
+    ), chunk_size)
+
+    fixture.chapter = "Chapter 1"
+    chapters = [
+        {
+            "_id": gen.object_id(),
+            "class": grade,
+            "subject": subject,
+            "chapter": f"Chapter {c + 1}",
+            "created_at": gen.moment(),
+        }
+        for grade in class_grades for subject in SUBJECTS for c in range(volumes.chapters_per_subject)
+    ]
+    fixture.counts["videos_lectures"] = _insert(db.videos_lectures, chapters, chunk_size)
+    # Per-video layout (app/lecture_videos.py); _ids ascend within a chapter like ObjectId() does
+    fixture.counts["lecture_videos"] = _insert(db.lecture_videos, (
+        {
+            "_id": ObjectId(chapter["_id"].binary[:8] + v.to_bytes(4, "big")),
+            "chapter_id": chapter["_id"],
+            "class": chapter["class"],
+            "subject": chapter["subject"],
+            "chapter": chapter["chapter"],
+            "video_name": f"{chapter['subject']} {chapter['chapter'][len('Chapter '):]}.{v + 1}",
+            "video_url": f"https://youtu.be/{gen.rng.randbytes(8).hex()}",
+            "pdf_url": f"https://drive.google.com/file/d/{gen.rng.randbytes(8).hex()}/view" if v % 2 else "",
+            "description": f"Lecture {v + 1} of {chapter['chapter'].lower()}",
+        }
+        for chapter in chapters for v in range(VIDEOS_PER_CHAPTER)
+    ), chunk_size)
+
+    return fixture
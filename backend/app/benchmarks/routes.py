@@ -0,0 +1,302 @@
+# app/benchmarks/routes.py
+# One request builder per URL name in app/urls.py.
+# A builder gets the run context and the iteration number and returns the request
+# to time. Any setup it needs (e.g. a document for a delete route to remove) is
+# done inside the builder, before the timer starts.
+import datetime
+import io
+import json
+from collections import namedtuple
+from urllib.parse import quote
+
+from bson import ObjectId
+
+from .datagen import BENCH_ADMIN
+from ..lecture_videos import add_videos
+
+Call = namedtuple("Call", "method path query data multipart")
+Call.__new__.__defaults__ = (None, None, False)
+
+SPECS = {}
+MONGOMOCK_SKIPS = {}  # URL name -> why it can't run on --backend mongomock
+
+
+def route(name, mongomock_skip=None):
+    def register(builder):
+        SPECS[name] = builder
+        if mongomock_skip:
+            MONGOMOCK_SKIPS[name] = mongomock_skip
+        return builder
+    return register
+
+
+def _post(path, data):
+    return Call("post", path, data=data)
+
+
+# ---- admin ----
+
+@route("admin-login")
+def admin_login(ctx, i):
+    return _post("/api/admin/login/", BENCH_ADMIN)
+
+
+@route("create_student")
+def create_student(ctx, i):
+    return _post("/api/admin/create-student/", {
+        "name": f"Bench {i}", "username": f"bench-{ctx.run_id}-{i}", "password": "pw", "class_grade": ctx.fixture.class_grade,
+    })
+
+
+@route("bulk_import_students")
+def bulk_import_students(ctx, i):
+    rows = "\n".join(f"Bulk {n},bulk-{ctx.run_id}-{i}-{n},pw,{ctx.fixture.class_grade}" for n in range(100))
+    upload = io.BytesIO(("name,username,password,class_grade\n" + rows).encode())
+    upload.name = "students.csv"
+    return Call("post", "/api/admin/bulk-import-students/", data={"file": upload}, multipart=True)
+
+
+@route("views_student")
+def views_student(ctx, i):
+    return Call("get", "/api/admin/views-student/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("delete-student")
+def delete_student(ctx, i):
+    student_id = ctx.db.students.insert_one({"name": "Temp", "username": f"temp-{ctx.run_id}-{i}",
+                                             "password": "pw", "class_grade": ctx.fixture.class_grade}).inserted_id
+    return Call("delete", f"/api/admin/delete-student/{student_id}/")
+
+
+@route("create_assignment")
+def create_assignment(ctx, i):
+    return _post("/api/admin/create-assignment/", {
+        "class_grade": ctx.fixture.class_grade, "title": f"Bench {i}", "description": "Benchmark", "due_date": "2025-12-31",
+    })
+
+
+@route("delete_assignment")
+def delete_assignment(ctx, i):
+    assignment_id = ctx.db.assignments.insert_one({"class_grade": ctx.fixture.class_grade, "title": f"Temp {i}"}).inserted_id
+    return Call("delete", f"/api/admin/delete-assignment/{assignment_id}/")
+
+
+@route("list_assignment")
+def list_assignment(ctx, i):
+    return Call("get", "/api/admin/list-assignment/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("list_submissions")
+def list_submissions(ctx, i):
+    return Call("get", "/api/admin/list-submissions/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("update_submission_status")
+def update_submission_status(ctx, i):
+    # Alternate the status so every request really modifies the document
+    return Call("patch", f"/api/admin/update-submission-status/{ctx.submission_id}/",
+                data={"status": "Reviewed" if i % 2 else "Accepted"})
+
+
+@route("video-create")
+def video_create(ctx, i):
+    return _post("/api/admin/create-videos/", {
+        "class": ctx.fixture.class_grade, "subject": "Bench", "chapter": f"Bench {ctx.run_id}",
+        "videos": [{"video_name": f"Bench video {i}", "video_url": "https://youtu.be/bench"}],
+    })
+
+
+@route("video-delete")
+def video_delete(ctx, i):
+    name = f"Delete me {i}"
+    add_videos(ctx.db, ctx.fixture.class_grade, "Bench", "Deletes", [{"video_name": name, "video_url": "https://youtu.be/bench"}])
+    return Call("delete", "/api/admin/videos/delete/", data={
+        "class": ctx.fixture.class_grade, "subject": "Bench", "chapter": "Deletes", "video_name": name,
+    })
+
+
+@route("video-list")
+def video_list(ctx, i):
+    return Call("get", "/api/admin/list-videos/", {"class": ctx.fixture.class_grade})
+
+
+@route("chapter-delete")
+def chapter_delete(ctx, i):
+    chapter = f"Temp chapter {i}"
+    add_videos(ctx.db, ctx.fixture.class_grade, "Bench", chapter, [{"video_name": "Temp", "video_url": "https://youtu.be/bench"}])
+    return Call("delete", f"/api/admin/chapters/{quote(ctx.fixture.class_grade)}/Bench/{quote(chapter)}/")
+
+
+@route("list-subjects-by-class")
+def list_subjects_by_class(ctx, i):
+    return Call("get", "/api/admin/subjects/", {"class": ctx.fixture.class_grade})
+
+
+@route("delete_submission")
+def delete_submission(ctx, i):
+    submission_id = ctx.db.submissions.insert_one({"class_grade": ctx.fixture.class_grade, "status": "Pending"}).inserted_id
+    return Call("delete", f"/api/admin/delete-submission/{submission_id}/")
+
+
+@route("submission_analytics")
+def submission_analytics(ctx, i):
+    return Call("get", "/api/admin/submission-analytics/", {"class_grade": ctx.fixture.class_grade} if i % 2 else None)
+
+
+@route("submission_events")
+def submission_events(ctx, i):
+    # Replays the buffered events and closes instead of staying open for live ones
+    return Call("get", "/api/admin/submissions/events/",
+                {"class_grade": ctx.fixture.class_grade, "last_event_id": "0-0", "duration": "0"})
+
+
+@route("bulk_update_submission_status")
+def bulk_update_submission_status(ctx, i):
+    return Call("patch", "/api/admin/bulk-update-submission-status/", data={
+        "filter": {"class_grade": ctx.fixture.class_grade, "assignment_title": ctx.assignment_title},
+        "status": "Reviewed" if i % 2 else "Pending",
+    })
+
+
+@route("bulk_delete_submissions")
+def bulk_delete_submissions(ctx, i):
+    ids = ctx.db.submissions.insert_many([
+        {"class_grade": ctx.fixture.class_grade, "status": "Pending", "assignment_title": "Bulk delete"} for _ in range(50)
+    ]).inserted_ids
+    return Call("delete", "/api/admin/bulk-delete-submissions/", data={"ids": [str(_id) for _id in ids]})
+
+
+@route("create_schedule")
+def create_schedule(ctx, i):
+    # One-minute Sunday slots; a slot left by an earlier run is removed so it doesn't conflict
+    minute = i % (24 * 60 - 1)
+    ctx.db.schedules.delete_many({"class_grade": ctx.fixture.class_grade, "subject": "Bench",
+                                  "start_minute": 6 * 24 * 60 + minute})
+    return _post("/api/admin/create-schedule/", {
+        "class_grade": ctx.fixture.class_grade, "subject": "Bench", "day": "Sunday",
+        "start_time": f"{minute // 60:02d}:{minute % 60:02d}",
+        "end_time": f"{(minute + 1) // 60:02d}:{(minute + 1) % 60:02d}",
+    })
+
+
+@route("list_schedule")
+def list_schedule(ctx, i):
+    return Call("get", "/api/admin/list-schedule/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("delete_schedule")
+def delete_schedule(ctx, i):
+    schedule_id = ctx.db.schedules.insert_one({"class_grade": ctx.fixture.class_grade, "subject": "Temp"}).inserted_id
+    return Call("delete", f"/api/admin/delete-schedule/{schedule_id}/")
+
+
+@route("view_queries")
+def view_queries(ctx, i):
+    return Call("get", "/api/admin/view-queries/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("delete_query")
+def delete_query(ctx, i):
+    query_id = ctx.db.queries.insert_one({"class_grade": ctx.fixture.class_grade, "query": "Temp"}).inserted_id
+    return Call("delete", f"/api/admin/delete-query/{query_id}/")
+
+
+@route("search", mongomock_skip="mongomock doesn't implement $text")
+def search(ctx, i):
+    scope = "assignments" if i % 2 else "queries"
+    return Call("get", "/api/admin/search/", {"q": "explain question" if scope == "queries" else "exercise", "scope": scope,
+                                              "class_grade": ctx.fixture.class_grade, "limit": 20})
+
+
+@route("slow_queries")
+def slow_queries(ctx, i):
+    return Call("get", "/api/admin/slow-queries/")
+
+
+# ---- student ----
+
+@route("student_login")
+def student_login(ctx, i):
+    student = ctx.fixture.student
+    return _post("/api/student/login/", {"username": student["username"], "password": student["password"]})
+
+
+@route("token_refresh")
+def token_refresh(ctx, i):
+    return _post("/api/token/refresh/", {"refresh": ctx.next_refresh_token()})
+
+
+@route("student-profile")
+def student_profile(ctx, i):
+    return Call("get", "/api/student/profile/", {"student_id": str(ctx.fixture.student["_id"])})
+
+
+@route("student_dashboard")
+def student_dashboard(ctx, i):
+    return Call("get", "/api/student/dashboard/",
+                {"student_id": str(ctx.fixture.student["_id"]), "class_grade": ctx.fixture.class_grade, "date": "2025-02-03"})
+
+
+@route("list_assignments")
+def list_assignments(ctx, i):
+    return Call("get", "/api/student/list-assignments/",
+                {"student_id": str(ctx.fixture.student["_id"]), "class_grade": ctx.fixture.class_grade})
+
+
+@route("submit_assignment")
+def submit_assignment(ctx, i):
+    upload = io.BytesIO(b"%PDF-1.4\n" + b"0" * 20_000)
+    upload.name = f"bench_{i}.pdf"
+    return Call("post", "/api/student/submit-assignment/", multipart=True, data={
+        "student_name": ctx.fixture.student["name"], "class_grade": ctx.fixture.class_grade,
+        "assignment_title": ctx.assignment_title, "due_date": "2025-12-31", "file": upload,
+    })
+
+
+@route("list_videos_lectures")
+def list_videos_lectures(ctx, i):
+    return Call("get", "/api/student/list-videos-lectures/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("student_schedule")
+def student_schedule(ctx, i):
+    return Call("get", "/api/student/schedule/", {"class_grade": ctx.fixture.class_grade})
+
+
+@route("student_schedule_now")
+def student_schedule_now(ctx, i):
+    # Walk through the week so both "in a class" and "between classes" are measured
+    at = datetime.datetime(2025, 2, 3, 9, 0) + datetime.timedelta(minutes=37 * i)
+    return Call("get", "/api/student/schedule/now/", {"class_grade": ctx.fixture.class_grade, "at": at.isoformat()})
+
+
+@route("upload_query")
+def upload_query(ctx, i):
+    return _post("/api/student/upload-query/", {
+        "studentName": ctx.fixture.student["name"], "class_grade": ctx.fixture.class_grade, "query": f"Benchmark doubt {i}",
+    })
+
+
+def send(client, call):
+    """ Issue a Call through the Django test client """
+    method = getattr(client, call.method)
+    if call.method == "get":
+        return method(call.path, call.query or {})
+    if call.multipart:
+        return method(call.path, call.data)
+    return method(call.path, json.dumps(call.data or {}), content_type="application/json")
+
+
+def read_body(response):
+    """ Response bytes; streamed bodies are consumed, so they are timed to the last byte """
+    return b"".join(response.streaming_content) if response.streaming else response.content
+
+
+def route_names(patterns):
+    """ URL names of every route in app/urls.py """
+    return [p.name for p in patterns if getattr(p, "name", None)]
+
+
+def sample_submission_id(db, class_grade):
+    doc = db.submissions.find_one({"class_grade": class_grade}, {"_id": 1})
+    return doc["_id"] if doc else ObjectId()
@@ -0,0 +1,119 @@
+# app/benchmarks/runner.py
+# Times every route through the full Django stack (middleware included) with the
+# test client, samples allocations with tracemalloc, and compares against a baseline.
+import collections
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+from .routes import SPECS, read_body, send, sample_submission_id
+from ..authentication import issue_tokens, STUDENT
+
+# Fields compared against the baseline (lower is better)
+COMPARED = ("p50_ms", "p95_ms", "p99_ms")
+
+
+class RunContext:
+    """ What the request builders in routes.py need: the seeded db, the fixture and per-run ids """
+
+    def __init__(self, db, fixture):
+        self.db = db
+        self.fixture = fixture
+        self.run_id = uuid.uuid4().hex[:8]  # keeps created usernames etc. unique across runs
+        self.submission_id = sample_submission_id(db, fixture.class_grade)
+        doc = db.assignments.find_one({"class_grade": fixture.class_grade}, {"title": 1})
+        self.assignment_title = doc["title"] if doc else "Bench"
+
+    def next_refresh_token(self):
+        # Refresh tokens rotate, so every iteration needs a fresh one
+        student = self.fixture.student
+        return issue_tokens(STUDENT, student["_id"], student_id=str(student["_id"]), username=student["username"],
+                            class_grade=student["class_grade"], name=student["name"])["refresh"]
+
+
+def percentiles(samples):
+    """ p50/p95/p99/mean/max in milliseconds """
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) == 1:
+        ms = ms * 2
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def measure(client, ctx, name, iterations, warmup, alloc_samples):
+    builder = SPECS[name]
+    statuses = collections.Counter()
+    timings = []
+    size = 0
+    call = None
+
+    for i in range(warmup + iterations):
+        call = builder(ctx, i)
+        start = time.perf_counter()
+        response = send(client, call)
+        body = read_body(response)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+            statuses[response.status_code] += 1
+            size = len(body)
+
+    # Allocations are sampled separately: tracemalloc slows every allocation down
+    peaks, blocks = [], []
+    for i in range(alloc_samples):
+        call = builder(ctx, warmup + iterations + i)
+        before = sys.getallocatedblocks()
+        tracemalloc.start()
+        read_body(send(client, call))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        blocks.append(sys.getallocatedblocks() - before)
+
+    result = {
+        "method": call.method.upper(),
+        "path": call.path,
+        "iterations": iterations,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "response_bytes": size,
+        **percentiles(timings),
+    }
+    if alloc_samples:
+        result["alloc_peak_kib"] = round(statistics.median(peaks) / 1024, 1)
+        result["alloc_net_blocks"] = int(statistics.median(blocks))
+    return result
+
+
+def run(client, ctx, names, iterations, warmup, alloc_samples, progress=None):
+    results = {}
+    for name in names:
+        results[name] = measure(client, ctx, name, iterations, warmup, alloc_samples)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Rows of (route, metric, baseline, current, change) and the subset that regressed """
+    rows, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        for metric in COMPARED:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            if change > threshold:
+                regressions.append(row)
+    return rows, regressions
@@ -0,0 +1,116 @@
+# app/bulk_import.py
+# Bulk student import (admin endpoint + `manage.py import_students`).
+# Rows are parsed one at a time from CSV or JSONL and written in chunks with
+# insert_many(ordered=False); duplicate usernames are rejected by the unique
+# students.username index (app/indexes.py) instead of a find_one per student.
+# The index is built by `manage.py ensure_indexes` at deploy, not per import.
+import csv
+import datetime
+import io
+import json
+
+from pymongo.errors import BulkWriteError
+
+from .db import get_students_collection
+
+REQUIRED_FIELDS = ("name", "username", "password", "class_grade")
+FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+
+def detect_format(filename, explicit=None):
+    """ "csv" or "jsonl" from an explicit value or the file extension, None if unknown """
+    if explicit:
+        return explicit.lower() if explicit.lower() in FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row_number, record, error) for every row of a binary stream.
+    Row numbers are 1-based data rows (the CSV header is not counted).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            yield row_number, record, None
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def build_student(record, valid_class_grades):
+    """ Same rules as CreateStudentView, returns (student, error) """
+    values = {field: str(record.get(field) or "").strip() for field in REQUIRED_FIELDS}
+    values["password"] = str(record.get("password") or "")  # Passwords are kept verbatim
+    missing = [field for field in REQUIRED_FIELDS if not values[field]]
+    if missing:
+        return None, "Missing fields: " + ", ".join(missing)
+    if values["class_grade"] not in valid_class_grades:
+        return None, "Invalid class_grade. Must be one of: " + ", ".join(valid_class_grades)
+
+    values["created_at"] = datetime.datetime.now().isoformat()
+    return values, None
+
+
+def _insert_chunk(students, chunk, report):
+    """ insert_many one chunk of (row_number, student) and record the outcome per row """
+    failed = {}
+    try:
+        students.insert_many([student for _, student in chunk], ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error
+
+    for index, (row_number, student) in enumerate(chunk):
+        error = failed.get(index)
+        if error is None:
+            report["inserted"].append({"row": row_number, "username": student["username"], "id": str(student["_id"])})
+        elif error.get("code") == DUPLICATE_KEY:
+            report["duplicates"].append({"row": row_number, "username": student["username"]})
+        else:
+            report["invalid"].append({"row": row_number, "error": error.get("errmsg", "Write error")})
+
+
+def import_students(rows, valid_class_grades, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Validate and insert rows from iter_rows(), returns the per-row report """
+    students = get_students_collection()
+
+    report = {"inserted": [], "duplicates": [], "invalid": []}
+    chunk = []
+    for row_number, record, error in rows:
+        student = None
+        if error is None:
+            student, error = build_student(record, valid_class_grades)
+        if error:
+            report["invalid"].append({"row": row_number, "error": error})
+            continue
+
+        chunk.append((row_number, student))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(students, chunk, report)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(students, chunk, report)
+
+    report["summary"] = {key: len(report[key]) for key in ("inserted", "duplicates", "invalid")}
+    return report
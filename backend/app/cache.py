@@ -0,0 +1,228 @@
+# app/cache.py
+# Read-through Redis cache for the hot student read endpoints.
+#
+# Every cached entry embeds the current version of (collection, class) in its key.
+# Write views call bump_version() after changing a class's data, so readers start
+# using a fresh key straight away and the old entries simply expire (no SCAN/DEL).
+# The same key doubles as a strong ETag, so clients revalidating with If-None-Match
+# get a 304 after two Redis GETs, without touching Mongo or serializing anything.
+# Compressed variants of a cached body are stored next to it by
+# app/compression.py and served directly on later hits.
+import functools
+import hashlib
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+from .db import get_redis, cache_data, get_cached_data
+from .async_db import get_async_redis
+from .authentication import identity_param
+from .compression import choose_encoding, variant_key, apply_encoding, strip_encoding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 300
+# Seeded counters expire so keys made up by readers (e.g. unknown student ids) don't
+# pile up; re-seeding just changes the ETags once
+VERSION_SEED_TTL = 7 * 24 * 3600
+
+
+def version_key(collection, class_grade):
+    return f"ver:{collection}:{class_grade}"
+
+
+def version_seed():
+    # Counters start from the clock rather than 0, so a Redis flush can't hand out
+    # a version (and ETag) that a client already holds for older data
+    return int(time.time() * 1000)
+
+
+def get_version(collection, class_grade):
+    """ Current version counter of one class's data in `collection` """
+    r = get_redis()
+    key = version_key(collection, class_grade)
+    version = r.get(key)
+    if version is None:
+        r.set(key, version_seed(), nx=True, ex=VERSION_SEED_TTL)
+        version = r.get(key)
+    return int(version)
+
+
+def bump_version(collection, class_grade):
+    """ Invalidate every cached read (and ETag) of `collection` for one class """
+    if not class_grade:
+        return
+    try:
+        r = get_redis()
+        key = version_key(collection, class_grade)
+        if r.incr(key) == 1:
+            r.set(key, version_seed())
+    except redis.RedisError as e:
+        logger.warning("Failed to bump cache version for %s/%s: %s", collection, class_grade, e)
+
+
+def cache_key(endpoint, class_grade, version, params):
+    """ Key for one endpoint + normalized query params, scoped to a data version """
+    normalized = json.dumps(sorted((k, v) for k, v in params.items() if v not in (None, "")))
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"cache:{endpoint}:{class_grade}:v{version}:{digest}"
+
+
+def etag_for(key):
+    """ Strong ETag for the response cached under `key` """
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def etag_matches(request, etag):
+    """
+    If-None-Match check (weak comparison, as RFC 9110 requires for GET).
+    Returns the client's matching tag (it may carry an encoding suffix), or None.
+    """
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return None
+    for tag in parse_etags(header):
+        tag = tag.removeprefix("W/")
+        if tag == "*":
+            return etag
+        if strip_encoding(tag) == etag:
+            return tag
+    return None
+
+
+def with_etag(response, etag):
+    response["ETag"] = etag
+    # Let clients keep the body but revalidate on every use
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def precompressed_response(data, encoding, etag):
+    """ 200 built from a stored compressed variant (the middleware leaves it alone) """
+    metrics.inc("response_precompressed_total", encoding=encoding)
+    response = with_etag(HttpResponse(content_type="application/json"), etag)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return apply_encoding(response, data, encoding)
+
+
+def read_through_cache(endpoint, collection, params=(), required=(), class_param="class_grade", ttl=None):
+    """
+    Decorator for an APIView `get` method.
+    Only the query params listed in `params` (plus the class, taken from the student's
+    token when there is one) are part of the key,
+    so e.g. every student of a class shares one entry regardless of student_id.
+    Params in `required` are not part of the key but must be present, otherwise the
+    view runs uncached and produces its usual validation error.
+    Only 200 responses are cached; Redis errors fall back to Mongo.
+    Responses carry an ETag, and a matching If-None-Match short-circuits to 304.
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            class_grade = identity_param(request, class_param)
+            if not class_grade or not all(identity_param(request, p) for p in required):
+                return get(view, request, *args, **kwargs)
+
+            try:
+                version = get_version(collection, class_grade)
+                key = cache_key(endpoint, class_grade, version,
+                                {p: request.query_params.get(p) for p in params})
+                etag = etag_for(key)
+                matched = etag_matches(request, etag)
+                if matched:
+                    return with_etag(HttpResponseNotModified(), matched)
+
+                # Compressed variants are JSON renders, skip them for e.g. the browsable API
+                is_json = request.accepted_renderer.format == "json"
+                encoding = choose_encoding(request.headers.get("Accept-Encoding")) if is_json else None
+                if encoding:
+                    data = get_redis().get(variant_key(key, encoding))
+                    if data is not None:
+                        return precompressed_response(data, encoding, etag)
+                cached = get_cached_data(key)
+            except redis.RedisError as e:
+                logger.warning("Cache unavailable for %s: %s", endpoint, e)
+                return get(view, request, *args, **kwargs)
+
+            if cached is not None:
+                response = with_etag(Response(cached, status=status.HTTP_200_OK), etag)
+                if is_json:
+                    response.precompress_key = key
+                return response
+
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK and hasattr(response, "data"):
+                try:
+                    expiry = ttl or getattr(settings, "READ_CACHE_TTL", DEFAULT_CACHE_TTL)
+                    cache_data(key, response.data, expiry)
+                    if is_json:
+                        response.precompress_key = key
+                except redis.RedisError as e:
+                    logger.warning("Failed to cache %s: %s", endpoint, e)
+                with_etag(response, etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def async_read_through_cache(endpoint, collection, params=(), required=(), class_param="class_grade", ttl=None):
+    """
+    Same as read_through_cache for the async views in app/async_views.py.
+    Entries are shared with the sync views (same keys, same JSON body).
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        async def wrapper(view, request, *args, **kwargs):
+            class_grade = identity_param(request, class_param)
+            if not class_grade or not all(identity_param(request, p) for p in required):
+                return await get(view, request, *args, **kwargs)
+
+            ar = get_async_redis()
+            try:
+                vkey = version_key(collection, class_grade)
+                version = await ar.get(vkey)
+                if version is None:
+                    await ar.set(vkey, version_seed(), nx=True, ex=VERSION_SEED_TTL)
+                    version = await ar.get(vkey)
+                key = cache_key(endpoint, class_grade, int(version), {p: request.GET.get(p) for p in params})
+                etag = etag_for(key)
+                matched = etag_matches(request, etag)
+                if matched:
+                    return with_etag(HttpResponseNotModified(), matched)
+
+                encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+                if encoding:
+                    data = await ar.get(variant_key(key, encoding))
+                    if data is not None:
+                        return precompressed_response(data, encoding, etag)
+                cached = await ar.get(key)
+            except redis.RedisError as e:
+                logger.warning("Cache unavailable for %s: %s", endpoint, e)
+                return await get(view, request, *args, **kwargs)
+
+            if cached is not None:
+                response = with_etag(HttpResponse(cached, content_type="application/json"), etag)
+                response.precompress_key = key
+                return response
+
+            response = await get(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                try:
+                    expiry = ttl or getattr(settings, "READ_CACHE_TTL", DEFAULT_CACHE_TTL)
+                    await ar.setex(key, expiry, response.content)
+                    response.precompress_key = key
+                except redis.RedisError as e:
+                    logger.warning("Failed to cache %s: %s", endpoint, e)
+                with_etag(response, etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+# app/compression.py
+# Content-negotiated gzip / brotli compression for API responses.
+#
+# Only bodies above settings.COMPRESSION_MIN_SIZE with a JSON/text content type are
+# compressed. Responses from the read-through cache (app/cache.py) are marked with
+# their cache key; their compressed bytes are stored next to the cached body so a
+# hot entry is compressed once and then served as-is.
+import gzip
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+from .db import get_redis
+
+logger = logging.getLogger(__name__)
+
+try:  # In requirements.txt; without it only gzip is served
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Cached variants are compressed once, so they can afford a slower, smaller setting
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+RATIO_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+
+metrics.describe("response_compression_ratio", "Compressed size / original size of API responses")
+metrics.describe("response_compression_cpu_seconds", "CPU time spent compressing API responses")
+metrics.describe("response_precompressed_total", "Responses served from a stored compressed variant")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """ Best of our encodings for an Accept-Encoding header (br wins ties), or None """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body, encoding, cached=False):
+    """ Compress `body` and record ratio / CPU time """
+    start = time.thread_time()
+    if encoding == "br":
+        data = brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    else:
+        data = gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+    metrics.observe("response_compression_cpu_seconds", time.thread_time() - start, encoding=encoding)
+    metrics.observe("response_compression_ratio", len(data) / len(body), buckets=RATIO_BUCKETS, encoding=encoding)
+    return data
+
+
+def variant_key(key, encoding):
+    return f"{key}:{encoding}"
+
+
+def encoded_etag(etag, encoding):
+    """ Compressed bodies are different representations, so they need their own strong ETag """
+    if etag and etag.endswith('"'):
+        return etag[:-1] + ENCODING_SUFFIXES[encoding] + '"'
+    return etag
+
+
+def strip_encoding(etag):
+    for suffix in ENCODING_SUFFIXES.values():
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def is_compressible(response):
+    content_type = response.get("Content-Type", "")
+    return any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+def apply_encoding(response, data, encoding):
+    response.content = data
+    response["Content-Encoding"] = encoding
+    response["Content-Length"] = str(len(data))
+    if response.has_header("ETag"):
+        response["ETag"] = encoded_etag(response["ETag"], encoding)
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses API responses for clients that accept it.
+    Streaming responses (?stream=1) are left alone so batches still flush as they're produced.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or not is_compressible(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if response.status_code != 200 or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < getattr(settings, "COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE):
+            return response
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        # Set by the read-through cache on a miss: keep the compressed bytes next to the body
+        cache_key = getattr(response, "precompress_key", None)
+        data = compress(response.content, encoding, cached=cache_key is not None)
+        if len(data) >= len(response.content):
+            return response
+
+        if cache_key is not None:
+            try:
+                ttl = getattr(settings, "READ_CACHE_TTL", 300)
+                get_redis().setex(variant_key(cache_key, encoding), ttl, data)
+            except redis.RedisError as e:
+                logger.warning("Failed to cache compressed response: %s", e)
+
+        return apply_encoding(response, data, encoding)
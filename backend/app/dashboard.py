@@ -0,0 +1,124 @@
+# app/dashboard.py
+# Sections of the student dashboard (GET /api/student/dashboard/), loaded in one request.
+#
+# Every section is cached on its own under the same versioned keys scheme as the
+# read-through cache (app/cache.py), so e.g. a new assignment only invalidates the
+# assignments section. Versions and cached bodies are read with one MGET each;
+# the sections that missed are then fetched from Mongo concurrently on a small
+# per-process thread pool.
+import contextvars
+import functools
+import logging
+import os
+import threading
+import zoneinfo
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import DEFAULT_CACHE_TTL, cache_key, etag_for, get_version, version_key
+from .db import get_redis
+from .renderers import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_SCHOOL_TIME_ZONE = "Asia/Kolkata"
+
+# collection: whose version invalidates the section; scope: "student" or "class"
+# (which id the version is kept for); fetch(ctx) -> JSON-serializable data
+Section = namedtuple("Section", "collection scope fetch")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def school_now():
+    """ The current time where the school is; TIME_ZONE stays UTC, which is the wrong day near midnight """
+    return timezone.localtime(timezone=zoneinfo.ZoneInfo(
+        getattr(settings, "SCHOOL_TIME_ZONE", DEFAULT_SCHOOL_TIME_ZONE)
+    ))
+
+
+def get_executor():
+    """ The dashboard thread pool of this process (recreated after a fork) """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DASHBOARD_WORKERS", DEFAULT_WORKERS), thread_name_prefix="dashboard"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def section_keys(sections, names, ctx, params):
+    """ {name: cache key} for the requested sections, reading all versions with one MGET """
+    scope_ids = {name: ctx[sections[name].scope] for name in names}
+    r = get_redis()
+    versions = r.mget([version_key(sections[name].collection, scope_ids[name]) for name in names])
+    keys = {}
+    for name, version in zip(names, versions):
+        if version is None:  # Never seen: seed it like the read-through cache does
+            version = get_version(sections[name].collection, scope_ids[name])
+        keys[name] = cache_key(f"dashboard-{name}", scope_ids[name], int(version), params)
+    return keys
+
+
+def _fetch(section, ctx, key):
+    """ Encoded section from Mongo, stored under `key` (same bytes as cache_data would write) """
+    body = dumps(section.fetch(ctx))
+    if key is not None:
+        try:
+            get_redis().setex(key, getattr(settings, "READ_CACHE_TTL", DEFAULT_CACHE_TTL), body)
+        except redis.RedisError as e:
+            logger.warning("Failed to cache dashboard section: %s", e)
+    return body
+
+
+def load_sections(sections, names, ctx, params):
+    """
+    Returns (data, errors, etag): data maps section name -> encoded JSON, errors name -> message.
+    A failing section is reported in `errors` instead of failing the whole dashboard.
+    etag is None when Redis is unavailable (nothing is cached then).
+    """
+    data, errors = {}, {}
+    try:
+        keys = section_keys(sections, names, ctx, params)
+        cached = dict(zip(names, get_redis().mget([keys[name] for name in names])))
+    except redis.RedisError as e:
+        logger.warning("Cache unavailable for the dashboard: %s", e)
+        keys, cached = {}, {}
+
+    missing = []
+    for name in names:
+        if cached.get(name) is not None:
+            data[name] = cached[name]  # Raw JSON bytes, spliced into the response as-is
+        else:
+            missing.append(name)
+
+    fetches = {name: functools.partial(_fetch, sections[name], ctx, keys.get(name)) for name in missing}
+    if len(fetches) > 1:  # A single miss runs inline, there is nothing to overlap it with
+        executor = get_executor()
+        # Copy the context so the slow-query log still knows which view issued the queries
+        fetches = {name: executor.submit(contextvars.copy_context().run, fetch).result for name, fetch in fetches.items()}
+    for name, result in fetches.items():
+        try:
+            data[name] = result()
+        except Exception as e:
+            logger.exception("Dashboard section %s failed: %s", name, e)
+            errors[name] = str(e)
+
+    etag = etag_for("|".join(keys[name] for name in names)) if keys else None
+    return data, errors, etag
+
+
+def render_dashboard(meta, data):
+    """ JSON object of the (non-empty) `meta` fields plus the already-encoded sections """
+    body = dumps(meta)
+    parts = [dumps(name) + b":" + encoded for name, encoded in data.items()]
+    return body[:-1] + b"".join(b"," + part for part in parts) + b"}"
@@ -1,37 +1,265 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 import redis
 import json
+import logging
+import os
+import threading
+import time
 
-MONGO_URI = "mongodb+srv://user: password@cluster0.f1auc.mongodb.net/studentApp?retryWrites=true&w=majority"
-REDIS_HOST = "localhost"  # Replace with your Redis server's host
-REDIS_PORT = 0009  # Replace with your Redis server's port
+from . import metrics, slow_queries
+from .renderers import dumps
 
-# Create a single persistent MongoDB connection
-client = None
-db = None
+logger = logging.getLogger(__name__)
 
-# Create Redis connection
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+MONGO_URI = os.environ.get(
+    "MONGO_URI",
+    "mongodb+srv://user: password@cluster0.f1auc.mongodb.net/studentApp?retryWrites=true&w=majority",
+)
+REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")  # Replace with your Redis server's host
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))  # Replace with your Redis server's port
 
-def connect_to_mongo():
-    global client, db
-    if client is None:  # Check if the connection already exists
+# Defaults for the pool settings in backend/settings.py
+POOL_DEFAULTS = {
+    "MONGO_MAX_POOL_SIZE": 50,
+    "MONGO_MIN_POOL_SIZE": 0,
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": 2000,
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": 5000,
+    "MONGO_CONNECT_TIMEOUT_MS": 5000,
+    "REDIS_MAX_CONNECTIONS": 50,
+    "REDIS_POOL_TIMEOUT": 2,
+    "REDIS_SOCKET_TIMEOUT": 2,
+}
+
+metrics.describe("mongo_pool_checkout_seconds", "Time spent waiting for a MongoDB pool connection")
+metrics.describe("mongo_pool_checkout_failures_total", "MongoDB pool checkouts that failed or timed out")
+metrics.describe("redis_pool_checkout_seconds", "Time spent waiting for a Redis pool connection")
+metrics.describe("mongo_command_duration_seconds", "MongoDB command round-trip time by command and collection")
+metrics.describe("mongo_command_failures_total", "MongoDB commands that returned an error")
+metrics.describe("redis_command_duration_seconds", "Redis command round-trip time by command")
+metrics.describe("redis_command_failures_total", "Redis commands that raised")
+
+
+def get_setting(name):
+    """ Pool setting from Django settings (falls back to POOL_DEFAULTS outside Django) """
+    from django.conf import settings
+    if settings.configured:
+        return getattr(settings, name, POOL_DEFAULTS[name])
+    return POOL_DEFAULTS[name]
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """ Records how long requests wait for a pooled MongoDB connection """
+
+    def connection_checked_out(self, event):
+        if event.duration is not None:
+            metrics.observe("mongo_pool_checkout_seconds", event.duration)
+
+    def connection_check_out_failed(self, event):
+        metrics.inc("mongo_pool_checkout_failures_total", reason=str(event.reason))
+
+    # Events we don't need
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Per-command / per-collection MongoDB timings.
+    Only the started event carries the command document, so its collection name is
+    kept until the matching succeeded/failed event (same request and connection id).
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[(event.request_id, event.connection_id)] = target if isinstance(target, str) else ""
+
+    def _finish(self, event):
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        metrics.observe("mongo_command_duration_seconds", event.duration_micros / 1e6,
+                        command=event.command_name, collection=collection)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        metrics.inc("mongo_command_failures_total", command=event.command_name, collection=collection)
+
+
+def event_listeners(database):
+    """ Monitoring listeners for a Mongo client; `database` is where the slow-query log is written """
+    listeners = [PoolCheckoutListener(), CommandMetricsListener()]
+    if slow_queries.threshold_ms() > 0:
+        listeners.append(slow_queries.SlowQueryListener(database))
+    return listeners
+
+
+class TimedRedis(redis.Redis):
+    """ redis.Redis that records the round-trip time of every command """
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
         try:
-            client = MongoClient(MONGO_URI)
-            db = client["studentApp"]
-            print("MongoDB Connected Successfully")
-        except Exception as e:  # Catch any general exception
-            print(f"Failed to connect to MongoDB: {e}")
-            exit(1)
-    return db
+            return super().execute_command(*args, **options)
+        except redis.RedisError:
+            metrics.inc("redis_command_failures_total", command=str(args[0]).upper())
+            raise
+        finally:
+            metrics.observe("redis_command_duration_seconds", time.perf_counter() - start, command=str(args[0]).upper())
+
+
+class TimedConnectionPool(redis.BlockingConnectionPool):
+    """ Bounded Redis pool that waits up to `timeout` for a free connection and records the wait """
+
+    def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().get_connection(*args, **kwargs)
+        finally:
+            metrics.observe("redis_pool_checkout_seconds", time.perf_counter() - start)
+
+
+def mongo_client_options():
+    """ Pool/timeouts shared by the sync and async Mongo clients """
+    return {
+        "maxPoolSize": get_setting("MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": get_setting("MONGO_MIN_POOL_SIZE"),
+        "waitQueueTimeoutMS": get_setting("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": get_setting("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "connectTimeoutMS": get_setting("MONGO_CONNECT_TIMEOUT_MS"),
+    }
+
+
+class ConnectionManager:
+    """
+    Per-process MongoDB client and Redis pool.
+
+    pymongo clients are not fork-safe, so clients are created lazily in the process
+    that uses them and recreated when the PID changes (e.g. gunicorn forking workers
+    from a --preload master). Call warm_up() from the worker boot hook so the first
+    request doesn't pay for DNS, TLS, auth and topology discovery.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._db = None
+        self._redis_pool = None
+        self._redis = None  # Client on the pool, shared by every request of the process
+        self._redis_client = None  # Set by use()
+
+    def _ensure_process(self):
+        if self._pid != os.getpid():
+            # Inherited clients belong to the parent; drop them without closing its sockets
+            self._client = None
+            self._db = None
+            self._redis_pool = None
+            self._redis = None
+            self._redis_client = None
+            self._pid = os.getpid()
+
+    def database(self):
+        with self._lock:
+            self._ensure_process()
+            if self._client is None:  # Check if the connection already exists
+                try:
+                    self._client = MongoClient(
+                        MONGO_URI, event_listeners=event_listeners(self.database), **mongo_client_options()
+                    )
+                    self._db = self._client["studentApp"]
+                    logger.info("MongoDB Connected Successfully")
+                except Exception as e:  # Runs inside a request: fail it (500), not the worker process
+                    logger.critical("Failed to connect to MongoDB: %s", e)
+                    raise
+            return self._db
+
+    def redis_pool(self):
+        with self._lock:
+            self._ensure_process()
+            if self._redis_pool is None:
+                self._redis_pool = TimedConnectionPool(
+                    host=REDIS_HOST, port=REDIS_PORT, db=0,
+                    max_connections=get_setting("REDIS_MAX_CONNECTIONS"),
+                    timeout=get_setting("REDIS_POOL_TIMEOUT"),
+                    socket_timeout=get_setting("REDIS_SOCKET_TIMEOUT"),
+                    socket_connect_timeout=get_setting("REDIS_SOCKET_TIMEOUT"),
+                )
+            return self._redis_pool
+
+    def redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        client = self._redis
+        if client is None or self._pid != os.getpid():
+            pool = self.redis_pool()
+            with self._lock:
+                if self._redis is None:
+                    self._redis = TimedRedis(connection_pool=pool)
+                client = self._redis
+        return client
+
+    def subscriber(self):
+        """ Redis client for pub/sub with a connection of its own, outside the pool """
+        if self._redis_client is not None:
+            return self._redis_client
+        return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0,
+                           socket_connect_timeout=get_setting("REDIS_SOCKET_TIMEOUT"))
+
+    def use(self, database, redis_client=None):
+        """ Serve an explicit database (and Redis client) in this process, e.g. for benchmarks """
+        with self._lock:
+            self._pid = os.getpid()
+            self._client = database.client
+            self._db = database
+            self._redis_client = redis_client
+
+    def warm_up(self):
+        """ Open the Mongo and Redis connections now instead of on the first request """
+        start = time.perf_counter()
+        try:
+            self.database().client.admin.command("ping")
+        except Exception as e:
+            logger.warning("MongoDB warm-up failed: %s", e)
+        try:
+            self.redis().ping()
+        except redis.RedisError as e:
+            logger.warning("Redis warm-up failed: %s", e)
+        logger.info("Connections warmed up in %.2fs (pid %s)", time.perf_counter() - start, os.getpid())
+
+
+connections = ConnectionManager()
+
+
+def connect_to_mongo():
+    return connections.database()
+
+def get_redis():
+    return connections.redis()
+
+def warm_up():
+    connections.warm_up()
 
 def cache_data(key, data, expiry=3600):
     """ Cache data in Redis with expiry (default is 1 hour) """
-    r.setex(key, expiry, json.dumps(data))  # Cache data as JSON string
+    get_redis().setex(key, expiry, dumps(data))  # Cache data as JSON, same encoding as the responses
 
 def get_cached_data(key):
     """ Get cached data from Redis """
-    cached_data = r.get(key)
+    cached_data = get_redis().get(key)
     if cached_data:
         return json.loads(cached_data)
     return None
@@ -91,4 +319,3 @@ def fetch_and_print_students():
 # Main execution block
 if __name__ == "__main__":
     fetch_and_print_students()
-
@@ -0,0 +1,236 @@
+# app/events.py
+# Live submission feed for the admin app (GET /api/admin/submissions/events/, Server-Sent Events).
+#
+# Every submission write publishes a small event twice: XADD to a short capped
+# Redis stream, which is the replay buffer for `Last-Event-ID`, and PUBLISH on a
+# per-class pub/sub channel that the open feeds listen on. A feed that reconnects
+# first subscribes, then replays what it missed from the stream, then goes live,
+# so nothing published in between is lost (at worst an event is sent twice).
+# Events are refresh hints for the admin screens; the submissions and the rollups
+# stay the source of truth, and publishing never fails the write that triggered it.
+import logging
+import re
+import time
+
+import redis
+from django.conf import settings
+
+from .db import connections, get_redis
+from .renderers import dumps
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "events:submissions"
+CHANNEL_PREFIX = "events:submissions:"
+
+SUBMISSION_CREATED = "submission.created"
+STATUS_CHANGED = "submission.status_changed"
+SUBMISSION_DELETED = "submission.deleted"
+BULK_STATUS_CHANGED = "submissions.bulk_status_changed"
+BULK_DELETED = "submissions.bulk_deleted"
+
+# Defaults for the settings in backend/settings.py
+SETTING_DEFAULTS = {
+    "SUBMISSION_EVENTS_MAXLEN": 1000,
+    "SSE_MAX_SECONDS": 300,
+    "SSE_HEARTBEAT_SECONDS": 15,
+    "SSE_RETRY_MS": 2000,
+}
+
+EVENT_ID = re.compile(r"^\d+-\d+$")
+
+
+def get_setting(name):
+    return getattr(settings, name, SETTING_DEFAULTS[name])
+
+
+def channel(class_grade):
+    return f"{CHANNEL_PREFIX}{class_grade}"
+
+
+def submission_event(submission, **extra):
+    """ The fields of a submission that go into its events (submission needs _id and the rollup fields) """
+    data = {
+        "submission_id": str(submission["_id"]),
+        "assignment_title": submission.get("assignment_title"),
+        "status": submission.get("status"),
+    }
+    for field in ("student_name", "submitted_at"):
+        if field in submission:
+            data[field] = submission[field]
+    data.update(extra)
+    return data
+
+
+def publish(event_type, class_grade, data):
+    """ Append the event to the replay stream and publish it to the open feeds of its class """
+    payload = dumps({"type": event_type, "class_grade": class_grade, **data})
+    try:
+        r = get_redis()
+        event_id = r.xadd(STREAM_KEY, {"type": event_type, "class_grade": class_grade or "", "data": payload},
+                          maxlen=get_setting("SUBMISSION_EVENTS_MAXLEN"), approximate=True)
+        event_id = event_id.decode() if isinstance(event_id, bytes) else event_id
+        r.publish(channel(class_grade), f"{event_id} {event_type} ".encode() + payload)
+    except redis.RedisError as e:
+        logger.warning("Failed to publish %s event: %s", event_type, e)
+
+
+def publish_status_change(before, new_status):
+    """ `before` is the submission as it was before its status was set to `new_status` """
+    publish(STATUS_CHANGED, before.get("class_grade"),
+            submission_event({**before, "status": new_status}, previous_status=before.get("status")))
+
+
+def publish_bulk(event_type, counts, **extra):
+    """ One event per class for a bulk write; `counts` is {rollup group: submissions} """
+    by_class = {}
+    for (class_grade, title, _status), count in counts.items():
+        assignments = by_class.setdefault(class_grade, {})
+        assignments[title] = assignments.get(title, 0) + count
+    for class_grade, assignments in by_class.items():
+        publish(event_type, class_grade, {"count": sum(assignments.values()), "assignments": assignments, **extra})
+
+
+# ---- feed ----
+
+def parse_event_id(value):
+    """ (ms, seq) of a stream id, None if it isn't one (e.g. a header from another server) """
+    if not value or not EVENT_ID.match(value):
+        return None
+    ms, seq = value.split("-")
+    return int(ms), int(seq)
+
+
+def frame(event_id, event_type, data):
+    return b"id: " + event_id.encode() + b"\nevent: " + event_type + b"\ndata: " + data + b"\n\n"
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _bytes(value):
+    return value.encode() if isinstance(value, str) else value
+
+
+def replay_range(after):
+    """ XRANGE start just past `after` (exclusive start ids need Redis 6.2, this works on 5) """
+    return f"{after[0]}-{after[1] + 1}"
+
+
+def replay_frames(entries, oldest, after, class_grade):
+    """
+    Frames for the stream entries after the client's last id, plus the highest id sent.
+    `oldest` is the first entry still in the stream: when even that is newer than
+    what the client saw, older events were trimmed and the client has to reload.
+    `0-0` asks for everything still buffered and never resets.
+    """
+    frames, high = [], after
+    if after != (0, 0) and oldest and parse_event_id(_text(oldest[0][0])) > after:
+        frames.append(b"event: reset\ndata: {}\n\n")
+    for entry_id, fields in entries:
+        entry_id = _text(entry_id)
+        fields = {_text(k): v for k, v in fields.items()}
+        high = parse_event_id(entry_id)
+        if class_grade and _text(fields.get("class_grade")) != class_grade:
+            continue
+        frames.append(frame(entry_id, _bytes(fields["type"]), _bytes(fields["data"])))
+    return frames, high
+
+
+def message_frame(message, high):
+    """ Frame of a pub/sub message, None for ones the replay already sent """
+    if message is None or message.get("type") not in ("message", "pmessage"):
+        return None
+    event_id, event_type, data = _bytes(message["data"]).split(b" ", 2)
+    if high is not None and parse_event_id(event_id.decode()) <= high:
+        return None
+    return frame(event_id.decode(), event_type, data)
+
+
+def subscribe_args(class_grade):
+    return ("subscribe", channel(class_grade)) if class_grade else ("psubscribe", CHANNEL_PREFIX + "*")
+
+
+def event_stream(class_grade=None, last_event_id=None, duration=None):
+    """ SSE byte stream for WSGI; holds a worker thread until `duration` seconds have passed """
+    duration = get_setting("SSE_MAX_SECONDS") if duration is None else duration
+    heartbeat = get_setting("SSE_HEARTBEAT_SECONDS")
+    deadline = time.monotonic() + duration
+    after = parse_event_id(last_event_id)
+
+    # Its own connection: a feed is open for minutes and mustn't hold one of the pool's
+    pubsub = connections.subscriber().pubsub()
+    try:
+        yield f"retry: {get_setting('SSE_RETRY_MS')}\n\n".encode()
+        method, name = subscribe_args(class_grade)
+        getattr(pubsub, method)(name)
+        pubsub.get_message(timeout=heartbeat)  # Subscribed before replaying, so nothing falls in between
+
+        high = None
+        if after is not None:
+            r = get_redis()
+            frames, high = replay_frames(
+                r.xrange(STREAM_KEY, min=replay_range(after), count=get_setting("SUBMISSION_EVENTS_MAXLEN")),
+                r.xrange(STREAM_KEY, count=1), after, class_grade,
+            )
+            yield from frames
+
+        last_write = time.monotonic()
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=min(heartbeat, remaining))
+            chunk = message_frame(message, high)
+            if chunk is not None:
+                yield chunk
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= heartbeat:
+                yield b": keepalive\n\n"  # Keeps proxies from closing an idle connection
+                last_write = time.monotonic()
+    except redis.RedisError as e:
+        logger.warning("Submission feed closed: %s", e)
+    finally:
+        pubsub.close()
+
+
+async def aevent_stream(class_grade=None, last_event_id=None, duration=None):
+    """ Async twin of event_stream for ASGI, where a feed only costs a coroutine """
+    from .async_db import async_subscriber, get_async_redis
+
+    duration = get_setting("SSE_MAX_SECONDS") if duration is None else duration
+    heartbeat = get_setting("SSE_HEARTBEAT_SECONDS")
+    deadline = time.monotonic() + duration
+    after = parse_event_id(last_event_id)
+
+    client = async_subscriber()
+    pubsub = client.pubsub()
+    try:
+        yield f"retry: {get_setting('SSE_RETRY_MS')}\n\n".encode()
+        method, name = subscribe_args(class_grade)
+        await getattr(pubsub, method)(name)
+        await pubsub.get_message(timeout=heartbeat)
+
+        high = None
+        if after is not None:
+            r = get_async_redis()
+            frames, high = replay_frames(
+                await r.xrange(STREAM_KEY, min=replay_range(after), count=get_setting("SUBMISSION_EVENTS_MAXLEN")),
+                await r.xrange(STREAM_KEY, count=1), after, class_grade,
+            )
+            for chunk in frames:
+                yield chunk
+
+        last_write = time.monotonic()
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(heartbeat, remaining))
+            chunk = message_frame(message, high)
+            if chunk is not None:
+                yield chunk
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= heartbeat:
+                yield b": keepalive\n\n"
+                last_write = time.monotonic()
+    except redis.RedisError as e:
+        logger.warning("Submission feed closed: %s", e)
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
@@ -0,0 +1,165 @@
+# app/indexes.py
+# Single registry of the MongoDB indexes the views rely on.
+# `manage.py ensure_indexes` creates everything in INDEXES and then explains every
+# entry of CANONICAL_QUERIES so a view that falls back to a COLLSCAN fails the deploy.
+# When a view gets a new access pattern, add its index and query here. An index
+# replaced by one with other options (e.g. now unique) is listed in RETIRED_INDEXES,
+# and dropped once its replacement exists.
+from collections import namedtuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+INDEXES = {
+    "students": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("class_grade", ASCENDING), ("_id", ASCENDING)], name="class_grade_id"),
+    ],
+    "admins": [
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "assignments": [
+        IndexModel([("class_grade", ASCENDING), ("_id", ASCENDING)], name="class_grade_id"),
+        IndexModel([("class_grade", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)],
+                   name="class_grade_due_date"),
+        # SearchView; class_grade is a suffix key so unfiltered searches can use the index too
+        IndexModel([("title", TEXT), ("description", TEXT), ("class_grade", ASCENDING)],
+                   weights={"title": 5, "description": 1}, name="title_description_text"),
+    ],
+    "submissions": [
+        IndexModel([("class_grade", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+                   name="class_grade_submitted_at"),
+        IndexModel([("submitted_at", DESCENDING), ("_id", DESCENDING)], name="submitted_at"),
+    ],
+    "submission_rollups": [
+        # One document per group; the $inc upserts in app/rollups.py match on all three fields
+        IndexModel([("class_grade", ASCENDING), ("assignment_title", ASCENDING), ("status", ASCENDING)],
+                   unique=True, name="class_grade_assignment_status"),
+    ],
+    "schedules": [
+        IndexModel([("class_grade", ASCENDING), ("_id", ASCENDING)], name="class_grade_id"),
+        IndexModel([("class_grade", ASCENDING), ("day", ASCENDING), ("start_time", ASCENDING)],
+                   name="class_grade_day_start"),
+        # Week order for StudentScheduleView and the timetable, one seek for the overlap check
+        IndexModel([("class_grade", ASCENDING), ("start_minute", ASCENDING), ("_id", ASCENDING)],
+                   name="class_grade_start_minute"),
+    ],
+    "videos_lectures": [
+        # One chapter document per (class, subject, chapter): get_or_create_chapter upserts on it
+        IndexModel([("class", ASCENDING), ("subject", ASCENDING), ("chapter", ASCENDING)],
+                   unique=True, name="class_subject_chapter_unique"),
+    ],
+    "lecture_videos": [
+        # VideoCreateView relies on it to reject duplicate names; also serves the lecture trees
+        IndexModel([("class", ASCENDING), ("subject", ASCENDING), ("chapter", ASCENDING), ("video_name", ASCENDING)],
+                   unique=True, name="class_subject_chapter_video"),
+    ],
+    "queries": [
+        IndexModel([("class_grade", ASCENDING), ("_id", ASCENDING)], name="class_grade_id"),
+        IndexModel([("query", TEXT), ("studentName", TEXT), ("class_grade", ASCENDING)],
+                   weights={"query": 2, "studentName": 1}, name="query_student_text"),
+    ],
+}
+
+# One representative query per access pattern: (view, collection, filter, sort)
+CanonicalQuery = namedtuple("CanonicalQuery", ["view", "collection", "filter", "sort"])
+
+CANONICAL_QUERIES = [
+    CanonicalQuery("AdminLoginView", "admins", {"email": "admin@example.com", "password": "x"}, None),
+    CanonicalQuery("StudentLoginView / CreateStudentView", "students", {"username": "student"}, None),
+    CanonicalQuery("ListStudentsView", "students", {"class_grade": "11th"}, [("_id", ASCENDING)]),
+    CanonicalQuery("AdminListAssignmentView / StudentListAssignmentsView", "assignments",
+                   {"class_grade": "11th"}, [("_id", ASCENDING)]),
+    CanonicalQuery("ListSubmissionsView", "submissions", {"class_grade": "11th"},
+                   [("submitted_at", DESCENDING), ("_id", DESCENDING)]),
+    CanonicalQuery("ListSubmissionsView (all classes)", "submissions", {},
+                   [("submitted_at", DESCENDING), ("_id", DESCENDING)]),
+    CanonicalQuery("ListSchedulesView", "schedules", {"class_grade": "11th"}, [("_id", ASCENDING)]),
+    CanonicalQuery("StudentScheduleView / StudentScheduleNowView", "schedules",
+                   {"class_grade": "11th"}, [("start_minute", ASCENDING), ("_id", ASCENDING)]),
+    CanonicalQuery("CreateScheduleView (overlap check)", "schedules",
+                   {"class_grade": "11th", "start_minute": {"$lt": 600}}, [("start_minute", DESCENDING)]),
+    CanonicalQuery("CreateScheduleView (re-check after insert)", "schedules",
+                   {"class_grade": "11th", "_id": {"$ne": ObjectId("000000000000000000000000")},
+                    "start_minute": {"$lt": 600}, "end_minute": {"$gt": 540}}, None),
+    CanonicalQuery("VideoCreateView / VideoDeleteView / ChapterDeleteView", "videos_lectures",
+                   {"class": "11th", "subject": "Maths", "chapter": "Sets"}, None),
+    CanonicalQuery("VideoListView / StudentListVideosLecturesView", "videos_lectures",
+                   {"class": "11th"}, None),
+    CanonicalQuery("VideoListView / StudentListVideosLecturesView (per-video layout)", "lecture_videos",
+                   {"class": "11th"}, None),
+    CanonicalQuery("VideoDeleteView / ChapterDeleteView (per-video layout)", "lecture_videos",
+                   {"class": "11th", "subject": "Maths", "chapter": "Sets", "video_name": "Intro"}, None),
+    CanonicalQuery("AdminViewQueries", "queries", {"class_grade": "11th"}, [("_id", ASCENDING)]),
+    CanonicalQuery("StudentDashboardView (pending assignments)", "assignments",
+                   {"class_grade": "11th", "due_date": {"$gte": "2025-01-01"}}, [("due_date", ASCENDING), ("_id", ASCENDING)]),
+    CanonicalQuery("StudentDashboardView (today's schedule)", "schedules",
+                   {"class_grade": "11th", "day": "Monday"}, [("start_time", ASCENDING), ("_id", ASCENDING)]),
+    CanonicalQuery("AdminSubmissionAnalyticsView", "submission_rollups",
+                   {"count": {"$gt": 0}, "class_grade": "11th"}, None),
+    CanonicalQuery("SearchView (queries)", "queries", {"$text": {"$search": "balance sheet"}, "class_grade": "11th"}, None),
+    CanonicalQuery("SearchView (assignments)", "assignments", {"$text": {"$search": "depreciation"}}, None),
+]
+
+DUPLICATES_SHOWN = 20  # Per unique index, when one can't be built
+
+RETIRED_INDEXES = {
+    "videos_lectures": ["class_subject_chapter"],  # Now class_subject_chapter_unique
+}
+
+
+def ensure_indexes(db, collections=None):
+    """ Create the registered indexes (no-op for ones that already exist) and drop the retired ones """
+    created = {}
+    for name, models in INDEXES.items():
+        if collections and name not in collections:
+            continue
+        created[name] = db[name].create_indexes(models)
+        existing = db[name].index_information()
+        for retired in RETIRED_INDEXES.get(name, ()):
+            if retired in existing:
+                db[name].drop_index(retired)
+    return created
+
+
+def duplicate_keys(db, collection, limit=DUPLICATES_SHOWN):
+    """ [(index name, key values, count)] that keep the unique indexes of `collection` from being built """
+    found = []
+    for model in INDEXES.get(collection, ()):
+        spec = model.document
+        if not spec.get("unique"):
+            continue
+        fields = list(spec["key"])
+        pipeline = [
+            {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field in fields}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit},
+        ]
+        for doc in db[collection].aggregate(pipeline, allowDiskUse=True):
+            found.append((spec["name"], tuple(doc["_id"].values()), doc["count"]))
+    return found
+
+
+def plan_stages(plan):
+    """ Yield every `stage` name in an explain() plan tree """
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+def explain_canonical_queries(db):
+    """ Return [(CanonicalQuery, stages)] for the winning plan of every canonical query """
+    results = []
+    for canonical in CANONICAL_QUERIES:
+        cursor = db[canonical.collection].find(canonical.filter)
+        if canonical.sort:
+            cursor = cursor.sort(canonical.sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        results.append((canonical, list(plan_stages(winning_plan))))
+    return results
@@ -0,0 +1,87 @@
+# app/instrumentation.py
+# Request metrics and the Prometheus endpoint.
+#
+# MetricsMiddleware is the outermost middleware, so its timings cover the whole
+# stack and its sizes are what went over the wire (after compression). Mongo,
+# Redis, Drive and JSON encoding are timed where they happen (app/db.py,
+# app/async_db.py, app/storage.py, app/renderers.py); GET /metrics renders it all.
+# The request is also published in slow_queries.current_request so slow Mongo
+# operations can be traced back to their view.
+import hmac
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import metrics
+from .slow_queries import current_request
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics.describe("http_request_duration_seconds", "Request latency by route and method")
+metrics.describe("http_responses_total", "Responses by route, method and status code")
+metrics.describe("http_response_size_bytes", "Response body size by route (after compression)")
+
+
+def route_label(request):
+    """ URL pattern of the matched route (bounded cardinality), not the raw path """
+    match = getattr(request, "resolver_match", None)
+    return "/" + match.route if match is not None else "unmatched"
+
+
+def record(request, response, elapsed):
+    route = route_label(request)
+    metrics.observe("http_request_duration_seconds", elapsed, route=route, method=request.method)
+    metrics.inc("http_responses_total", route=route, method=request.method, status=str(response.status_code))
+    if not response.streaming:  # Streamed bodies are timed to the first byte and not sized
+        metrics.observe("http_response_size_bytes", len(response.content), buckets=SIZE_BUCKETS, route=route)
+
+
+class MetricsMiddleware:
+    """ Sync and async capable, so ASGI requests don't pay for a thread hop """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        record(request, response, time.perf_counter() - start)
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>`.
+    Without a token it is only open with DEBUG on, never on a deployed server.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token and not settings.DEBUG:
+        return HttpResponse("Set METRICS_TOKEN to enable /metrics\n", status=403, content_type=CONTENT_TYPE)
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse("Unauthorized\n", status=401, content_type=CONTENT_TYPE)
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,192 @@
+# app/lecture_videos.py
+# Per-video storage for the lectures.
+#
+# A chapter used to be a single `videos_lectures` document with every video in an
+# embedded `videos` array, rewritten in full on each $push/$pull and growing
+# toward the 16MB document limit. Now the chapter document only names the
+# chapter, and each video is its own `lecture_videos` document (carrying the
+# chapter's _id and class/subject/chapter) with a unique index on
+# (class, subject, chapter, video_name): duplicates are rejected by the insert
+# itself instead of by loading the chapter and comparing names in Python.
+#
+# The reads (app/lectures.py) merge both layouts, so chapters are moved over
+# online: `manage.py migrate_lecture_videos` moves them in batches, and adding
+# videos to a chapter that still has embedded ones moves that chapter first.
+import datetime
+import logging
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+VIDEOS_COLLECTION = "lecture_videos"
+CHAPTER_FIELDS = ("class", "subject", "chapter")
+KEY_FIELDS = CHAPTER_FIELDS + ("video_name",)
+RESERVED_FIELDS = ("_id", "chapter_id") + CHAPTER_FIELDS
+DUPLICATE_KEY = 11000
+MIGRATE_ATTEMPTS = 3
+
+
+class DuplicateVideo(Exception):
+    def __init__(self, video_name):
+        super().__init__(f"Duplicate video name: {video_name}")
+        self.video_name = video_name
+
+
+def video_doc(chapter, video):
+    """ lecture_videos document of one video of `chapter` (fields the API accepted are kept as-is) """
+    doc = {key: value for key, value in video.items() if key not in RESERVED_FIELDS}
+    doc["_id"] = ObjectId()  # Generated here, in order, so _id order is the order they were added in
+    doc["chapter_id"] = chapter["_id"]
+    for field in CHAPTER_FIELDS:
+        doc[field] = chapter[field]
+    return doc
+
+
+def chapter_query(class_name, subject, chapter):
+    return {"class": class_name, "subject": subject, "chapter": chapter}
+
+
+def get_or_create_chapter(db, class_name, subject, chapter):
+    """ (chapter, created); `videos` holds at most one embedded video, enough to tell it wasn't moved yet """
+    new_id = ObjectId()
+
+    def upsert():
+        return db.videos_lectures.find_one_and_update(
+            chapter_query(class_name, subject, chapter),
+            {"$setOnInsert": {"_id": new_id, "created_at": datetime.datetime.utcnow()}},
+            projection={field: 1 for field in CHAPTER_FIELDS} | {"videos": {"$slice": 1}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+
+    try:
+        doc = upsert()
+    except DuplicateKeyError:
+        doc = upsert()  # A concurrent upsert inserted the chapter first (unique index); now it matches
+    return doc, doc["_id"] == new_id
+
+
+def add_videos(db, class_name, subject, chapter, videos):
+    """ Add all of `videos` to the chapter or none of them; raises DuplicateVideo """
+    chapter_doc, created = get_or_create_chapter(db, class_name, subject, chapter)
+    if chapter_doc.get("videos"):
+        migrate_chapter(db, chapter_doc["_id"])  # So the unique index sees its names too
+
+    docs = [video_doc(chapter_doc, video) for video in videos]
+    try:
+        db[VIDEOS_COLLECTION].insert_many(docs, ordered=True)
+    except BulkWriteError as e:
+        # Ordered: everything before the first error went in, so delete exactly those
+        inserted = e.details.get("nInserted", 0)
+        if inserted:
+            db[VIDEOS_COLLECTION].delete_many({"_id": {"$in": [doc["_id"] for doc in docs[:inserted]]}})
+        if created and db[VIDEOS_COLLECTION].find_one(chapter_query(class_name, subject, chapter), {"_id": 1}) is None:
+            db.videos_lectures.delete_one({"_id": chapter_doc["_id"]})
+        duplicate = next((error for error in e.details.get("writeErrors", []) if error.get("code") == DUPLICATE_KEY), None)
+        if duplicate is None:
+            raise
+        raise DuplicateVideo(docs[duplicate["index"]].get("video_name")) from None
+
+
+def delete_video(db, class_name, subject, chapter, video_name):
+    """ True if a video was deleted """
+    if db[VIDEOS_COLLECTION].delete_one({**chapter_query(class_name, subject, chapter), "video_name": video_name}).deleted_count:
+        return True
+    # Not moved yet (or a duplicate name the embedded layout allowed)
+    result = db.videos_lectures.update_one(
+        chapter_query(class_name, subject, chapter), {"$pull": {"videos": {"video_name": video_name}}}
+    )
+    return bool(result.modified_count)
+
+
+def delete_chapter(db, class_name, subject, chapter):
+    """ True if the chapter existed. Videos go first, so a crash in between can't leave orphans """
+    db[VIDEOS_COLLECTION].delete_many(chapter_query(class_name, subject, chapter))
+    # Many: duplicates created before the index was unique, if merge_duplicate_chapters hasn't run yet
+    return bool(db.videos_lectures.delete_many(chapter_query(class_name, subject, chapter)).deleted_count)
+
+
+def merge_duplicate_chapters(db):
+    """
+    Fold chapter documents repeating a (class, subject, chapter) into the oldest one,
+    so the unique index can be built; returns how many were removed. Each duplicate
+    is taken out with find_one_and_delete, so no video pushed to it meanwhile is lost.
+    """
+    pipeline = [
+        {"$group": {"_id": {field: f"${field}" for field in CHAPTER_FIELDS}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    removed = 0
+    for group in db.videos_lectures.aggregate(pipeline, allowDiskUse=True):
+        keep, *duplicates = sorted(group["ids"])
+        for chapter_id in duplicates:
+            duplicate = db.videos_lectures.find_one_and_delete({"_id": chapter_id})
+            if duplicate is None:
+                continue
+            if duplicate.get("videos"):
+                db.videos_lectures.update_one({"_id": keep}, {"$push": {"videos": {"$each": duplicate["videos"]}}})
+            db[VIDEOS_COLLECTION].update_many({"chapter_id": chapter_id}, {"$set": {"chapter_id": keep}})
+            removed += 1
+    return removed
+
+
+def _video_fields(doc):
+    return {key: value for key, value in doc.items() if key not in RESERVED_FIELDS}
+
+
+def same_video(doc, video):
+    """ Whether the lecture_videos `doc` holds exactly the embedded `video` """
+    return doc is not None and _video_fields(doc) == _video_fields(video)
+
+
+def migrate_chapter(db, chapter_id):
+    """
+    Move the embedded videos of one chapter to lecture_videos; returns how many moved.
+    Safe to re-run: videos are upserted on their unique key, and the array is only
+    changed if it is still exactly what was copied (an app server running the old
+    code may still $push to it). Videos without a name, or whose name is taken by
+    another video of the chapter, stay embedded; the reads include them either way.
+    """
+    for _ in range(MIGRATE_ATTEMPTS):
+        chapter = db.videos_lectures.find_one({"_id": chapter_id})
+        embedded = (chapter or {}).get("videos") or []
+
+        ops, moving, names = [], [], set()
+        for position, video in enumerate(embedded):
+            name = video.get("video_name") if isinstance(video, dict) else None
+            if not name or name in names:
+                continue
+            names.add(name)
+            doc = video_doc(chapter, video)
+            key = {field: doc.pop(field) for field in KEY_FIELDS}
+            ops.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+            moving.append(position)
+        if not ops:
+            return 0
+
+        result = db[VIDEOS_COLLECTION].bulk_write(ops, ordered=True)
+        matched = [position for i, position in enumerate(moving) if i not in result.upserted_ids]
+        if matched:
+            # Already in lecture_videos: the same video from an interrupted run can leave
+            # the array, a different one with that name has to stay embedded
+            existing = {doc["video_name"]: doc for doc in db[VIDEOS_COLLECTION].find(
+                {**chapter_query(chapter["class"], chapter["subject"], chapter["chapter"]),
+                 "video_name": {"$in": [embedded[position]["video_name"] for position in matched]}},
+            )}
+            moving = [
+                position for position in moving
+                if position not in matched or same_video(existing.get(embedded[position]["video_name"]), embedded[position])
+            ]
+        if not moving:
+            return 0
+
+        moved = set(moving)
+        kept = [video for position, video in enumerate(embedded) if position not in moved]
+        update = {"$set": {"videos": kept}} if kept else {"$unset": {"videos": ""}}
+        if db.videos_lectures.update_one({"_id": chapter_id, "videos": embedded}, update).modified_count:
+            return len(moving)
+    logger.warning("Chapter %s kept changing while its videos were moved; run `manage.py migrate_lecture_videos` again",
+                   chapter_id)
+    return 0
@@ -0,0 +1,145 @@
+# app/lectures.py
+# Aggregation pipelines that build the subject > chapter lecture trees inside
+# MongoDB, so the views get one ready-to-serialize document back instead of
+# every chapter document + nested Python loops.
+# Videos are read from both storage layouts (see app/lecture_videos.py): still
+# embedded in their chapter document, or in the lecture_videos collection.
+from .lecture_videos import VIDEOS_COLLECTION
+
+
+def _unknown(field, default):
+    return {"$ifNull": [f"${field}", default]}
+
+
+def _has_value(field):
+    # Python truthiness of the old loops: missing, null and "" are all skipped
+    return {"$and": [f"${field}", {"$ne": [f"${field}", ""]}]}
+
+
+def video_rows(query, ordered=True):
+    """
+    One row {_id: chapter _id, subject, chapter, videos: <one video>} per video, from
+    the embedded arrays and lecture_videos alike, in chapter then insertion order.
+    Moved videos come first: what stays embedded after a migration are the later
+    videos reusing a name, and a chapter that wasn't moved yet has no moved videos.
+    Every chapter document also yields a row without `videos`, so empty chapters
+    still show up; the pipelines below skip those rows when collecting videos.
+    The $sort covers every video of the class, so run these with allowDiskUse=True.
+    """
+    rows = [
+        {"$match": query},
+        {"$unwind": {"path": "$videos", "preserveNullAndEmptyArrays": True, "includeArrayIndex": "position"}},
+        {"$project": {"subject": 1, "chapter": 1, "videos": 1, "layout": {"$literal": 1}, "position": 1}},
+        {"$unionWith": {"coll": VIDEOS_COLLECTION, "pipeline": [
+            {"$match": query},
+            {"$project": {"_id": "$chapter_id", "subject": 1, "chapter": 1, "videos": "$$ROOT",
+                          "layout": {"$literal": 0}, "position": "$_id"}},
+        ]}},
+    ]
+    if ordered:
+        rows.append({"$sort": {"_id": 1, "layout": 1, "position": 1}})
+    return rows
+
+
+def _tree_stages(chapter_value_stage):
+    """
+    Shared tail: one doc per (subject, chapter) -> {subject: {chapter: value}}.
+    `chapter_value_stage` must leave {_id: {subject, chapter}, first: <_id>, value: ...}.
+    Ordering follows the first chapter document, like the old dict insertion order.
+    """
+    return chapter_value_stage + [
+        {"$sort": {"first": 1}},
+        {"$group": {
+            "_id": "$_id.subject",
+            "first": {"$first": "$first"},
+            "chapters": {"$push": {"k": "$_id.chapter", "v": "$value"}},
+        }},
+        {"$sort": {"first": 1}},
+        {"$group": {
+            "_id": None,
+            "subjects": {"$push": {"k": "$_id", "v": {"$arrayToObject": "$chapters"}}},
+        }},
+        {"$replaceRoot": {"newRoot": {"$arrayToObject": "$subjects"}}},
+    ]
+
+
+def admin_video_tree_pipeline(query, video_fields):
+    """ VideoListView: {subject: {chapter: [video, ...]}} with only `video_fields` per video """
+    return [
+        *video_rows(query),
+        *_tree_stages([
+            {"$group": {
+                "_id": {
+                    "subject": _unknown("subject", "Unknown Subject"),
+                    "chapter": _unknown("chapter", "Unknown Chapter"),
+                },
+                "first": {"$min": "$_id"},
+                # Empty chapters unwind to a doc without `videos`; $$REMOVE keeps them as []
+                "value": {"$push": {"$cond": [
+                    {"$lte": ["$videos", None]},  # missing or null
+                    "$$REMOVE",
+                    {name: f"$videos.{name}" for name in video_fields},
+                ]}},
+            }},
+        ]),
+    ]
+
+
+def student_lecture_tree_pipeline(query):
+    """ StudentListVideosLecturesView: {subject: {chapter: {videos: [...], pdfs: [...]}}} """
+    base = {
+        "_id": {"$toString": "$_id"},
+        "title": _unknown("videos.video_name", "Untitled"),
+        "description": _unknown("videos.description", ""),
+    }
+    video_entry = {**base, "video_url": "$videos.video_url", "pdf_url": "", "type": "video"}
+    pdf_entry = {**base, "video_url": "", "pdf_url": "$videos.pdf_url", "type": "pdf"}
+
+    return [
+        *video_rows(query),
+        *_tree_stages([
+            {"$group": {
+                "_id": {
+                    "subject": _unknown("subject", "Unknown Subject"),
+                    "chapter": _unknown("chapter", "Unknown Chapter"),
+                },
+                "first": {"$min": "$_id"},
+                # $$REMOVE is skipped by $push, so only real videos / pdfs are collected
+                "videos": {"$push": {"$cond": [_has_value("videos.video_url"), video_entry, "$$REMOVE"]}},
+                "pdfs": {"$push": {"$cond": [_has_value("videos.pdf_url"), pdf_entry, "$$REMOVE"]}},
+            }},
+            {"$project": {"first": 1, "value": {"videos": "$videos", "pdfs": "$pdfs"}}},
+        ]),
+    ]
+
+
+def lecture_summary_pipeline(query):
+    """ Student dashboard: [{subject, chapters, videos, pdfs}] counts, subjects in first-seen order """
+    def count(field):
+        return {"$sum": {"$cond": [_has_value(f"videos.{field}"), 1, 0]}}
+
+    return [
+        *video_rows(query, ordered=False),
+        {"$group": {
+            "_id": {"subject": _unknown("subject", "Unknown Subject"), "chapter": "$chapter"},
+            "first": {"$min": "$_id"},
+            "videos": count("video_url"),
+            "pdfs": count("pdf_url"),
+        }},
+        {"$group": {
+            "_id": "$_id.subject",
+            "first": {"$min": "$first"},
+            "chapters": {"$sum": 1},
+            "videos": {"$sum": "$videos"},
+            "pdfs": {"$sum": "$pdfs"},
+        }},
+        {"$sort": {"first": 1}},
+        {"$project": {"_id": 0, "subject": "$_id", "chapters": 1, "videos": 1, "pdfs": 1}},
+    ]
+
+
+def first_or_none(cursor):
+    """ The single tree document of a pipeline, or None when nothing matched """
+    for doc in cursor:
+        return doc
+    return None
@@ -0,0 +1,74 @@
+import datetime
+import json
+import statistics
+import time
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app import renderers
+from app.views import format_submission
+
+
+def legacy_format_submission(submission):
+    """ format_submission as it was: str() / isoformat() per document before rendering """
+    formatted = format_submission(submission)
+    formatted["_id"] = str(formatted["_id"])
+    if isinstance(formatted["submitted_at"], datetime.datetime):
+        formatted["submitted_at"] = formatted["submitted_at"].isoformat()
+    return formatted
+
+
+def make_submissions(count):
+    start = datetime.datetime(2025, 1, 1, 9, 30)
+    return [
+        {
+            "_id": ObjectId(),
+            "student_name": f"Student {i}",
+            "class_grade": "FY BCom",
+            "assignment_title": f"Assignment {i % 40}",
+            "filename": f"submission_{i}.pdf",
+            "file_url": f"https://drive.google.com/file/d/{i:032d}/view",
+            "content_type": "application/pdf",
+            "submitted_at": start + datetime.timedelta(minutes=i, microseconds=i),
+            "status": "Pending" if i % 3 else "Reviewed",
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Time ListSubmissionsView serialization: per-document str()/isoformat() + JSONRenderer vs MongoJSONRenderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docs", type=int, default=10000, help="Submissions in the payload (default 10000).")
+        parser.add_argument("--repeat", type=int, default=15, help="Timed runs per path (default 15).")
+
+    def handle(self, *args, **options):
+        docs = make_submissions(options["docs"])
+
+        def legacy():
+            return JSONRenderer().render([legacy_format_submission(dict(d)) for d in docs])
+
+        def fast():
+            return renderers.MongoJSONRenderer().render([format_submission(dict(d)) for d in docs])
+
+        if json.loads(legacy()) != json.loads(fast()):
+            raise CommandError("MongoJSONRenderer output differs from the legacy path.")
+
+        backend = "orjson" if renderers.orjson is not None else "stdlib json"
+        self.stdout.write(f"{options['docs']} submissions, MongoJSONRenderer backend: {backend}")
+        results = {}
+        for label, run in (("legacy", legacy), ("fast", fast)):
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                body = run()
+                timings.append(time.perf_counter() - start)
+            results[label] = statistics.median(timings)
+            self.stdout.write(
+                f"{label:<7} p50 {results[label] * 1000:8.1f} ms  min {min(timings) * 1000:8.1f} ms  "
+                f"{len(body) / 1024:8.1f} KiB"
+            )
+        self.stdout.write(self.style.SUCCESS(f"speedup x{results['legacy'] / results['fast']:.2f}"))
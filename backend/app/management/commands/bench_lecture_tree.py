@@ -0,0 +1,105 @@
+import statistics
+import time
+
+import bson
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmarks import backends
+from app.lectures import student_lecture_tree_pipeline, first_or_none
+
+BENCH_CLASS = "__bench_lectures__"
+
+
+def python_lecture_tree(data):
+    """ The old StudentListVideosLecturesView grouping, kept here as the baseline """
+    response = {}
+    for doc in data:
+        chapters = response.setdefault(doc.get("subject", "Unknown Subject"), {})
+        tree = chapters.setdefault(doc.get("chapter", "Unknown Chapter"), {"videos": [], "pdfs": []})
+        for video in doc.get("videos", []):
+            base_data = {
+                "_id": str(doc.get("_id")),
+                "title": video.get("video_name", "Untitled"),
+                "description": video.get("description", ""),
+            }
+            if video.get("video_url", ""):
+                tree["videos"].append({**base_data, "video_url": video["video_url"], "pdf_url": "", "type": "video"})
+            if video.get("pdf_url", ""):
+                tree["pdfs"].append({**base_data, "video_url": "", "pdf_url": video["pdf_url"], "type": "pdf"})
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway class with N videos in a *_bench database and time the Python "
+        "lecture-tree grouping against the aggregation pipeline used by the lecture views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--videos", type=int, default=5000, help="Total videos to seed (default 5000).")
+        parser.add_argument("--subjects", type=int, default=6, help="Subjects to spread them over (default 6).")
+        parser.add_argument("--chapters", type=int, default=15, help="Chapters per subject (default 15).")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per implementation (default 20).")
+        parser.add_argument("--keep", action="store_true", help="Leave the seeded documents in place.")
+        backends.add_arguments(parser, redis=False)
+
+    def handle(self, *args, **options):
+        collection = backends.connect(options).videos_lectures
+        if collection.count_documents({"class": BENCH_CLASS}, limit=1):
+            raise CommandError(f"Class {BENCH_CLASS!r} already has documents, remove them first.")
+
+        chapters = options["subjects"] * options["chapters"]
+        per_chapter = max(1, options["videos"] // chapters)
+        docs = [
+            {
+                "class": BENCH_CLASS,
+                "subject": f"Subject {s}",
+                "chapter": f"Chapter {c}",
+                "videos": [
+                    {
+                        "video_name": f"Lecture {s}.{c}.{v}",
+                        "video_url": f"https://example.com/{s}/{c}/{v}.mp4",
+                        "pdf_url": f"https://example.com/{s}/{c}/{v}.pdf" if v % 3 == 0 else "",
+                        "description": "Seeded by bench_lecture_tree " * 4,
+                    }
+                    for v in range(per_chapter)
+                ],
+                "created_at": time.time(),
+            }
+            for s in range(options["subjects"])
+            for c in range(options["chapters"])
+        ]
+        collection.insert_many(docs)
+        self.stdout.write(f"Seeded {chapters} chapters x {per_chapter} videos into class {BENCH_CLASS!r}")
+
+        query = {"class": BENCH_CLASS}
+        try:
+            def python_path():
+                data = list(collection.find(query))
+                return python_lecture_tree(data), sum(len(bson.encode(doc)) for doc in data)
+
+            def pipeline_path():
+                tree = first_or_none(collection.aggregate(student_lecture_tree_pipeline(query), allowDiskUse=True))
+                return tree, len(bson.encode(tree))
+
+            expected, _ = python_path()
+            actual, _ = pipeline_path()
+            if expected != actual:
+                raise CommandError("Pipeline output differs from the Python grouping.")
+
+            for label, run in (("python", python_path), ("pipeline", pipeline_path)):
+                wall, cpu = [], []
+                for _ in range(options["repeat"]):
+                    start_wall, start_cpu = time.perf_counter(), time.process_time()
+                    _, transferred = run()
+                    wall.append(time.perf_counter() - start_wall)
+                    cpu.append(time.process_time() - start_cpu)
+                self.stdout.write(
+                    f"{label:<9} wall p50 {statistics.median(wall) * 1000:8.1f} ms  "
+                    f"max {max(wall) * 1000:8.1f} ms  "
+                    f"app cpu p50 {statistics.median(cpu) * 1000:8.1f} ms  "
+                    f"bson from mongo {transferred / 1024:8.1f} KiB"
+                )
+        finally:
+            if not options["keep"]:
+                collection.delete_many(query)
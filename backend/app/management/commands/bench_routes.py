@@ -0,0 +1,122 @@
+import datetime
+import json
+import platform
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from app import urls
+from app.benchmarks import backends, datagen, runner
+from app.benchmarks.routes import MONGOMOCK_SKIPS, SPECS, route_names
+from app.db import connections
+from app.indexes import ensure_indexes
+from app.views import VALID_CLASS_GRADES
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed deterministic scale data and benchmark every route in app/urls.py "
+        "(p50/p95/p99 latency, allocations), optionally against a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(datagen.SCALES, key=datagen.SCALES.get), default="1k",
+                            help="Data volume, as the number of submissions (default 1k).")
+        parser.add_argument("--seed", type=int, default=42, help="Data generator seed (default 42).")
+        backends.add_arguments(parser)
+        parser.add_argument("--route", action="append", dest="routes", help="Only benchmark this URL name (repeatable).")
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per route (default 50).")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per route first (default 5).")
+        parser.add_argument("--alloc-samples", type=int, default=3,
+                            help="Extra requests per route traced with tracemalloc (default 3, 0 to skip).")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="Compare against a previous --output file.")
+        parser.add_argument("--threshold", type=float, default=0.10,
+                            help="Relative slowdown counted as a regression (default 0.10).")
+        parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Exit with an error when a route regressed beyond --threshold.")
+
+    def handle(self, *args, **options):
+        names = route_names(urls.urlpatterns)
+        missing = [name for name in names if name not in SPECS]
+        if missing:
+            raise CommandError("No benchmark spec for: " + ", ".join(missing) + " (add one to app/benchmarks/routes.py)")
+        if options["routes"]:
+            unknown = [name for name in options["routes"] if name not in names]
+            if unknown:
+                raise CommandError("Unknown routes: " + ", ".join(unknown))
+            names = options["routes"]
+        skipped = {}
+        if options["backend"] == "mongomock":
+            skipped = {name: MONGOMOCK_SKIPS[name] for name in names if name in MONGOMOCK_SKIPS}
+            for name, reason in skipped.items():
+                self.stdout.write(self.style.WARNING(f"Skipping {name} on mongomock: {reason}"))
+            names = [name for name in names if name not in skipped]
+
+        db = backends.connect(options)
+        connections.use(db, backends.redis_client(options))
+
+        scale = datagen.SCALES[options["scale"]]
+        start = datetime.datetime.now()
+        fixture = datagen.generate(db, VALID_CLASS_GRADES, scale, options["seed"])
+        if options["backend"] == "mongod":
+            ensure_indexes(db)
+        self.stdout.write(f"Seeded {fixture.counts} in {(datetime.datetime.now() - start).total_seconds():.1f}s")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<32} p50 {result['p50_ms']:9.2f}  p95 {result['p95_ms']:9.2f}  p99 {result['p99_ms']:9.2f} ms  "
+                f"{result.get('alloc_peak_kib', 0):9.1f} KiB  {result['statuses']}"
+            )
+
+        with tempfile.TemporaryDirectory() as drive_root, override_settings(
+            ALLOWED_HOSTS=["testserver"], SUBMISSION_STORAGE="fake", FAKE_DRIVE_ROOT=drive_root,
+            ASYNC_SUBMISSIONS=False, LEGACY_LIST_RESPONSES=True,
+        ):
+            ctx = runner.RunContext(db, fixture)
+            results = runner.run(Client(), ctx, names, options["iterations"], options["warmup"],
+                                 options["alloc_samples"], progress)
+
+        report = {
+            "meta": {
+                "created_at": start.isoformat(timespec="seconds"),
+                "scale": options["scale"],
+                "seed": options["seed"],
+                "backend": options["backend"],
+                "redis": "fakeredis" if options["fake_redis"] else "configured",
+                "iterations": options["iterations"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "counts": fixture.counts,
+                "skipped": skipped,
+            },
+            "routes": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            self.compare(report, options)
+
+    def compare(self, report, options):
+        with open(options["baseline"]) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("scale") != report["meta"]["scale"]:
+            self.stderr.write(self.style.WARNING("Baseline was recorded at a different scale"))
+
+        rows, regressions = runner.compare(report["routes"], baseline, options["threshold"])
+        for name, metric, old, new, change in rows:
+            line = f"{name:<32} {metric:<7} {old:9.2f} -> {new:9.2f} ms  {change:+7.1%}"
+            if change > options["threshold"]:
+                self.stdout.write(self.style.ERROR(line))
+            elif change < -options["threshold"]:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} latency regressions above {options['threshold']:.0%}")
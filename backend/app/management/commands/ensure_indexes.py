@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure
+
+from app.db import connect_to_mongo
+from app.indexes import DUPLICATES_SHOWN, INDEXES, duplicate_keys, ensure_indexes, explain_canonical_queries
+
+
+class Command(BaseCommand):
+    help = "Create the MongoDB indexes declared in app/indexes.py and verify no view query does a COLLSCAN."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--collection", action="append", choices=sorted(INDEXES),
+            help="Only create indexes for this collection (repeatable).",
+        )
+        parser.add_argument(
+            "--skip-explain", action="store_true",
+            help="Create indexes without verifying the query plans.",
+        )
+
+    def handle(self, *args, **options):
+        db = connect_to_mongo()
+
+        for name in options["collection"] or INDEXES:
+            try:
+                index_names = ensure_indexes(db, [name])[name]
+            except OperationFailure as e:  # DuplicateKeyError included
+                duplicates = duplicate_keys(db, name)
+                if not duplicates:
+                    raise CommandError(f"{name}: {e}")
+                for index, values, count in duplicates:
+                    self.stderr.write(self.style.ERROR(f"{name}.{index}: {', '.join(map(str, values))} ({count} documents)"))
+                raise CommandError(
+                    f"{name} has duplicates of a unique key (listed above, at most {DUPLICATES_SHOWN} per index); "
+                    "remove or rename them and run ensure_indexes again."
+                )
+            self.stdout.write(f"{name}: {', '.join(index_names)}")
+        self.stdout.write(self.style.SUCCESS("Indexes are in place."))
+
+        if options["skip_explain"]:
+            return
+
+        failures = []
+        for canonical, stages in explain_canonical_queries(db):
+            plan = " -> ".join(stages)
+            if "COLLSCAN" in stages:
+                failures.append(canonical)
+                self.stderr.write(self.style.ERROR(f"COLLSCAN  {canonical.view}: {plan}"))
+            elif "SORT" in stages:
+                self.stdout.write(self.style.WARNING(f"SORT      {canonical.view}: {plan}"))
+            else:
+                self.stdout.write(f"ok        {canonical.view}: {plan}")
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} view queries would scan the whole collection: "
+                + ", ".join(c.view for c in failures)
+            )
+        self.stdout.write(self.style.SUCCESS("All canonical queries use an index."))
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.bulk_import import FORMATS, DEFAULT_CHUNK_SIZE, detect_format, iter_rows, import_students
+from app.db import connect_to_mongo
+from app.indexes import ensure_indexes
+from app.views import VALID_CLASS_GRADES
+
+
+class Command(BaseCommand):
+    help = "Bulk import students from a CSV (with header) or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File with name, username, password and class_grade per row.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per insert_many.")
+        parser.add_argument("--report", metavar="PATH", help="Write the full per-row report as JSON.")
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options["path"], options["format"])
+        if fmt is None:
+            raise CommandError("Cannot tell the file format, pass --format csv|jsonl")
+
+        ensure_indexes(connect_to_mongo(), ["students"])  # Duplicates are detected by the unique username index
+
+        try:
+            with open(options["path"], "rb") as stream:
+                report = import_students(iter_rows(stream, fmt), VALID_CLASS_GRADES, max(1, options["chunk_size"]))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if options["report"]:
+            with open(options["report"], "w") as out:
+                json.dump(report, out, indent=2)
+
+        for entry in report["duplicates"]:
+            self.stdout.write(self.style.WARNING(f"row {entry['row']}: duplicate username {entry['username']}"))
+        for entry in report["invalid"]:
+            self.stdout.write(self.style.ERROR(f"row {entry['row']}: {entry['error']}"))
+
+        summary = report["summary"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {summary['inserted']}, duplicates {summary['duplicates']}, invalid {summary['invalid']}"
+        ))
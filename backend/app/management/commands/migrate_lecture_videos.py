@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.cache import bump_version
+from app.db import connect_to_mongo
+from app.indexes import ensure_indexes
+from app.lecture_videos import VIDEOS_COLLECTION, merge_duplicate_chapters, migrate_chapter
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the videos embedded in videos_lectures chapter documents to the per-video "
+        "lecture_videos collection. Runs online and can be interrupted and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--class", dest="class_name", help="Only migrate the chapters of this class.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Chapters read per batch (default 100).")
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="Seconds to sleep between batches, to go easy on a busy cluster.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the chapters left to migrate.")
+
+    def handle(self, *args, **options):
+        db = connect_to_mongo()
+        query = {"videos.0": {"$exists": True}}
+        if options["class_name"]:
+            query["class"] = options["class_name"]
+
+        if options["dry_run"]:
+            self.stdout.write(f"{db.videos_lectures.count_documents(query)} chapters still have embedded videos.")
+            return
+
+        merged = merge_duplicate_chapters(db)
+        if merged:
+            self.stdout.write(f"Merged {merged} duplicate chapter documents")
+        # The unique indexes must exist before any video is moved
+        ensure_indexes(db, ["videos_lectures", VIDEOS_COLLECTION])
+
+        start = time.perf_counter()
+        chapters = videos = 0
+        last_id = None
+        while True:
+            batch_query = {**query, "_id": {"$gt": last_id}} if last_id else query
+            batch = list(db.videos_lectures.find(batch_query, {"class": 1}).sort("_id", 1).limit(options["batch_size"]))
+            if not batch:
+                break
+            for chapter in batch:
+                moved = migrate_chapter(db, chapter["_id"])
+                if moved:
+                    chapters += 1
+                    videos += moved
+                    bump_version("videos_lectures", chapter.get("class"))
+            last_id = batch[-1]["_id"]
+            self.stdout.write(f"{chapters} chapters, {videos} videos moved so far")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        left = db.videos_lectures.count_documents(query)
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {videos} videos from {chapters} chapters in {time.perf_counter() - start:.2f}s; "
+            f"{left} chapters keep embedded videos (ones without a name or repeating a name in their chapter)."
+        ))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from app.cache import bump_version
+from app.db import connect_to_mongo
+from app.timetable import InvalidSlot, normalize
+
+
+class Command(BaseCommand):
+    help = (
+        "Give schedule documents created before conflict detection their canonical day/times "
+        "and start_minute/end_minute, and report the overlapping slots per class."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Re-normalize every document, not only the ones without start_minute.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        schedules = connect_to_mongo().schedules
+        query = {} if options["all"] else {"start_minute": {"$exists": False}}
+
+        ops, classes, invalid = [], set(), 0
+        for doc in schedules.find(query, {"class_grade": 1, "day": 1, "start_time": 1, "end_time": 1}):
+            try:
+                slot = normalize(doc.get("day"), doc.get("start_time"), doc.get("end_time"))
+            except InvalidSlot as e:
+                invalid += 1
+                self.stdout.write(self.style.WARNING(f"{doc['_id']} ({doc.get('class_grade')}): {e}"))
+                continue
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": slot}))
+            classes.add(doc.get("class_grade"))
+            if len(ops) >= options["batch_size"]:
+                schedules.bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            schedules.bulk_write(ops, ordered=False)
+
+        for class_grade in classes:
+            bump_version("schedules", class_grade)  # Cached schedules and timetables reload
+
+        overlaps = 0
+        previous = {}
+        for slot in schedules.find({"start_minute": {"$exists": True}}).sort([("class_grade", 1), ("start_minute", 1)]):
+            before = previous.get(slot.get("class_grade"))
+            if before is not None and before["end_minute"] > slot["start_minute"]:
+                overlaps += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{slot.get('class_grade')}: {before.get('subject')} {before['day']} {before['start_time']}-"
+                    f"{before['end_time']} overlaps {slot.get('subject')} {slot['start_time']}-{slot['end_time']} "
+                    f"({before['_id']}, {slot['_id']})"
+                ))
+            if before is None or slot["end_minute"] > before["end_minute"]:
+                previous[slot.get("class_grade")] = slot
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Normalized schedules in {len(classes)} classes; {invalid} invalid, {overlaps} overlapping pairs."
+        ))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.storage import LocalFakeDriveStorage, get_storage_backend
+from app.submission_worker import drain_spool, release_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Upload spooled assignment submissions to the storage backend (Google Drive)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the spool once and exit.")
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent uploads.")
+        parser.add_argument("--max-attempts", type=int, default=5, help="Upload attempts per file.")
+        parser.add_argument("--backoff", type=float, default=2.0, help="Base retry delay in seconds.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between spool scans.")
+        parser.add_argument("--stale-after", type=float, default=600,
+                            help="Re-queue jobs claimed longer than this many seconds ago.")
+        parser.add_argument("--fake-drive", metavar="DIR",
+                            help="Upload into a local fake Drive under DIR instead of Google Drive.")
+
+    def handle(self, *args, **options):
+        if options["fake_drive"]:
+            storage = LocalFakeDriveStorage(options["fake_drive"])
+        else:
+            storage = get_storage_backend()
+
+        while True:
+            released = release_stale_jobs(options["stale_after"])
+            if released:
+                self.stdout.write(f"Re-queued {released} stale jobs")
+
+            succeeded, failed = drain_spool(
+                storage, workers=options["workers"],
+                max_attempts=options["max_attempts"], backoff=options["backoff"],
+            )
+            if succeeded or failed:
+                self.stdout.write(f"Uploaded {succeeded} submissions, {failed} failed")
+
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,136 @@
+# app/metrics.py
+# Minimal in-process metrics registry (counters and histograms with labels).
+# Kept dependency-free and cheap: one dict lookup + a lock per observation.
+# render() serves everything in the Prometheus text format (GET /metrics).
+# The registry is per process: with several gunicorn workers each one reports
+# its own numbers, so scrape every worker (or run one) rather than the load balancer.
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers pool checkouts (sub-ms) up to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+_collectors = []
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name, help_text):
+    _help[name] = help_text
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def snapshot():
+    """ Copy of every metric: {"counters": {(name, labels): value}, "histograms": {...}} """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {
+                key: {"buckets": h.buckets, "counts": list(h.counts), "sum": h.sum, "count": h.count}
+                for key, h in _histograms.items()
+            },
+            "help": dict(_help),
+        }
+
+
+def register_collector(collect, kind="gauge"):
+    """ Values read at scrape time: collect() returns [(name, labels dict, value), ...] """
+    _collectors.append((collect, kind))
+    return collect
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    """ Every metric in the Prometheus text exposition format (version 0.0.4) """
+    data = snapshot()
+    families = {}  # name -> (type, sample lines)
+
+    for (name, labels), value in sorted(data["counters"].items(), key=str):
+        families.setdefault(name, ("counter", []))[1].append(f"{name}{_labels(labels)} {_number(value)}")
+
+    for (name, labels), h in sorted(data["histograms"].items(), key=str):
+        lines = families.setdefault(name, ("histogram", []))[1]
+        cumulative = 0
+        for bound, count in zip(h["buckets"] + (float("inf"),), h["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(h['sum'])}")
+        lines.append(f"{name}_count{_labels(labels)} {h['count']}")
+
+    for collect, kind in list(_collectors):
+        try:
+            samples = list(collect())
+        except Exception as e:  # A broken collector must not take the whole endpoint down
+            logger.exception("Metrics collector %s failed: %s", collect.__name__, e)
+            continue
+        for name, labels, value in samples:
+            families.setdefault(name, (kind, []))[1].append(
+                f"{name}{_labels(sorted(labels.items()))} {_number(value)}"
+            )
+
+    out = []
+    for name in sorted(families):
+        kind, lines = families[name]
+        if name in data["help"]:
+            out.append(f"# HELP {name} {data['help'][name]}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,136 @@
+# app/pagination.py
+import base64
+import binascii
+
+from bson import json_util
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc, sort_field):
+    """ Build an opaque cursor pointing just after `doc` """
+    key = [doc.get(sort_field), doc["_id"]] if sort_field != "_id" else [doc["_id"]]
+    raw = json_util.dumps(key).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """ Reverse of encode_cursor, raises InvalidCursor on garbage """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(key, list) or len(key) not in (1, 2):
+        raise InvalidCursor("Invalid cursor.")
+    return key
+
+
+def legacy_list_mode(request):
+    """
+    True when the client should get the old unpaginated list.
+    Controlled by settings.LEGACY_LIST_RESPONSES so the admin and mobile apps
+    keep working until they send `limit`/`cursor`.
+    """
+    params = request.query_params
+    if "limit" in params or "cursor" in params:
+        return False
+    return getattr(settings, "LEGACY_LIST_RESPONSES", True)
+
+
+def get_page_size(request):
+    raw = request.query_params.get("limit")
+    if raw in (None, ""):
+        return getattr(settings, "DEFAULT_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    limit = int(raw)  # ValueError handled by caller
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, getattr(settings, "MAX_PAGE_SIZE", MAX_PAGE_SIZE))
+
+
+def keyset_filter(query, key, sort_field, direction):
+    """ Add the "after this cursor" condition to a Mongo filter """
+    op = "$gt" if direction == ASCENDING else "$lt"
+    if sort_field == "_id":
+        after = {"_id": {op: key[0]}}
+    else:
+        value, last_id = key
+        after = {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: last_id}},
+        ]}
+    return {"$and": [query, after]} if query else after
+
+
+def fetch_page(collection, query, limit, cursor=None, sort_field="_id",
+               direction=ASCENDING, projection=None):
+    """
+    Return (docs, next_cursor) for one page of `collection`.
+    Sorting is always on (sort_field, _id) so the order is total and the
+    cursor can resume without skip().
+    """
+    mongo_filter = query
+    if cursor:
+        mongo_filter = keyset_filter(query, decode_cursor(cursor), sort_field, direction)
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    if projection is not None and sort_field not in projection:
+        projection = {**projection, sort_field: 1}  # The cursor is built from it
+
+    # Fetch one extra document to know if there is a next page
+    docs = list(collection.find(mongo_filter, projection).sort(sort).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+
+def count_documents(collection, query):
+    """ Cheap total: collection metadata when unfiltered, otherwise an index count """
+    if not query:
+        return collection.estimated_document_count()
+    return collection.count_documents(query)
+
+
+def paginated_response(request, collection, query, format_doc, sort_field="_id",
+                       direction=ASCENDING, projection=None):
+    """
+    Serve a keyset-paginated page, or return None when the request should get
+    the legacy unpaginated list.
+    """
+    if legacy_list_mode(request):
+        return None
+
+    try:
+        limit = get_page_size(request)
+    except ValueError:
+        return Response({"error": "Invalid limit."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        docs, next_cursor = fetch_page(
+            collection, query, limit,
+            cursor=request.query_params.get("cursor"),
+            sort_field=sort_field, direction=direction, projection=projection,
+        )
+    except InvalidCursor as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    body = {
+        "results": [format_doc(doc) for doc in docs],
+        "next_cursor": next_cursor,
+    }
+    if request.query_params.get("include_count") in ("1", "true", "True"):
+        body["count"] = count_documents(collection, query)
+
+    return Response(body, status=status.HTTP_200_OK)
+
@@ -0,0 +1,52 @@
+# app/projection.py
+# Sparse fieldsets: `?fields=a,b,c` on list/detail views.
+# Each view declares a FieldSet mapping the response field names it may return
+# to the Mongo fields they are built from, plus a lean default. The selection is
+# validated against that allowlist and pushed down to Mongo as a projection, so
+# fields nobody asked for never leave the database.
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class FieldSet:
+    def __init__(self, allowed, default=None):
+        # allowed: response field -> Mongo field (or tuple of Mongo fields)
+        self.allowed = allowed
+        self.default = tuple(default or allowed)
+
+    def parse(self, params):
+        """ Requested response fields from `params` (query dict), default when absent """
+        raw = params.get("fields")
+        if not raw:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+        if not names:
+            raise InvalidFields("No fields requested.")
+        unknown = [name for name in names if name not in self.allowed]
+        if unknown:
+            raise InvalidFields("Unknown fields: " + ", ".join(unknown) + ". Allowed: " + ", ".join(self.allowed))
+        return names
+
+    def projection(self, names):
+        """ Mongo projection for the response fields `names` (always includes _id) """
+        projection = {"_id": 1}
+        for name in names:
+            sources = self.allowed[name]
+            for source in (sources if isinstance(sources, tuple) else (sources,)):
+                projection[source] = 1
+        return projection
+
+    def resolve(self, params, format_doc):
+        """ (projection, formatter) for a request, raises InvalidFields """
+        names = self.parse(params)
+        return self.projection(names), select_fields(format_doc, names)
+
+
+def select_fields(format_doc, names):
+    """ Wrap a formatter so it only returns the requested response fields """
+    def formatter(doc):
+        formatted = format_doc(doc)
+        return {name: formatted[name] for name in names if name in formatted}
+    return formatter
@@ -0,0 +1,101 @@
+# app/renderers.py
+# JSON output for Mongo documents.
+#
+# ObjectId, datetime and Binary are encoded natively while the document is
+# serialized, so views can hand raw documents to Response / MongoJsonResponse
+# instead of converting every field in a Python loop first. orjson is used when
+# installed (`pip install orjson`), otherwise the stdlib encoder with the same output.
+import base64
+import datetime
+import json
+import time
+
+from bson import ObjectId, Binary, Decimal128
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback = JSONEncoder()
+
+metrics.describe("json_serialize_seconds", "Time spent encoding response bodies to JSON")
+
+
+def mongo_default(obj):
+    """ Encode the BSON / Python types json can't handle; anything else goes to DRF's encoder """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, (Binary, bytes)):
+        return base64.b64encode(obj).decode()
+    if isinstance(obj, Decimal128):
+        return str(obj)
+    return _fallback.default(obj)
+
+
+class MongoJSONEncoder(json.JSONEncoder):
+    """ json.JSONEncoder for code that needs an encoder class (e.g. indented browsable API output) """
+
+    def default(self, obj):
+        return mongo_default(obj)
+
+
+def dumps(data):
+    """ Compact UTF-8 JSON bytes for `data` in one pass """
+    if orjson is not None:
+        return orjson.dumps(data, default=mongo_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=mongo_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def timed_dumps(data):
+    """ dumps() for whole response bodies, recorded in json_serialize_seconds (not used per streamed line) """
+    start = time.perf_counter()
+    body = dumps(data)
+    metrics.observe("json_serialize_seconds", time.perf_counter() - start)
+    return body
+
+
+class MongoJSONRenderer(JSONRenderer):
+    """ Default DRF renderer: same output as JSONRenderer, but BSON-aware and orjson-backed """
+    encoder_class = MongoJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return timed_dumps(data)
+
+
+class MongoJsonResponse(HttpResponse):
+    """ JsonResponse counterpart for plain Django views, using the same encoder """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=timed_dumps(data), **kwargs)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON (one document per line).
+    Selected when the client sends `Accept: application/x-ndjson`; list views then
+    stream their cursor instead of building a list (see app/streaming.py).
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return b"".join(dumps(item) + b"\n" for item in items)
@@ -0,0 +1,169 @@
+# app/rollups.py
+# Submission counts per (class_grade, assignment_title, status), kept in the
+# `submission_rollups` collection so analytics read O(groups) documents instead
+# of counting every submission.
+#
+# Every write path adjusts the counts with atomic $inc upserts right after its own
+# write (see views.py and submission_worker.py). Bulk writes go one rollup group at
+# a time, each update/delete also matching the group it was counted in, so its
+# modified/deleted count is exactly what left that group even when other writes
+# race with it. (A single bulk_write would save the round trips, but its result
+# only has totals, not what each group lost.) An id list is split by group, so
+# every id is sent once. `manage.py rebuild_rollups` (a single $group ... $out)
+# builds the counts for existing data and repairs them after a failed $inc.
+import logging
+
+from collections import Counter
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "submission_rollups"
+GROUP_FIELDS = ("class_grade", "assignment_title", "status")
+
+
+def group_of(submission):
+    """ Rollup group of a submission document (needs the GROUP_FIELDS) """
+    return tuple(submission.get(field) for field in GROUP_FIELDS)
+
+
+def apply(db, deltas):
+    """ $inc every group in {group: delta} in one round trip; errors are logged, not raised """
+    ops = [
+        UpdateOne(dict(zip(GROUP_FIELDS, group)), {"$inc": {"count": delta}}, upsert=True)
+        for group, delta in deltas.items() if delta
+    ]
+    if not ops:
+        return
+    try:
+        db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:  # Whatever goes wrong, the write that was counted already happened
+        logger.error("Failed to update submission rollups (%s); run `manage.py rebuild_rollups`", e)
+
+
+def record_insert(db, submission):
+    apply(db, {group_of(submission): 1})
+
+
+def record_delete(db, submission):
+    apply(db, {group_of(submission): -1})
+
+
+def status_change_deltas(counts, new_status):
+    """ (deltas, moved) for setting the status of the submissions in {group: count} to `new_status` """
+    deltas, moved = Counter(), 0
+    for (class_grade, title, status), count in counts.items():
+        if status != new_status:
+            deltas[(class_grade, title, status)] -= count
+            deltas[(class_grade, title, new_status)] += count
+            moved += count
+    return deltas, moved
+
+
+def record_status_change(db, before, new_status):
+    """ `before` is the submission as it was before its status was set to `new_status` """
+    apply(db, status_change_deltas({group_of(before): 1}, new_status)[0])
+
+
+def group_counts(collection, query):
+    """ {group: number of submissions} matching `query` (the deltas of a bulk write) """
+    pipeline = [
+        {"$match": query},
+        {"$group": {"_id": {field: f"${field}" for field in GROUP_FIELDS}, "count": {"$sum": 1}}},
+    ]
+    return {
+        tuple(doc["_id"].get(field) for field in GROUP_FIELDS): doc["count"]
+        for doc in collection.aggregate(pipeline)
+    }
+
+
+def group_query(query, group):
+    """ `query` narrowed to the submissions of one rollup group """
+    return {"$and": [query, dict(zip(GROUP_FIELDS, group))]}
+
+
+def split_by_group(collection, query):
+    """
+    (group, submissions, query narrowed to that group) for every group matching `query`.
+    An {"_id": {"$in": ids}} query is narrowed to the ids of each group instead of
+    repeating the whole list for every group.
+    """
+    by_ids = set(query) == {"_id"}
+    group_stage = {"_id": {field: f"${field}" for field in GROUP_FIELDS}, "count": {"$sum": 1}}
+    if by_ids:
+        group_stage["ids"] = {"$push": "$_id"}  # At most MAX_BULK_IDS of them
+    for doc in collection.aggregate([{"$match": query}, {"$group": group_stage}]):
+        group = tuple(doc["_id"].get(field) for field in GROUP_FIELDS)
+        yield group, doc["count"], group_query({"_id": {"$in": doc["ids"]}} if by_ids else query, group)
+
+
+def bulk_set_status(collection, query, new_status):
+    """ Set the status of the submissions matching `query`; (matched, {group: submissions that left it}) """
+    matched, moved = 0, {}
+    for group, count, narrowed in split_by_group(collection, query):
+        if group[2] == new_status:
+            matched += count  # Nothing to write
+            continue
+        result = collection.update_many(narrowed, {"$set": {"status": new_status}})
+        matched += result.matched_count
+        if result.modified_count:
+            moved[group] = result.modified_count
+    return matched, moved
+
+
+def bulk_delete(collection, query):
+    """ Delete the submissions matching `query`; {group: submissions deleted from it} """
+    removed = {}
+    for group, _count, narrowed in split_by_group(collection, query):
+        deleted = collection.delete_many(narrowed).deleted_count
+        if deleted:
+            removed[group] = deleted
+    return removed
+
+
+def rebuild_pipeline():
+    """ Recompute every group from the submissions and replace the rollup collection (indexes are kept) """
+    return [
+        {"$group": {"_id": {field: f"${field}" for field in GROUP_FIELDS}, "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, **{field: f"$_id.{field}" for field in GROUP_FIELDS}, "count": 1}},
+        {"$out": ROLLUP_COLLECTION},
+    ]
+
+
+def rebuild(db):
+    """ Returns the number of groups written """
+    db.submissions.aggregate(rebuild_pipeline())
+    return db[ROLLUP_COLLECTION].count_documents({})
+
+
+def summary(db, class_grade=None, assignment_title=None):
+    """ Totals by status, by class and per assignment from the rollups """
+    query = {"count": {"$gt": 0}}
+    if class_grade:
+        query["class_grade"] = class_grade
+    if assignment_title:
+        query["assignment_title"] = assignment_title
+
+    total = 0
+    by_status, by_class, assignments = Counter(), Counter(), {}
+    for doc in db[ROLLUP_COLLECTION].find(query, {"_id": 0}):
+        grade, title, state, count = doc.get("class_grade"), doc.get("assignment_title"), doc.get("status"), doc["count"]
+        total += count
+        by_status[state] += count
+        by_class[grade] += count
+        entry = assignments.setdefault((grade, title), {
+            "class_grade": grade, "assignment_title": title, "total": 0, "by_status": Counter(),
+        })
+        entry["total"] += count
+        entry["by_status"][state] += count
+
+    return {
+        "total": total,
+        "by_status": dict(by_status),
+        "by_class": dict(by_class),
+        "assignments": sorted(
+            ({**entry, "by_status": dict(entry["by_status"])} for entry in assignments.values()),
+            key=lambda entry: (str(entry["class_grade"]), str(entry["assignment_title"])),
+        ),
+    }
@@ -0,0 +1,41 @@
+# app/search.py
+# Full-text search over student queries and assignments.
+#
+# Both collections have a text index (app/indexes.py), so a search only reads
+# the index entries of its terms instead of scanning the collection. Results are
+# ranked by textScore and paginated with the same opaque cursors as the list
+# views (app/pagination.py), keyed on (score, _id) instead of a skip offset.
+from pymongo import DESCENDING
+
+from .pagination import decode_cursor, encode_cursor, keyset_filter
+
+MAX_TERMS_LENGTH = 200
+
+
+def search_pipeline(terms, class_grade, projection, limit, cursor=None):
+    """ Best matches first; `projection` is the FieldSet projection of the view """
+    match = {"$text": {"$search": terms}}
+    if class_grade:
+        match["class_grade"] = class_grade  # Suffix key of the text index, filtered inside the index
+
+    pipeline = [
+        {"$match": match},
+        {"$project": {**projection, "score": {"$meta": "textScore"}}},
+    ]
+    if cursor:
+        pipeline.append({"$match": keyset_filter({}, decode_cursor(cursor), "score", DESCENDING)})
+    pipeline += [
+        {"$sort": {"score": DESCENDING, "_id": DESCENDING}},
+        {"$limit": limit + 1},  # One extra to know if there is a next page
+    ]
+    return pipeline
+
+
+def search_page(collection, terms, class_grade, projection, limit, cursor=None):
+    """ (docs, next_cursor) for one page of results; raises InvalidCursor """
+    docs = list(collection.aggregate(search_pipeline(terms, class_grade, projection, limit, cursor)))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], "score")
+    return docs, next_cursor
@@ -0,0 +1,299 @@
+# app/slow_queries.py
+# Slow MongoDB operation log.
+#
+# SlowQueryListener watches the command stream of the Mongo clients (app/db.py,
+# app/async_db.py). A find / aggregate / update / delete slower than
+# settings.SLOW_QUERY_MS is recorded with its filter shape (every literal
+# replaced by "?"), duration, documents returned and the Django view that issued
+# it. Entries are written by a background thread to the capped `slow_queries`
+# collection with an explain("executionStats") summary for the docs and keys
+# examined, taken at most once per shape per SLOW_QUERY_EXPLAIN_INTERVAL (entries in
+# between have none). GET /api/admin/slow-queries/ lists the worst shapes.
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from . import metrics
+from .indexes import plan_stages
+
+logger = logging.getLogger(__name__)
+
+LOG_COLLECTION = "slow_queries"
+WATCHED_COMMANDS = {"find", "aggregate", "update", "delete"}
+# Session / transaction fields that explain does not accept
+NOT_EXPLAINABLE = {"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern", "readConcern"}
+QUEUE_SIZE = 1000
+
+SETTING_DEFAULTS = {
+    "SLOW_QUERY_MS": 0,  # 0 disables the recorder
+    "SLOW_QUERY_EXPLAIN": True,
+    "SLOW_QUERY_EXPLAIN_INTERVAL": 600,
+    "SLOW_QUERY_LOG_BYTES": 16 * 1024 * 1024,
+}
+
+metrics.describe("slow_queries_total", "MongoDB operations slower than SLOW_QUERY_MS")
+metrics.describe("slow_queries_dropped_total", "Slow-query entries dropped because the writer queue was full")
+
+# Set by the metrics middleware for the duration of a request (contextvars also follow async views)
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def get_setting(name):
+    from django.conf import settings
+    if settings.configured:
+        return getattr(settings, name, SETTING_DEFAULTS[name])
+    return SETTING_DEFAULTS[name]
+
+
+def threshold_ms():
+    return get_setting("SLOW_QUERY_MS")
+
+
+def current_view():
+    """ Dotted name of the view handling the current request, or "" outside a request """
+    request = current_request.get()
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return ""
+    view = getattr(match.func, "view_class", match.func)
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+def redact(value):
+    """ Shape of a filter / pipeline: keys, operators and $field references kept, literals replaced by "?" """
+    if isinstance(value, dict):
+        return {key: (spec if key in ("$sort", "sort") else redact(spec)) for key, spec in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(item) for item in value]
+        if all(item == "?" for item in items):
+            return ["?"] if items else []  # `$in: [a, b, c]` and `$in: [a]` are the same shape
+        return items
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def command_shape(command_name, command):
+    """ The parts of a command that decide its plan, redacted """
+    if command_name == "find":
+        shape = {"filter": redact(command.get("filter", {}))}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+        return shape
+    if command_name == "aggregate":
+        return {"pipeline": redact(command.get("pipeline", []))}
+    if command_name == "update":
+        updates = command.get("updates") or [{}]
+        return {"filter": redact(updates[0].get("q", {})), "multi": bool(updates[0].get("multi")),
+                "statements": len(updates)}
+    if command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return {"filter": redact(deletes[0].get("q", {})), "statements": len(deletes)}
+    return {}
+
+
+def docs_returned(command_name, reply):
+    """ Documents in the first batch (reads) or matched (writes) """
+    if not reply:
+        return None
+    if command_name in ("find", "aggregate"):
+        return len(reply.get("cursor", {}).get("firstBatch", []))
+    return reply.get("n")
+
+
+def explain_command(command_name, command):
+    """ The original command made explainable (writes are explained one statement at a time) """
+    cmd = {key: value for key, value in command.items() if not key.startswith("$") and key not in NOT_EXPLAINABLE}
+    if command_name == "update":
+        cmd["updates"] = cmd.get("updates", [])[:1]
+    elif command_name == "delete":
+        cmd["deletes"] = cmd.get("deletes", [])[:1]
+    return cmd
+
+
+def explain_summary(explain):
+    stats = explain.get("executionStats", {})
+    planner = explain.get("queryPlanner", {})
+    if not planner and explain.get("stages"):  # aggregate: the plan sits in the $cursor stage
+        planner = explain["stages"][0].get("$cursor", {}).get("queryPlanner", {})
+        stats = explain["stages"][0].get("$cursor", {}).get("executionStats", stats)
+    return {
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "plan_returned": stats.get("nReturned"),
+        "plan_stages": sorted(set(plan_stages(planner.get("winningPlan", {})))),
+    }
+
+
+class SlowQueryRecorder:
+    """
+    Background writer for slow-query entries, one per process.
+    The listener only enqueues, so a slow (or down) log collection never adds
+    latency to the request that triggered it; entries are dropped when the queue is full.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self._explained = {}  # shape_hash -> last explain time
+        self._collection = None
+
+    def submit(self, entry, command, database):
+        with self._lock:
+            if self._pid != os.getpid():  # First entry in this process (or after a fork)
+                self._queue = queue.Queue(QUEUE_SIZE)
+                self._collection = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(self._queue,), name="slow-query-writer", daemon=True).start()
+        try:
+            self._queue.put_nowait((entry, command, database))
+        except queue.Full:
+            metrics.inc("slow_queries_dropped_total")
+
+    def _run(self, entries):
+        while True:
+            entry, command, database = entries.get()
+            try:
+                self.write(entry, command, database())
+            except Exception as e:  # Keep the writer alive; the entry is lost
+                logger.warning("Failed to record slow query: %s", e)
+
+    def _should_explain(self, shape_hash):
+        if not get_setting("SLOW_QUERY_EXPLAIN"):
+            return False
+        now = time.monotonic()
+        last = self._explained.get(shape_hash)
+        if last is not None and now - last < get_setting("SLOW_QUERY_EXPLAIN_INTERVAL"):
+            return False
+        self._explained[shape_hash] = now
+        return True
+
+    def write(self, entry, command, db):
+        if self._should_explain(entry["shape_hash"]):
+            try:
+                explain = db.command("explain", explain_command(entry["command"], command), verbosity="executionStats")
+                entry.update(explain_summary(explain))
+            except PyMongoError as e:
+                entry["explain_error"] = str(e)
+        if self._collection is None:
+            self._collection = log_collection(db)
+        self._collection.insert_one(entry)
+
+
+def log_collection(db):
+    """ The capped slow_queries collection, created on first use """
+    if LOG_COLLECTION not in db.list_collection_names(filter={"name": LOG_COLLECTION}):
+        try:
+            db.create_collection(LOG_COLLECTION, capped=True, size=get_setting("SLOW_QUERY_LOG_BYTES"))
+        except CollectionInvalid:  # Created by another worker in the meantime
+            pass
+    return db[LOG_COLLECTION]
+
+
+recorder = SlowQueryRecorder()
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Command listener feeding the recorder.
+    `database` returns the (sync) database the log is written to; it is only
+    called from the writer thread.
+    """
+
+    def __init__(self, database, threshold=None):
+        self.database = database
+        self.threshold = (threshold if threshold is not None else threshold_ms()) / 1000
+        self._started = {}
+
+    def started(self, event):
+        if event.command_name not in WATCHED_COMMANDS:
+            return
+        if event.command.get(event.command_name) == LOG_COLLECTION:  # Never log our own writes
+            return
+        self._started[(event.request_id, event.connection_id)] = (event.command, current_view())
+
+    def _finish(self, event, reply=None, error=None):
+        started = self._started.pop((event.request_id, event.connection_id), None)
+        if started is None:
+            return
+        duration = event.duration_micros / 1e6
+        if duration < self.threshold:
+            return
+
+        command, view = started
+        shape = json.dumps(command_shape(event.command_name, command), sort_keys=True, default=str)
+        entry = {
+            "ts": datetime.now(timezone.utc),
+            "command": event.command_name,
+            "collection": command.get(event.command_name),
+            "database": event.database_name,
+            "view": view,
+            "duration_ms": round(duration * 1000, 3),
+            "shape": shape,
+            "shape_hash": hashlib.sha1(f"{event.command_name}:{command.get(event.command_name)}:{shape}".encode()).hexdigest(),
+            "docs_returned": docs_returned(event.command_name, reply),
+        }
+        if error is not None:
+            entry["error"] = error
+        metrics.inc("slow_queries_total", command=event.command_name, collection=entry["collection"])
+        recorder.submit(entry, command, self.database)
+
+    def succeeded(self, event):
+        self._finish(event, reply=event.reply)
+
+    def failed(self, event):
+        self._finish(event, error=str(event.failure.get("errmsg", event.failure)))
+
+
+def top_offenders(db, limit=20, collection=None, view=None):
+    """ Shapes ordered by total time spent in them """
+    match = {}
+    if collection:
+        match["collection"] = collection
+    if view:
+        match["view"] = view
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"ts": 1}},  # so $last picks the newest entry of each shape
+        {"$group": {
+            "_id": "$shape_hash",
+            "command": {"$last": "$command"},
+            "collection": {"$last": "$collection"},
+            "shape": {"$last": "$shape"},
+            "views": {"$addToSet": "$view"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "docs_returned": {"$last": "$docs_returned"},
+            "docs_examined": {"$max": "$docs_examined"},
+            "keys_examined": {"$max": "$keys_examined"},
+            "plan_returned": {"$max": "$plan_returned"},
+            "plan_stages": {"$last": "$plan_stages"},
+            "last_seen": {"$last": "$ts"},
+        }},
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit},
+    ]
+    offenders = []
+    for doc in db[LOG_COLLECTION].aggregate(pipeline):
+        doc["shape_hash"] = doc.pop("_id")
+        doc["avg_ms"] = round(doc["avg_ms"], 3)
+        doc["total_ms"] = round(doc["total_ms"], 3)
+        # None until the shape was explained (SLOW_QUERY_EXPLAIN off, or the explain failed)
+        doc["examined_per_returned"] = (
+            round(doc["docs_examined"] / max(doc["plan_returned"] or 0, 1), 1)
+            if doc.get("docs_examined") is not None else None
+        )
+        offenders.append(doc)
+    return offenders
@@ -0,0 +1,249 @@
+# app/storage.py
+# Where submitted assignment files end up.
+# GoogleDriveStorage is the production backend; LocalFakeDriveStorage mimics it on
+# the local filesystem so the submission worker can be run and tested offline.
+import os
+import threading
+import time
+import uuid
+
+import httplib2
+from django.conf import settings
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+from google.oauth2 import service_account
+
+from . import metrics
+
+DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive']
+PARENT_FOLDER_ID = "1WAPvWKDfCMLk8reA3qQbROQA5Nlw5FgI"  # Replace with your root folder ID
+
+metrics.describe("drive_request_seconds", "Google Drive API call time by operation")
+metrics.describe("drive_request_failures_total", "Google Drive API calls that raised")
+metrics.describe("drive_client_events_total", "DriveClientManager cache and client events (see DriveClientManager.stats)")
+
+
+def timed_drive_call(op, call):
+    """ Run call() (e.g. request.execute) and record it under drive_request_seconds{op} """
+    start = time.perf_counter()
+    try:
+        return call()
+    except Exception:
+        metrics.inc("drive_request_failures_total", op=op)
+        raise
+    finally:
+        metrics.observe("drive_request_seconds", time.perf_counter() - start, op=op)
+
+
+class DriveClientManager:
+    """
+    Process-wide Google Drive client.
+
+    Credentials and the parsed discovery document are loaded once per process and
+    the access token is refreshed only when it has expired. httplib2 connections are
+    not thread-safe, so each thread gets its own service object (built from the
+    cached discovery document, no network). Class folder IDs are kept in a TTL cache;
+    a per-class lock makes concurrent first submissions of a class share one
+    lookup instead of racing to create duplicate folders.
+    """
+
+    def __init__(self, credentials_file, parent_folder_id=PARENT_FOLDER_ID, folder_ttl=3600):
+        self.credentials_file = credentials_file
+        self.parent_folder_id = parent_folder_id
+        self.folder_ttl = folder_ttl
+
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._discovery_doc = None
+        self._local = threading.local()
+        self._folders = {}  # class_grade -> (folder_id, expires_at)
+        self._folder_locks = {}
+
+        self.stats = {
+            "credential_loads": 0,
+            "service_builds": 0,
+            "service_reuses": 0,  # each one saved loading credentials + building the client
+            "token_refreshes": 0,
+            "folder_cache_hits": 0,  # each one saved a files().list round-trip
+            "folder_lookups": 0,
+            "folders_created": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_credentials(self):
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_file, scopes=DRIVE_SCOPES
+                )
+                self._discovery_doc = get_static_doc('drive', 'v3')
+                self.stats["credential_loads"] += 1
+
+            if not self._credentials.valid:  # Missing or expired token
+                timed_drive_call("token_refresh", lambda: self._credentials.refresh(Request()))
+                self.stats["token_refreshes"] += 1
+            return self._credentials
+
+    def get_service(self):
+        credentials = self.get_credentials()
+        service = getattr(self._local, "service", None)
+        if service is None:
+            http = AuthorizedHttp(credentials, http=httplib2.Http())
+            service = build_from_document(self._discovery_doc, http=http)
+            self._local.service = service
+            self._count("service_builds")
+        else:
+            self._count("service_reuses")
+        return service
+
+    def _cached_folder(self, class_grade):
+        entry = self._folders.get(class_grade)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def get_class_folder(self, class_grade):
+        """ ID of the Drive folder for a class, created if it does not exist yet """
+        folder_id = self._cached_folder(class_grade)
+        if folder_id:
+            self._count("folder_cache_hits")
+            return folder_id
+
+        with self._lock:
+            class_lock = self._folder_locks.setdefault(class_grade, threading.Lock())
+
+        with class_lock:
+            folder_id = self._cached_folder(class_grade)  # Filled while we waited?
+            if folder_id:
+                self._count("folder_cache_hits")
+                return folder_id
+
+            folder_id = self._lookup_or_create_folder(class_grade)
+            self._folders[class_grade] = (folder_id, time.monotonic() + self.folder_ttl)
+            return folder_id
+
+    def _lookup_or_create_folder(self, class_grade):
+        drive_service = self.get_service()
+        query = (
+            f"mimeType = 'application/vnd.google-apps.folder' and name = '{class_grade}' "
+            f"and '{self.parent_folder_id}' in parents"
+        )
+        results = timed_drive_call("folder_lookup", drive_service.files().list(q=query, fields="files(id, name)").execute)
+        self._count("folder_lookups")
+        folders = results.get('files', [])
+
+        if folders:
+            return folders[0]['id']
+
+        metadata = {
+            'name': class_grade,
+            'mimeType': 'application/vnd.google-apps.folder',
+            'parents': [self.parent_folder_id]
+        }
+        folder = timed_drive_call("folder_create", drive_service.files().create(body=metadata, fields='id').execute)
+        self._count("folders_created")
+        return folder['id']
+
+    def forget_folder(self, class_grade):
+        """ Drop a cached folder ID, e.g. after the folder was deleted in Drive """
+        self._folders.pop(class_grade, None)
+
+
+_drive_manager = None
+_drive_manager_pid = None
+_drive_manager_lock = threading.Lock()
+
+
+def get_drive_manager():
+    """ The DriveClientManager of this process (rebuilt after a fork) """
+    global _drive_manager, _drive_manager_pid
+    with _drive_manager_lock:
+        if _drive_manager is None or _drive_manager_pid != os.getpid():
+            _drive_manager = DriveClientManager(
+                settings.GOOGLE_DRIVE_CREDENTIALS_FILE,
+                folder_ttl=getattr(settings, "DRIVE_FOLDER_CACHE_TTL", 3600),
+            )
+            _drive_manager_pid = os.getpid()
+        return _drive_manager
+
+
+def _drive_stats():
+    # Read at scrape time; never builds a manager just to report zeros
+    manager = _drive_manager
+    if manager is None or _drive_manager_pid != os.getpid():
+        return []
+    return [("drive_client_events_total", {"event": name}, value) for name, value in manager.stats.items()]
+
+
+metrics.register_collector(_drive_stats, kind="counter")
+
+
+class GoogleDriveStorage:
+    def __init__(self, manager=None):
+        self.manager = manager or get_drive_manager()
+
+    def upload(self, stream, filename, content_type, class_grade):
+        """ Upload a file into the class folder, returns (viewable_url, download_url) """
+        drive_service = self.manager.get_service()
+        class_folder = self.manager.get_class_folder(class_grade)
+
+        media = MediaIoBaseUpload(stream, mimetype=content_type, resumable=True)
+        metadata = {'name': filename, 'parents': [class_folder]}
+
+        try:
+            uploaded_file = timed_drive_call("upload", drive_service.files().create(
+                body=metadata, media_body=media,
+                fields='id,webViewLink,webContentLink'
+            ).execute)
+        except HttpError as e:
+            if e.resp.status == 404:  # Cached folder was removed in Drive
+                self.manager.forget_folder(class_grade)
+            raise
+
+        return uploaded_file.get('webViewLink'), uploaded_file.get('webContentLink')
+
+
+class LocalFakeDriveStorage:
+    """
+    Offline stand-in for Google Drive: files are written to `root/<class>/` and get
+    Drive-shaped URLs. `fail_times` makes the first N uploads raise, to exercise retries.
+    """
+    BASE_URL = "https://fake-drive.local"
+
+    def __init__(self, root, fail_times=0):
+        self.root = root
+        self.fail_times = fail_times
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+    def upload(self, stream, filename, content_type, class_grade):
+        with self._lock:
+            self.uploads += 1
+            attempt = self.uploads
+        if attempt <= self.fail_times:
+            raise IOError(f"Fake Drive failure {attempt}/{self.fail_times}")
+
+        file_id = uuid.uuid4().hex
+        folder = os.path.join(self.root, class_grade)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{file_id}-{os.path.basename(filename)}"), "wb") as out:
+            out.write(stream.read())
+
+        return (
+            f"{self.BASE_URL}/file/d/{file_id}/view",
+            f"{self.BASE_URL}/uc?id={file_id}&export=download",
+        )
+
+
+def get_storage_backend():
+    """ Backend selected by settings.SUBMISSION_STORAGE ("drive" or "fake") """
+    if getattr(settings, "SUBMISSION_STORAGE", "drive") == "fake":
+        return LocalFakeDriveStorage(settings.FAKE_DRIVE_ROOT)
+    return GoogleDriveStorage()
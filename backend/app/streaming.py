@@ -0,0 +1,67 @@
+# app/streaming.py
+# Streamed list responses: documents are read from the pymongo cursor one batch at a
+# time and written straight to the client, so memory stays flat however many
+# documents match and the first byte goes out after the first batch.
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .renderers import NDJSONRenderer, dumps
+
+DEFAULT_STREAM_BATCH_SIZE = 500
+MAX_STREAM_BATCH_SIZE = 5000
+
+
+def wants_stream(request):
+    """ ?stream=1 streams a JSON array, Accept: application/x-ndjson streams NDJSON """
+    if request.query_params.get("stream") in ("1", "true", "True"):
+        return True
+    renderer = getattr(request, "accepted_renderer", None)
+    return isinstance(renderer, NDJSONRenderer)
+
+
+def get_batch_size(request):
+    default = getattr(settings, "STREAM_BATCH_SIZE", DEFAULT_STREAM_BATCH_SIZE)
+    try:
+        batch_size = int(request.query_params.get("batch_size", default))
+    except ValueError:
+        batch_size = default
+    return max(1, min(batch_size, MAX_STREAM_BATCH_SIZE))
+
+
+def _iter_batches(cursor, format_doc, batch_size):
+    batch = []
+    try:
+        for doc in cursor:
+            batch.append(format_doc(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()  # Release the server-side cursor if the client goes away
+
+
+def _json_array(batches):
+    yield b"["
+    first = True
+    for batch in batches:
+        chunk = b",".join(dumps(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+
+def _ndjson(batches):
+    for batch in batches:
+        yield b"".join(dumps(item) + b"\n" for item in batch)
+
+
+def stream_response(request, cursor, format_doc):
+    """ Stream `cursor` through `format_doc` as a JSON array or NDJSON """
+    batch_size = get_batch_size(request)
+    batches = _iter_batches(cursor.batch_size(batch_size), format_doc, batch_size)
+
+    if isinstance(getattr(request, "accepted_renderer", None), NDJSONRenderer):
+        return StreamingHttpResponse(_ndjson(batches), content_type=NDJSONRenderer.media_type)
+    return StreamingHttpResponse(_json_array(batches), content_type="application/json")
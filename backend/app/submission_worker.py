@@ -0,0 +1,225 @@
+# app/submission_worker.py
+# Asynchronous submission pipeline.
+#
+# StudentSubmitAssignmentView (async mode) writes the uploaded file to the spool
+# directory, inserts the submission with status "Uploading" and answers 202.
+# `manage.py run_submission_worker` drains the spool: each job is uploaded to the
+# storage backend with retries + exponential backoff, then the submission gets its
+# viewable_url/download_url and goes to "Pending" (or "Upload Failed").
+#
+# Spool layout: <id>.bin holds the bytes, <id>.json the metadata. The .json file is
+# written last (atomic rename), so a job is only visible once complete, and a worker
+# claims it by renaming it to <id>.working, which is atomic across processes.
+# A worker only claims as many jobs as it has free threads, and touches the
+# .working files of the jobs it is running every HEARTBEAT_SECONDS, so a job is
+# only re-queued by release_stale_jobs when its worker really went away.
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bson import ObjectId
+from django.conf import settings
+
+from .db import connect_to_mongo, get_submissions_collection
+from .events import publish_status_change
+from .rollups import GROUP_FIELDS, record_status_change
+
+logger = logging.getLogger(__name__)
+
+UPLOADING = "Uploading"
+UPLOAD_FAILED = "Upload Failed"
+# What the rollups need from the submission as it was before the status change
+ROLLUP_PROJECTION = {field: 1 for field in GROUP_FIELDS}
+HEARTBEAT_SECONDS = 30  # Well below run_submission_worker's --stale-after
+
+
+def get_spool_dir():
+    spool_dir = settings.SUBMISSION_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+def spool_submission(submission_id, file, class_grade):
+    """ Persist an uploaded file + the metadata the worker needs to upload it later """
+    spool_dir = get_spool_dir()
+    data_path = os.path.join(spool_dir, f"{submission_id}.bin")
+    with open(data_path, "wb") as out:
+        for chunk in file.chunks():
+            out.write(chunk)
+
+    meta = {
+        "submission_id": str(submission_id),
+        "filename": file.name,
+        "content_type": file.content_type,
+        "class_grade": class_grade,
+        "spooled_at": time.time(),
+    }
+    tmp_path = os.path.join(spool_dir, f"{submission_id}.json.tmp")
+    with open(tmp_path, "w") as out:
+        json.dump(meta, out)
+    os.replace(tmp_path, os.path.join(spool_dir, f"{submission_id}.json"))
+
+
+def claim_jobs(limit=None):
+    """ Atomically claim spooled jobs, returns the paths of the claimed metadata files """
+    spool_dir = get_spool_dir()
+    claimed = []
+    for name in sorted(os.listdir(spool_dir)):
+        if not name.endswith(".json"):
+            continue
+        source = os.path.join(spool_dir, name)
+        target = source[:-len(".json")] + ".working"
+        try:
+            os.rename(source, target)
+        except FileNotFoundError:
+            continue  # Another worker got it first
+        os.utime(target)  # Claim time, used by release_stale_jobs
+        claimed.append(target)
+        if limit and len(claimed) >= limit:
+            break
+    return claimed
+
+
+def release_stale_jobs(max_age):
+    """ Put back jobs whose worker died mid-upload (claimed more than max_age seconds ago) """
+    spool_dir = get_spool_dir()
+    now = time.time()
+    released = 0
+    for name in os.listdir(spool_dir):
+        if not name.endswith(".working"):
+            continue
+        path = os.path.join(spool_dir, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.rename(path, path[:-len(".working")] + ".json")
+                released += 1
+        except FileNotFoundError:
+            continue
+    return released
+
+
+def touch_jobs(paths):
+    """ Refresh the claim time of running jobs so release_stale_jobs leaves them alone """
+    for path in paths:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            continue
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # Already cleaned up by another pass over the same job
+
+
+def _set_aside(meta_path, suffix):
+    """ Rename a claimed job's metadata (e.g. to .failed); False if it is gone """
+    try:
+        os.rename(meta_path, meta_path[:-len(".working")] + suffix)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _submission_query(submission_id):
+    return {"_id": ObjectId(submission_id) if ObjectId.is_valid(submission_id) else submission_id}
+
+
+def upload_with_retries(storage, meta, data_path, max_attempts, backoff):
+    """ Upload one spooled file, sleeping backoff * 2^n (+ jitter) between attempts """
+    for attempt in range(max_attempts):
+        try:
+            with open(data_path, "rb") as stream:
+                return storage.upload(stream, meta["filename"], meta["content_type"], meta["class_grade"])
+        except Exception as e:
+            if attempt == max_attempts - 1:
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random() / 2)
+            logger.warning("Upload of submission %s failed (%s), retrying in %.1fs", meta["submission_id"], e, delay)
+            time.sleep(delay)
+
+
+def process_job(meta_path, storage, max_attempts=5, backoff=2.0):
+    """ Upload one claimed job and patch the submission. Returns True on success. """
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return False  # Finished by another pass
+    except ValueError as e:
+        logger.error("Unreadable spool job %s: %s", meta_path, e)
+        _set_aside(meta_path, ".failed")
+        return False
+    data_path = meta_path[:-len(".working")] + ".bin"
+    submissions = get_submissions_collection()
+    query = _submission_query(meta["submission_id"])
+
+    try:
+        viewable_url, download_url = upload_with_retries(storage, meta, data_path, max_attempts, backoff)
+    except Exception as e:
+        if not os.path.exists(meta_path):
+            return False  # Another pass finished this job and removed its files meanwhile
+        logger.error("Giving up on submission %s: %s", meta["submission_id"], e)
+        # Only while still uploading: never overwrite a status the upload already moved on from
+        before = submissions.find_one_and_update({**query, "status": UPLOADING}, {"$set": {"status": UPLOAD_FAILED}},
+                                                 projection=ROLLUP_PROJECTION)
+        if before is not None:
+            record_status_change(connect_to_mongo(), before, UPLOAD_FAILED)
+            publish_status_change(before, UPLOAD_FAILED)
+        # Keep the bytes around so the job can be re-queued by hand
+        _set_aside(meta_path, ".failed")
+        return False
+
+    urls = {"file_url": viewable_url, "viewable_url": viewable_url, "download_url": download_url}
+    before = submissions.find_one_and_update({**query, "status": UPLOADING}, {"$set": {**urls, "status": "Pending"}},
+                                             projection=ROLLUP_PROJECTION)
+    if before is not None:
+        record_status_change(connect_to_mongo(), before, "Pending")
+        publish_status_change(before, "Pending")
+    else:
+        # An admin already set a status while this was uploading: keep it, only add the file
+        submissions.update_one(query, {"$set": urls})
+    _remove(data_path)
+    _remove(meta_path)
+    return True
+
+
+def run_job(meta_path, storage, max_attempts, backoff):
+    """ process_job that never raises, so one bad job can't stop the worker """
+    try:
+        return process_job(meta_path, storage, max_attempts, backoff)
+    except Exception as e:
+        # Left claimed: release_stale_jobs re-queues it once the heartbeat stops
+        logger.exception("Spool job %s failed: %s", meta_path, e)
+        return False
+
+
+def drain_spool(storage, workers=4, max_attempts=5, backoff=2.0, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Upload everything in the spool using a pool of threads. Jobs are claimed one
+    free thread at a time, so a claimed job starts right away instead of waiting
+    behind the others (and looking stale while it waits).
+    """
+    succeeded = failed = 0
+    running = {}  # future -> meta path
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            if len(running) < workers:
+                for path in claim_jobs(limit=workers - len(running)):
+                    running[pool.submit(run_job, path, storage, max_attempts, backoff)] = path
+            if not running:
+                break
+            done, _ = wait(running, timeout=heartbeat, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                if future.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+            touch_jobs(running.values())
+    return succeeded, failed
@@ -1,3 +1,1353 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zoneinfo
+from unittest import mock, skipIf
 
-# Create your tests here.
+import fakeredis
+import fakeredis.aioredis
+import mongomock
+from bson import Binary, Decimal128, ObjectId
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import clear_url_caches, resolve
+from googleapiclient.errors import HttpError
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import ConfigurationError
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from . import async_db, renderers, urls
+from .async_views import (
+    AsyncStudentListAssignmentsView, AsyncStudentListVideosLecturesView, AsyncStudentProfileView, AsyncStudentScheduleView,
+)
+from .authentication import ADMIN, STUDENT, identity_param, issue_tokens, revoke
+from .benchmarks.backends import patch_mongomock
+from .benchmarks.routes import SPECS
+from .cache import bump_version, get_version, read_through_cache
+from .compression import CompressionMiddleware, brotli
+from .dashboard import Section, load_sections, render_dashboard
+from .db import ConnectionManager, connections
+from .events import message_frame, parse_event_id, replay_frames
+from .indexes import duplicate_keys, ensure_indexes
+from .instrumentation import metrics_view
+from .lecture_videos import VIDEOS_COLLECTION, DuplicateVideo, add_videos, merge_duplicate_chapters, migrate_chapter
+from .lectures import first_or_none, student_lecture_tree_pipeline
+from .management.commands.bench_lecture_tree import python_lecture_tree
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, fetch_page, keyset_filter
+from .projection import FieldSet, InvalidFields, select_fields
+from .renderers import MongoJSONRenderer, MongoJsonResponse, NDJSONRenderer, dumps
+from .rollups import ROLLUP_COLLECTION, apply, bulk_delete, bulk_set_status, group_counts, status_change_deltas
+from .search import search_page, search_pipeline
+from .slow_queries import SlowQueryRecorder, top_offenders
+from .storage import DriveClientManager, GoogleDriveStorage
+from .streaming import stream_response
+from .submission_worker import (
+    UPLOAD_FAILED, UPLOADING, claim_jobs, drain_spool, process_job, release_stale_jobs, spool_submission, touch_jobs,
+)
+from .timetable import InvalidSlot, Timetable, find_conflict, find_overlap, normalize
+from .views import (
+    MAX_BULK_IDS, AdminBulkDeleteSubmissionsView, AdminBulkUpdateSubmissionsView, BulkImportStudentsView,
+    CreateScheduleView, CreateStudentView, ListStudentsView, StudentDashboardView, StudentListAssignmentsView,
+    StudentListVideosLecturesView, StudentProfileView, StudentScheduleNowView, StudentScheduleView, TokenRefreshView,
+    VideoListView,
+)
+
+
+class RouteBenchmarkSuiteTests(SimpleTestCase):
+    """ The route benchmarks on mongomock + fakeredis at the smallest scale, so a route that breaks fails here """
+
+    def test_every_route_runs_on_mongomock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command("bench_routes", backend="mongomock", fake_redis=True, scale="1k", iterations=1,
+                         warmup=0, alloc_samples=0, output=output, stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(set(report["routes"]) | set(report["meta"]["skipped"]), set(SPECS))
+        for name, result in report["routes"].items():
+            with self.subTest(route=name):
+                self.assertTrue(all(int(code) < 500 for code in result["statuses"]), result["statuses"])
+
+
+class CursorPaginationTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        doc = {"_id": ObjectId(), "submitted_at": "2025-03-01T10:00:00"}
+        self.assertEqual(decode_cursor(encode_cursor(doc, "_id")), [doc["_id"]])
+        self.assertEqual(decode_cursor(encode_cursor(doc, "submitted_at")), [doc["submitted_at"], doc["_id"]])
+        self.assertNotIn("=", encode_cursor(doc, "submitted_at"))  # Padding is stripped for query strings
+
+    def test_garbage_cursor(self):
+        for token in ("", "%%%", "bm90IGpzb24", encode_cursor({"_id": 1, "a": [1, 2]}, "a")[:-2], "WzEsMiwzXQ"):
+            with self.subTest(token=token), self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+    def test_keyset_filter(self):
+        last_id = ObjectId()
+        self.assertEqual(keyset_filter({}, [last_id], "_id", ASCENDING), {"_id": {"$gt": last_id}})
+        self.assertEqual(keyset_filter({"class_grade": "11th"}, ["2025-03-01", last_id], "submitted_at", DESCENDING), {
+            "$and": [{"class_grade": "11th"}, {"$or": [
+                {"submitted_at": {"$lt": "2025-03-01"}},
+                {"submitted_at": "2025-03-01", "_id": {"$lt": last_id}},
+            ]}],
+        })
+
+    def test_pages_cover_every_document_once(self):
+        collection = mongomock.MongoClient().db.submissions
+        # Ties on submitted_at are broken by _id
+        collection.insert_many([{"class_grade": "11th", "submitted_at": f"2025-03-0{i % 3 + 1}"} for i in range(11)])
+        seen, cursor = [], None
+        while True:
+            docs, cursor = fetch_page(collection, {"class_grade": "11th"}, 4, cursor=cursor,
+                                      sort_field="submitted_at", direction=DESCENDING)
+            seen.extend(docs)
+            if cursor is None:
+                break
+        expected = sorted(collection.find(), key=lambda doc: (doc["submitted_at"], doc["_id"]), reverse=True)
+        self.assertEqual([doc["_id"] for doc in seen], [doc["_id"] for doc in expected])
+
+
+def use_fakes():
+    """ Serve mongomock + fakeredis from app.db for the rest of the test """
+    patch_mongomock()
+    db = mongomock.MongoClient().studentApp_test
+    connections.use(db, fakeredis.FakeRedis())
+    return db
+
+
+class CacheVersionTests(SimpleTestCase):
+
+    def setUp(self):
+        use_fakes()
+
+    def test_bump_moves_only_its_class(self):
+        before = get_version("schedules", "11th"), get_version("schedules", "12th")
+        self.assertEqual(get_version("schedules", "11th"), before[0])  # Seeded once, then stable
+        bump_version("schedules", "11th")
+        self.assertGreater(get_version("schedules", "11th"), before[0])
+        self.assertEqual(get_version("schedules", "12th"), before[1])
+
+    def test_bump_without_class_is_a_no_op(self):
+        bump_version("schedules", "")
+        self.assertFalse(connections.redis().keys("ver:*"))
+
+
+
+class CachedScheduleView(APIView):
+    calls = 0
+
+    @read_through_cache("test_schedule", "schedules", params=("day",))
+    def get(self, request):
+        CachedScheduleView.calls += 1
+        return Response({"day": request.query_params.get("day"), "calls": CachedScheduleView.calls})
+
+
+class ETagTests(SimpleTestCase):
+
+    def setUp(self):
+        use_fakes()
+        CachedScheduleView.calls = 0
+        self.factory = APIRequestFactory()
+
+    def get(self, day="Monday", **headers):
+        response = CachedScheduleView.as_view()(self.factory.get("/", {"class_grade": "11th", "day": day}, **headers))
+        return response.render() if hasattr(response, "render") else response
+
+    def test_revalidation_skips_the_view(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get().data, first.data)  # Served from Redis
+        not_modified = self.get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], first["ETag"])
+        self.assertEqual(CachedScheduleView.calls, 1)
+
+    def test_weak_and_listed_tags_match(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=f'"other", W/{etag}').status_code, 304)
+
+    def test_bump_changes_the_etag(self):
+        first = self.get()
+        bump_version("schedules", "11th")
+        second = self.get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(CachedScheduleView.calls, 2)
+
+    def test_params_outside_the_key_share_the_entry(self):
+        self.assertNotEqual(self.get("Monday")["ETag"], self.get("Tuesday")["ETag"])
+        response = CachedScheduleView.as_view()(self.factory.get("/", {"class_grade": "11th", "day": "Monday",
+                                                                      "student_id": "s1"}))
+        self.assertEqual(response.data["day"], "Monday")
+        self.assertEqual(CachedScheduleView.calls, 2)
+
+
+
+class RollupTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.db.submissions.insert_many(
+            [{"class_grade": "11th", "assignment_title": "Essay", "status": "Pending"} for _ in range(3)]
+            + [{"class_grade": "11th", "assignment_title": "Essay", "status": "Graded"} for _ in range(2)]
+            + [{"class_grade": "12th", "assignment_title": "Lab", "status": "Pending"} for _ in range(4)]
+        )
+        apply(self.db, group_counts(self.db.submissions, {}))
+
+    def assertRollupsMatch(self):
+        stored = {(doc["class_grade"], doc["assignment_title"], doc["status"]): doc["count"]
+                  for doc in self.db[ROLLUP_COLLECTION].find({"count": {"$ne": 0}})}
+        self.assertEqual(stored, group_counts(self.db.submissions, {}))
+
+    def test_status_change_deltas(self):
+        deltas, moved = status_change_deltas({("11th", "Essay", "Pending"): 3, ("11th", "Essay", "Graded"): 2}, "Graded")
+        self.assertEqual(moved, 3)
+        self.assertEqual(dict(deltas), {("11th", "Essay", "Pending"): -3, ("11th", "Essay", "Graded"): 3})
+
+    def test_status_change_to_the_same_status_moves_nothing(self):
+        deltas, moved = status_change_deltas({("11th", "Essay", "Graded"): 2}, "Graded")
+        self.assertEqual((dict(deltas), moved), ({}, 0))
+
+    def test_bulk_set_status_keeps_the_rollups_exact(self):
+        matched, moved = bulk_set_status(self.db.submissions, {"class_grade": "11th"}, "Graded")
+        self.assertEqual((matched, moved), (5, {("11th", "Essay", "Pending"): 3}))
+        apply(self.db, status_change_deltas(moved, "Graded")[0])
+        self.assertRollupsMatch()
+
+    def test_id_lists_are_split_by_group(self):
+        ids = [doc["_id"] for doc in self.db.submissions.find()]
+        pending = [doc["_id"] for doc in self.db.submissions.find({"status": "Pending"})]
+        update_many = type(self.db.submissions).update_many
+        with mock.patch.object(type(self.db.submissions), "update_many", autospec=True, side_effect=update_many) as spy:
+            matched, moved = bulk_set_status(self.db.submissions, {"_id": {"$in": ids}}, "Graded")
+        self.assertEqual((matched, sum(moved.values())), (9, 7))
+        sent = [i for call in spy.call_args_list for i in call.args[1]["$and"][0]["_id"]["$in"]]
+        self.assertEqual(sorted(sent), sorted(pending))  # Each id once; the Graded group needs no write
+
+    def test_bulk_delete_keeps_the_rollups_exact(self):
+        removed = bulk_delete(self.db.submissions, {"status": "Pending"})
+        self.assertEqual(removed, {("11th", "Essay", "Pending"): 3, ("12th", "Lab", "Pending"): 4})
+        apply(self.db, {group: -count for group, count in removed.items()})
+        self.assertRollupsMatch()
+
+
+
+def stream_entry(event_id, class_grade, event_type=b"submission.created"):
+    return event_id.encode(), {b"type": event_type, b"class_grade": class_grade.encode(), b"data": b"{}"}
+
+
+class EventReplayTests(SimpleTestCase):
+    oldest = [stream_entry("90-0", "11th")]
+    entries = [stream_entry("100-0", "11th"), stream_entry("100-1", "12th"), stream_entry("101-0", "11th")]
+
+    def test_replay_filters_by_class_and_tracks_the_last_id(self):
+        frames, high = replay_frames(self.entries, self.oldest, (99, 0), "11th")
+        self.assertEqual(frames, [
+            b"id: 100-0\nevent: submission.created\ndata: {}\n\n",
+            b"id: 101-0\nevent: submission.created\ndata: {}\n\n",
+        ])
+        self.assertEqual(high, (101, 0))
+
+    def test_high_includes_other_classes(self):
+        # An event of another class still counts as seen, so its live copy isn't sent later either
+        _frames, high = replay_frames(self.entries[:2], self.oldest, (99, 0), "11th")
+        self.assertEqual(high, (100, 1))
+
+    def test_trimmed_stream_asks_for_a_reset(self):
+        frames, _high = replay_frames(self.entries[2:], self.entries[2:], (50, 0), None)
+        self.assertEqual(frames[0], b"event: reset\ndata: {}\n\n")
+        frames, _high = replay_frames(self.entries, self.entries[:1], (0, 0), None)
+        self.assertEqual(len(frames), 3)  # 0-0 is "everything still buffered", never a reset
+
+    def test_live_messages_already_replayed_are_dropped(self):
+        message = {"type": "message", "data": b"100-1 submission.created {}"}
+        self.assertIsNone(message_frame(message, (101, 0)))
+        self.assertIsNone(message_frame(message, (100, 1)))
+        self.assertEqual(message_frame(message, (100, 0)), b"id: 100-1\nevent: submission.created\ndata: {}\n\n")
+        self.assertIsNotNone(message_frame({**message, "type": "pmessage"}, None))
+        self.assertIsNone(message_frame({"type": "subscribe", "data": 1}, None))
+
+    def test_parse_event_id(self):
+        self.assertEqual(parse_event_id("1700000000000-3"), (1700000000000, 3))
+        for value in (None, "", "abc", "1-2-3", "12"):
+            self.assertIsNone(parse_event_id(value))
+
+
+
+def slot(day, start_time, end_time, subject="Maths", class_grade="11th"):
+    return {"class_grade": class_grade, "subject": subject, **normalize(day, start_time, end_time)}
+
+
+class TimetableTests(SimpleTestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize("tue", "9:05", "10:30:00"), {
+            "day": "Tuesday", "start_time": "09:05", "end_time": "10:30",
+            "start_minute": 24 * 60 + 9 * 60 + 5, "end_minute": 24 * 60 + 10 * 60 + 30,
+        })
+        for day, start, end in (("Funday", "09:00", "10:00"), ("Mon", "9am", "10:00"), ("Mon", "10:00", "10:00")):
+            with self.subTest(day=day, start=start, end=end), self.assertRaises(InvalidSlot):
+                normalize(day, start, end)
+
+    def test_find_conflict(self):
+        schedules = mongomock.MongoClient().db.schedules
+        schedules.insert_many([slot("Mon", "09:00", "10:00"), slot("Mon", "11:00", "12:00"),
+                               slot("Mon", "09:00", "10:00", class_grade="12th")])
+        monday = lambda start, end: normalize("Mon", start, end)
+        for start, end, subject in (("10:00", "11:00", None), ("09:30", "10:30", "Maths"), ("08:00", "09:00", None),
+                                    ("10:30", "11:30", "Maths"), ("08:00", "13:00", "Maths")):
+            with self.subTest(start=start, end=end):
+                conflict = find_conflict(schedules, "11th", monday(start, end)["start_minute"], monday(start, end)["end_minute"])
+                self.assertEqual(conflict and conflict["subject"], subject)
+
+    def test_find_overlap_ignores_the_slot_itself(self):
+        schedules = mongomock.MongoClient().db.schedules
+        first = schedules.insert_one(slot("Mon", "09:00", "10:00")).inserted_id
+        new = slot("Mon", "09:30", "10:30", subject="Physics")
+        new_id = schedules.insert_one(new).inserted_id
+        self.assertEqual(find_overlap(schedules, "11th", new_id, new["start_minute"], new["end_minute"])["_id"], first)
+        schedules.delete_one({"_id": first})
+        self.assertIsNone(find_overlap(schedules, "11th", new_id, new["start_minute"], new["end_minute"]))
+
+    def test_at_wraps_around_the_week(self):
+        slots = sorted([slot("Mon", "09:00", "10:00"), slot("Sat", "14:00", "15:00", subject="Physics")],
+                       key=lambda s: s["start_minute"])
+        timetable = Timetable(1, [s["start_minute"] for s in slots], slots)
+        monday_930 = normalize("Mon", "09:30", "09:31")["start_minute"]
+        self.assertEqual(timetable.at(monday_930), (slots[0], slots[1], slots[1]["start_minute"] - monday_930))
+        sunday_2300 = normalize("Sun", "23:00", "23:01")["start_minute"]
+        current, upcoming, starts_in = timetable.at(sunday_2300)
+        self.assertEqual((current, upcoming["subject"], starts_in), (None, "Maths", 60 + 9 * 60))
+        self.assertEqual(Timetable(1, [], []).at(0), (None, None, None))
+
+
+@override_settings(SCHOOL_TIME_ZONE="Asia/Kolkata")
+class ScheduleViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.factory = APIRequestFactory()
+
+    def create(self, **data):
+        request = self.factory.post("/", {"class_grade": "11th", "subject": "Physics", **data}, format="json")
+        return CreateScheduleView.as_view()(request)
+
+    def test_create_rejects_an_overlap(self):
+        self.db.schedules.insert_one(slot("Mon", "09:00", "10:00"))
+        self.assertEqual(self.create(day="Monday", start_time="09:30", end_time="10:30").status_code, 409)
+        self.assertEqual(self.create(day="Monday", start_time="10:00", end_time="11:00").status_code, 201)
+
+    def test_create_backs_out_when_a_concurrent_create_won(self):
+        self.db.schedules.insert_one(slot("Mon", "09:00", "10:00"))
+        with mock.patch("app.views.find_conflict", return_value=None):  # Both passed the check before inserting
+            response = self.create(day="Monday", start_time="09:30", end_time="10:30")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.db.schedules.count_documents({}), 1)
+
+    def now(self, at):
+        request = self.factory.get("/", {"class_grade": "11th", "at": at})
+        return StudentScheduleNowView.as_view()(request).data
+
+    def test_now_uses_the_school_time_zone(self):
+        self.db.schedules.insert_one(slot("Mon", "09:00", "10:00"))
+        bump_version("schedules", "11th")
+        # 2025-03-03 is a Monday; 04:00 UTC is 09:30 in Kolkata
+        self.assertEqual(self.now("2025-03-03T04:00:00+00:00")["current"]["subject"], "Maths")
+        self.assertIsNone(self.now("2025-03-03T04:00:00")["current"])  # Naive: already school time
+        with mock.patch("app.views.school_now", return_value=datetime.datetime(
+                2025, 3, 3, 9, 15, tzinfo=zoneinfo.ZoneInfo("Asia/Kolkata"))):
+            self.assertEqual(StudentScheduleNowView.as_view()(self.factory.get("/", {"class_grade": "11th"})).data[
+                "current"]["ends_in_minutes"], 45)
+
+
+
+class FakeStorage:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.uploaded = []
+
+    def upload(self, stream, filename, content_type, class_grade):
+        if self.fail:
+            raise IOError("Drive unavailable")
+        self.uploaded.append((filename, stream.read()))
+        return f"https://view/{filename}", f"https://download/{filename}"
+
+
+class SubmissionWorkerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool = tmp.name
+        settings_override = override_settings(SUBMISSION_SPOOL_DIR=self.spool)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def spool_job(self, name="essay.pdf"):
+        submission_id = self.db.submissions.insert_one({
+            "class_grade": "11th", "assignment_title": "Essay", "status": UPLOADING,
+        }).inserted_id
+        spool_submission(submission_id, SimpleUploadedFile(name, b"%PDF", "application/pdf"), "11th")
+        return submission_id
+
+    def files(self):
+        return sorted(os.path.splitext(name)[1] for name in os.listdir(self.spool))
+
+    def test_claim_release_cycle(self):
+        self.spool_job("a.pdf")
+        self.spool_job("b.pdf")
+        claimed = claim_jobs(limit=1)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(self.files(), [".bin", ".bin", ".json", ".working"])
+        self.assertEqual(len(claim_jobs()), 1)
+        self.assertEqual(claim_jobs(), [])  # Nothing left to claim
+
+        self.assertEqual(release_stale_jobs(max_age=60), 0)
+        for path in claimed:
+            os.utime(path, (0, 0))  # Its worker went away long ago
+        self.assertEqual(release_stale_jobs(max_age=60), 1)
+        self.assertEqual(self.files(), [".bin", ".bin", ".json", ".working"])
+
+    def test_heartbeat_keeps_a_running_job_claimed(self):
+        self.spool_job()
+        claimed = claim_jobs()
+        os.utime(claimed[0], (0, 0))
+        touch_jobs(claimed + [os.path.join(self.spool, "gone.working")])  # Missing files are skipped
+        self.assertEqual(release_stale_jobs(max_age=60), 0)
+
+    def test_drain_uploads_and_cleans_up(self):
+        submission_id = self.spool_job()
+        storage = FakeStorage()
+        self.assertEqual(drain_spool(storage, workers=2, backoff=0), (1, 0))
+        self.assertEqual(storage.uploaded, [("essay.pdf", b"%PDF")])
+        submission = self.db.submissions.find_one({"_id": submission_id})
+        self.assertEqual((submission["status"], submission["download_url"]), ("Pending", "https://download/essay.pdf"))
+        self.assertEqual(self.files(), [])
+
+    def test_status_set_during_the_upload_is_kept(self):
+        submission_id = self.spool_job()
+        apply(self.db, group_counts(self.db.submissions, {}))
+        storage = FakeStorage()
+        upload = storage.upload
+
+        def review_meanwhile(*args):
+            self.db.submissions.update_one({"_id": submission_id}, {"$set": {"status": "Reviewed"}})
+            apply(self.db, status_change_deltas({("11th", "Essay", UPLOADING): 1}, "Reviewed")[0])
+            return upload(*args)
+
+        storage.upload = review_meanwhile
+        self.assertEqual(drain_spool(storage, backoff=0), (1, 0))
+        submission = self.db.submissions.find_one({"_id": submission_id})
+        self.assertEqual((submission["status"], submission["download_url"]), ("Reviewed", "https://download/essay.pdf"))
+        self.assertEqual(
+            {(doc["status"], doc["count"]) for doc in self.db[ROLLUP_COLLECTION].find({"count": {"$ne": 0}})},
+            {("Reviewed", 1)},
+        )
+
+    def test_failed_upload_is_set_aside(self):
+        submission_id = self.spool_job()
+        self.assertEqual(drain_spool(FakeStorage(fail=True), max_attempts=2, backoff=0), (0, 1))
+        self.assertEqual(self.db.submissions.find_one({"_id": submission_id})["status"], UPLOAD_FAILED)
+        self.assertEqual(self.files(), [".bin", ".failed"])  # Kept to re-queue by hand
+
+    def test_job_finished_by_another_pass(self):
+        self.assertFalse(process_job(os.path.join(self.spool, "gone.working"), FakeStorage()))
+
+
+
+def lecture(name, pdf=False, description=None):
+    # Every field present: mongomock drops a $push-ed sub-document with a missing field, MongoDB only that field
+    return {"video_name": name, "video_url": f"https://videos/{name}", "pdf_url": f"https://pdfs/{name}" if pdf else "",
+            "description": description or f"About {name}"}
+
+
+class LectureVideoLayoutTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        ensure_indexes(self.db, [VIDEOS_COLLECTION])
+        self.factory = APIRequestFactory()
+        # Embedded layout, as the chapters were stored before lecture_videos
+        self.chapters = self.db.videos_lectures.insert_many([
+            {"class": "11th", "subject": "Maths", "chapter": "Sets",
+             # The old layout allowed repeated names
+             "videos": [lecture("Intro"), lecture("Venn", pdf=True), lecture("Intro", description="Second take")]},
+            {"class": "11th", "subject": "Maths", "chapter": "Limits", "videos": [lecture("Epsilon")]},
+            {"class": "11th", "subject": "Physics", "chapter": "Motion", "videos": []},
+            {"class": "12th", "subject": "Maths", "chapter": "Sets", "videos": [lecture("Other class")]},
+        ]).inserted_ids
+
+    def trees(self):
+        bump_version("videos_lectures", "11th")  # The student tree is cached
+        admin = VideoListView.as_view()(self.factory.get("/", {"class": "11th"})).data
+        student = StudentListVideosLecturesView.as_view()(self.factory.get("/", {"class_grade": "11th"})).data
+        return admin, student
+
+    def test_trees_match_across_layouts(self):
+        legacy = self.trees()
+        self.assertEqual(list(legacy[0]), ["Maths", "Physics"])
+        self.assertEqual([video["video_name"] for video in legacy[0]["Maths"]["Sets"]], ["Intro", "Venn", "Intro"])
+        self.assertEqual(legacy[0]["Physics"], {"Motion": []})
+        self.assertEqual(len(legacy[1]["data"]["Maths"]["Sets"]["pdfs"]), 1)
+
+        self.assertEqual(migrate_chapter(self.db, self.chapters[0]), 2)  # The repeated name stays embedded
+        self.assertEqual(self.trees(), legacy)  # Mixed
+        for chapter_id in self.chapters[1:]:
+            migrate_chapter(self.db, chapter_id)
+        self.assertEqual(self.trees(), legacy)  # Migrated
+
+    def test_second_migration_does_nothing(self):
+        self.assertEqual(migrate_chapter(self.db, self.chapters[0]), 2)
+        moved = list(self.db[VIDEOS_COLLECTION].find())
+        self.assertEqual(migrate_chapter(self.db, self.chapters[0]), 0)
+        self.assertEqual(list(self.db[VIDEOS_COLLECTION].find()), moved)
+        self.assertEqual(self.db.videos_lectures.find_one({"_id": self.chapters[0]})["videos"],
+                         [lecture("Intro", description="Second take")])
+
+    def test_duplicate_chapters_are_merged(self):
+        duplicate = self.db.videos_lectures.insert_one(
+            {"class": "11th", "subject": "Maths", "chapter": "Limits", "videos": [lecture("Delta")]}).inserted_id
+        self.db[VIDEOS_COLLECTION].insert_one({"chapter_id": duplicate, "class": "11th", "subject": "Maths",
+                                               "chapter": "Limits", **lecture("Continuity")})
+        self.assertEqual(merge_duplicate_chapters(self.db), 1)
+        self.assertIsNone(self.db.videos_lectures.find_one({"_id": duplicate}))
+        kept = self.db.videos_lectures.find_one({"_id": self.chapters[1]})
+        self.assertEqual([video["video_name"] for video in kept["videos"]], ["Epsilon", "Delta"])
+        self.assertEqual(self.db[VIDEOS_COLLECTION].find_one({"video_name": "Continuity"})["chapter_id"], self.chapters[1])
+        self.assertEqual(merge_duplicate_chapters(self.db), 0)
+
+    def test_failed_add_rolls_back(self):
+        add_videos(self.db, "11th", "Maths", "Limits", [lecture("Delta")])  # Moves the chapter first
+        before = sorted(doc["video_name"] for doc in self.db[VIDEOS_COLLECTION].find({"chapter": "Limits"}))
+        self.assertEqual(before, ["Delta", "Epsilon"])
+        with self.assertRaises(DuplicateVideo) as raised:
+            add_videos(self.db, "11th", "Maths", "Limits", [lecture("Sequences"), lecture("Epsilon")])
+        self.assertEqual(raised.exception.video_name, "Epsilon")
+        self.assertEqual(sorted(doc["video_name"] for doc in self.db[VIDEOS_COLLECTION].find({"chapter": "Limits"})), before)
+
+    def test_failed_add_to_a_new_chapter_removes_it(self):
+        with self.assertRaises(DuplicateVideo):
+            add_videos(self.db, "11th", "Maths", "Vectors", [lecture("Dot"), lecture("Dot")])
+        self.assertIsNone(self.db.videos_lectures.find_one({"chapter": "Vectors"}))
+        self.assertIsNone(self.db[VIDEOS_COLLECTION].find_one({"chapter": "Vectors"}))
+
+
+
+class IdentityView(APIView):
+    def get(self, request):
+        return Response({name: identity_param(request, name) for name in ("student_id", "class_grade")})
+
+
+class TokenTests(SimpleTestCase):
+
+    def setUp(self):
+        use_fakes()
+        self.factory = APIRequestFactory()
+        self.student_id = str(ObjectId())
+        self.tokens = issue_tokens(STUDENT, self.student_id, student_id=self.student_id, class_grade="11th")
+
+    def identity(self, access=None, **params):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {access}"} if access else {}
+        return IdentityView.as_view()(self.factory.get("/", params, **headers))
+
+    def refresh(self, token):
+        return TokenRefreshView.as_view()(self.factory.post("/", {"refresh": token}, format="json"))
+
+    def test_claims_take_precedence_over_query_params(self):
+        response = self.identity(self.tokens["access"], student_id="someone-else", class_grade="12th")
+        self.assertEqual(response.data, {"student_id": self.student_id, "class_grade": "11th"})
+
+    def test_query_params_without_a_student_token(self):
+        self.assertEqual(self.identity(student_id="s1", class_grade="12th").data, {"student_id": "s1", "class_grade": "12th"})
+        admin = issue_tokens(ADMIN, ObjectId(), email="admin@example.com")
+        self.assertEqual(self.identity(admin["access"], class_grade="12th").data["class_grade"], "12th")
+
+    def test_revoked_access_token_is_rejected(self):
+        self.assertEqual(self.identity(self.tokens["access"]).status_code, 200)
+        revoke(STUDENT, self.student_id)
+        self.assertEqual(self.identity(self.tokens["access"]).status_code, 401)
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+
+    def test_tampered_token_is_rejected(self):
+        self.assertEqual(self.identity(self.tokens["access"][:-2] + "xx").status_code, 401)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        rotated = self.refresh(self.tokens["refresh"])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertNotEqual(rotated.data["refresh"], self.tokens["refresh"])
+        self.assertEqual(self.identity(rotated.data["access"]).data["student_id"], self.student_id)
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data["refresh"]).status_code, 200)
+
+    def test_refresh_is_required(self):
+        self.assertEqual(self.refresh("").status_code, 400)
+
+
+
+class StudentImportTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        ensure_indexes(self.db, ["students"])
+        self.db.students.insert_one({"name": "Asha", "username": "asha", "password": "x", "class_grade": "11th"})
+        self.factory = APIRequestFactory()
+
+    def upload(self, name, content):
+        request = self.factory.post("/", {"file": SimpleUploadedFile(name, content)}, format="multipart")
+        return BulkImportStudentsView.as_view()(request)
+
+    def test_csv_report_per_row(self):
+        response = self.upload("students.csv", (
+            "name,username,password,class_grade\n"
+            "Ravi,ravi,pw1,11th\n"
+            "Asha again,asha,pw2,11th\n"  # Already in the collection
+            "Ravi again,ravi,pw3,12th\n"  # Repeated within the file
+            "No password,nopass,,11th\n"
+            "Wrong class,wrong,pw4,13th\n"
+            "Meera,meera,pw5,12th\n"
+        ).encode())
+        self.assertEqual(response.status_code, 200)
+        report = response.data
+        self.assertEqual(report["summary"], {"inserted": 2, "duplicates": 2, "invalid": 2})
+        self.assertEqual([(row["row"], row["username"]) for row in report["inserted"]], [(1, "ravi"), (6, "meera")])
+        self.assertEqual([(row["row"], row["username"]) for row in report["duplicates"]], [(2, "asha"), (3, "ravi")])
+        self.assertEqual([row["row"] for row in report["invalid"]], [4, 5])
+        self.assertIn("password", report["invalid"][0]["error"])
+        self.assertEqual(self.db.students.count_documents({}), 3)
+
+    def test_jsonl_rows_that_arent_objects(self):
+        report = self.upload("students.jsonl", b'{"name": "Ravi", "username": "ravi", "password": "p", "class_grade": "11th"}\n'
+                                               b'not json\n\n[1, 2]\n').data
+        self.assertEqual(report["summary"], {"inserted": 1, "duplicates": 0, "invalid": 2})
+        self.assertEqual([row["row"] for row in report["invalid"]], [2, 4])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.upload("students.xlsx", b"").status_code, 400)
+
+    def test_concurrent_create_of_the_same_username(self):
+        data = {"name": "Asha", "username": "asha", "password": "y", "class_grade": "11th"}
+        with mock.patch.object(type(self.db.students), "find_one", return_value=None):  # Both passed the check
+            response = CreateStudentView.as_view()(self.factory.post("/", data, format="json"))
+        self.assertEqual((response.status_code, response.data), (400, {"error": "Username already exists"}))
+
+
+
+class CachedLecturesView(APIView):
+    calls = 0
+
+    @read_through_cache("test_lectures", "videos_lectures")
+    def get(self, request):
+        CachedLecturesView.calls += 1
+        return Response({"videos": [{"video_name": f"Lecture {i}", "video_url": f"https://videos/{i}"} for i in range(100)]})
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressedCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        use_fakes()
+        CachedLecturesView.calls = 0
+        self.factory = APIRequestFactory()
+        self.middleware = CompressionMiddleware(lambda request: self.view(request))
+
+    def view(self, request):
+        response = CachedLecturesView.as_view()(request)
+        return response.render() if hasattr(response, "render") else response
+
+    def get(self, accept_encoding="gzip", **headers):
+        request = self.factory.get("/", {"class_grade": "11th"}, HTTP_ACCEPT_ENCODING=accept_encoding, **headers)
+        return self.middleware(request)
+
+    def test_compressed_variant_is_cached_and_served(self):
+        first = self.get()
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertTrue(first["ETag"].endswith('-gzip"'))
+        body = gzip.decompress(first.content)
+
+        second = self.get()
+        self.assertEqual((second["Content-Encoding"], second["ETag"]), ("gzip", first["ETag"]))
+        self.assertEqual(gzip.decompress(second.content), body)
+        self.assertEqual(CachedLecturesView.calls, 1)
+        self.assertIn("Accept-Encoding", second["Vary"])
+
+        identity = self.get(accept_encoding="")
+        self.assertFalse(identity.has_header("Content-Encoding"))
+        self.assertEqual(identity.content, body)
+
+    def test_gzip_etag_revalidates(self):
+        etag = self.get()["ETag"]
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)  # The client's representation, suffix included
+        self.assertEqual(CachedLecturesView.calls, 1)
+
+    def test_stale_variant_isnt_served_after_a_bump(self):
+        etag = self.get()["ETag"]
+        bump_version("videos_lectures", "11th")
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CachedLecturesView.calls, 2)
+
+    @skipIf(brotli is None, "brotli isn't installed")
+    def test_brotli_preferred_and_cached_separately(self):
+        br = self.get(accept_encoding="gzip, br")
+        self.assertEqual(br["Content-Encoding"], "br")
+        gz = self.get(accept_encoding="gzip")
+        self.assertEqual(gz["Content-Encoding"], "gzip")
+        self.assertEqual(brotli.decompress(br.content), gzip.decompress(gz.content))
+        self.assertNotEqual(br["ETag"], gz["ETag"])
+        self.assertEqual(self.get(accept_encoding="br").content, br.content)  # Stored variant
+        self.assertEqual(CachedLecturesView.calls, 1)
+
+
+
+class BulkSubmissionViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.ids = self.db.submissions.insert_many(
+            [{"class_grade": "11th", "assignment_title": "Essay", "status": "Pending"} for _ in range(3)]
+        ).inserted_ids
+        self.factory = APIRequestFactory()
+
+    def patch(self, **data):
+        return AdminBulkUpdateSubmissionsView.as_view()(self.factory.patch("/", data, format="json"))
+
+    def delete(self, **data):
+        return AdminBulkDeleteSubmissionsView.as_view()(self.factory.delete("/", data, format="json"))
+
+    def test_invalid_input(self):
+        cases = {
+            "no ids or filter": {},
+            "empty ids": {"ids": []},
+            "ids not a list": {"ids": str(self.ids[0])},
+            "too many ids": {"ids": [str(ObjectId()) for _ in range(MAX_BULK_IDS + 1)]},
+            "both": {"ids": [str(self.ids[0])], "filter": {"class_grade": "11th"}},
+            "empty filter": {"filter": {}},
+            "unknown filter fields only": {"filter": {"student_name": "Asha", "class_grade": ""}},
+            "operator in a filter": {"filter": {"status": {"$ne": "Graded"}}},
+            "invalid class": {"filter": {"class_grade": "13th"}},
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.patch(status="Graded", **data).status_code, 400)
+                self.assertEqual(self.delete(**data).status_code, 400)
+        self.assertEqual(self.patch(ids=[str(self.ids[0])]).status_code, 400)  # No status
+        self.assertEqual(self.db.submissions.count_documents({"status": "Pending"}), 3)
+
+    def test_ids_that_arent_object_ids_match_nothing(self):
+        response = self.patch(status="Graded", ids=["not-an-id", 42, {"$ne": None}])
+        self.assertEqual(response.data, {"matched_count": 0, "modified_count": 0})
+
+    def test_update_and_delete_by_ids(self):
+        response = self.patch(status="Graded", ids=[str(self.ids[0]), str(self.ids[1]), "missing"])
+        self.assertEqual(response.data, {"matched_count": 2, "modified_count": 2})
+        self.assertEqual(self.delete(filter={"status": "Graded"}).data, {"deleted_count": 2})
+        self.assertEqual(self.db.submissions.count_documents({}), 1)
+
+
+
+class MetricsEndpointTests(SimpleTestCase):
+
+    def scrape(self, token=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        return metrics_view(RequestFactory().get("/metrics", **headers))
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_closed_without_a_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=True)
+    def test_open_in_debug(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN="s3cret", DEBUG=True)
+    def test_token_required_when_set(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape("wrong").status_code, 401)
+        self.assertEqual(self.scrape("s3cret").status_code, 200)
+
+
+
+def slow_entry(shape_hash="a", duration_ms=800.0):
+    return {"ts": datetime.datetime.now(datetime.timezone.utc), "command": "find", "collection": "submissions",
+            "view": "app.views.ListSubmissionsView", "duration_ms": duration_ms, "shape": "{}",
+            "shape_hash": shape_hash, "docs_returned": 20}
+
+
+class SlowQueryTests(SimpleTestCase):
+    explain = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+               "executionStats": {"totalDocsExamined": 50000, "totalKeysExamined": 0, "nReturned": 20}}
+
+    def setUp(self):
+        self.db = mongomock.MongoClient().studentApp_test
+        self.db.create_collection("slow_queries")  # Capped on MongoDB, which mongomock can't create
+
+    def test_explained_by_default_once_per_interval(self):
+        recorder = SlowQueryRecorder()
+        with mock.patch.object(self.db, "command", return_value=self.explain) as command:
+            recorder.write(slow_entry(), {"find": "submissions", "filter": {}}, self.db)
+            recorder.write(slow_entry(), {"find": "submissions", "filter": {}}, self.db)
+            recorder.write(slow_entry("b"), {"find": "submissions", "filter": {}}, self.db)
+        self.assertEqual(command.call_count, 2)  # Shapes a and b, a's second entry waits for the interval
+        entries = list(self.db.slow_queries.find({}, {"_id": 0, "shape_hash": 1, "docs_examined": 1, "plan_stages": 1}))
+        self.assertEqual(entries, [
+            {"shape_hash": "a", "docs_examined": 50000, "plan_stages": ["COLLSCAN"]},
+            {"shape_hash": "a"},
+            {"shape_hash": "b", "docs_examined": 50000, "plan_stages": ["COLLSCAN"]},
+        ])
+
+    def test_top_offenders_compare_examined_and_returned(self):
+        self.db.slow_queries.insert_many([
+            {**slow_entry("a", 900), "docs_examined": 50000, "plan_returned": 20},
+            slow_entry("a", 700),
+            slow_entry("b", 1000),  # Never explained
+        ])
+        offenders = {doc["shape_hash"]: doc for doc in top_offenders(self.db)}
+        self.assertEqual(list(offenders), ["a", "b"])  # By total time
+        self.assertEqual((offenders["a"]["count"], offenders["a"]["examined_per_returned"]), (2, 2500.0))
+        self.assertIsNone(offenders["b"]["examined_per_returned"])
+
+
+
+class EnsureIndexesCommandTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+
+    def test_duplicate_usernames_are_listed(self):
+        self.db.students.insert_many([{"username": name} for name in ("asha", "ravi", "asha", "meera", "asha", "ravi")])
+        self.assertEqual(duplicate_keys(self.db, "students"),
+                         [("username_unique", ("asha",), 3), ("username_unique", ("ravi",), 2)])
+        stderr = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "students has duplicates of a unique key"):
+            call_command("ensure_indexes", collection=["students"], skip_explain=True, stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("students.username_unique: asha (3 documents)", stderr.getvalue())
+        self.assertIn("ravi (2 documents)", stderr.getvalue())
+
+    def test_builds_the_indexes(self):
+        self.db.students.insert_many([{"username": "asha"}, {"username": "ravi"}])
+        call_command("ensure_indexes", collection=["students"], skip_explain=True, stdout=io.StringIO())
+        self.assertTrue(self.db.students.index_information()["username_unique"]["unique"])
+
+
+
+class ConnectionManagerTests(SimpleTestCase):
+
+    def test_redis_client_is_reused_per_process(self):
+        manager = ConnectionManager()
+        client = manager.redis()
+        self.assertIs(manager.redis(), client)
+        self.assertIs(client.connection_pool, manager.redis_pool())
+        manager._pid = -1  # As after a fork
+        self.assertIsNot(manager.redis(), client)
+
+    def test_failed_connect_raises_instead_of_exiting(self):
+        manager = ConnectionManager()
+        with mock.patch("app.db.MongoClient", side_effect=ConfigurationError("bad URI")), \
+                self.assertLogs("app.db", "CRITICAL"), self.assertRaises(ConfigurationError):
+            manager.database()
+
+
+
+class FieldSetTests(SimpleTestCase):
+    fields = FieldSet({"id": "_id", "title": "title", "due": ("due_date", "due_time")}, default=("id", "title"))
+
+    def test_default_and_requested_fields(self):
+        self.assertEqual(self.fields.parse({}), ("id", "title"))
+        self.assertEqual(self.fields.parse({"fields": " due, id,due ,"}), ("due", "id"))  # Trimmed, deduplicated
+        self.assertEqual(self.fields.projection(("due",)), {"_id": 1, "due_date": 1, "due_time": 1})
+
+    def test_invalid_fields(self):
+        for raw in (",", "id,password", "title,$where"):
+            with self.subTest(fields=raw), self.assertRaises(InvalidFields):
+                self.fields.parse({"fields": raw})
+
+    def test_resolve_trims_the_formatted_document(self):
+        projection, formatter = self.fields.resolve({"fields": "title"}, lambda doc: {**doc, "id": doc["_id"]})
+        self.assertEqual(projection, {"_id": 1, "title": 1})
+        self.assertEqual(formatter({"_id": 1, "title": "Essay", "secret": "x"}), {"title": "Essay"})
+        self.assertEqual(select_fields(lambda doc: doc, ("title", "due"))({"title": "Essay"}), {"title": "Essay"})
+
+
+class StudentFieldsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.db.students.insert_one({"name": "Asha", "username": "asha", "password": "pw", "class_grade": "11th"})
+        self.factory = APIRequestFactory()
+
+    def list(self, **params):
+        return ListStudentsView.as_view()(self.factory.get("/", params))
+
+    def test_password_is_never_returned(self):
+        self.assertNotIn("password", self.list().data[0])
+        self.assertEqual(self.list(fields="id,name,username,password,class_grade").status_code, 400)
+        self.assertEqual(set(self.list(fields="name,created_at").data[0]), {"name"})  # created_at is unset here
+
+
+
+class StreamingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.db.students.insert_many(
+            [{"name": f"Student {i}", "username": f"s{i}", "password": "pw", "class_grade": "11th"} for i in range(7)]
+        )
+        self.factory = APIRequestFactory()
+
+    def list(self, params, **headers):
+        return ListStudentsView.as_view()(self.factory.get("/", params, **headers))
+
+    def test_json_array_in_batches(self):
+        response = self.list({"stream": "1", "batch_size": "3"})
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 5)  # "[", three batches of 3/3/1, "]"
+        self.assertEqual(json.loads(b"".join(chunks)), json.loads(self.list({}).render().content))
+
+    def test_ndjson(self):
+        response = self.list({"fields": "name"}, HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{"name": f"Student {i}"} for i in range(7)])
+
+    def test_empty_result_is_an_empty_array(self):
+        self.assertEqual(b"".join(self.list({"stream": "1", "class_grade": "12th"}).streaming_content), b"[]")
+
+    def test_cursor_closed_when_the_client_goes_away(self):
+        cursor = mock.MagicMock()
+        cursor.batch_size.return_value = cursor
+        cursor.__iter__.return_value = iter([{"_id": i} for i in range(10)])
+        request = mock.Mock(query_params={"batch_size": "2"}, accepted_renderer=None)
+        response = stream_response(request, cursor, dict)
+        content = response.streaming_content
+        next(content)
+        next(content)
+        response.close()  # What the server does when the client disconnects
+        cursor.close.assert_called_once()
+
+
+
+class ScoredCollection:
+    """ mongomock has no $text: stands in for the $text match + textScore projection with stored scores """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        text_match, score_projection, *rest = pipeline
+        assert "$text" in text_match["$match"] and score_projection["$project"]["score"] == {"$meta": "textScore"}
+        match = {key: value for key, value in text_match["$match"].items() if key != "$text"}
+        return self.collection.aggregate([{"$match": match}, *rest])
+
+
+class SearchKeysetTests(SimpleTestCase):
+
+    def setUp(self):
+        collection = mongomock.MongoClient().db.queries
+        # Ties on score must be broken by _id, or pages would skip / repeat them
+        collection.insert_many([{"class_grade": "11th" if i % 4 else "12th", "score": [2.5, 1.0, 1.0, 0.5][i % 4]}
+                                for i in range(11)])
+        self.collection = ScoredCollection(collection)
+
+    def all_pages(self, class_grade=None, limit=3):
+        seen, cursor = [], None
+        while True:
+            docs, cursor = search_page(self.collection, "balance sheet", class_grade, {"_id": 1}, limit, cursor)
+            seen.extend(docs)
+            if cursor is None:
+                return seen
+
+    def test_pages_follow_score_then_id(self):
+        seen = self.all_pages()
+        expected = sorted(self.collection.collection.find(), key=lambda doc: (doc["score"], doc["_id"]), reverse=True)
+        self.assertEqual([doc["_id"] for doc in seen], [doc["_id"] for doc in expected])
+
+    def test_class_filter_stays_in_the_text_match(self):
+        seen = self.all_pages("11th", limit=2)
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(self.collection.pipelines[0][0]["$match"], {"$text": {"$search": "balance sheet"}, "class_grade": "11th"})
+
+    def test_cursor_filters_after_scoring(self):
+        first, cursor = search_page(self.collection, "balance", None, {"_id": 1}, 2)
+        pipeline = search_pipeline("balance", None, {"_id": 1}, 2, cursor)
+        self.assertEqual([next(iter(stage)) for stage in pipeline], ["$match", "$project", "$match", "$sort", "$limit"])
+        self.assertEqual(pipeline[2]["$match"]["$or"][0], {"score": {"$lt": first[-1]["score"]}})
+
+
+
+class DashboardSectionTests(SimpleTestCase):
+
+    def setUp(self):
+        use_fakes()
+        self.fetched = []
+        self.sections = {
+            "profile": Section("students", "student", self.fetcher("profile")),
+            "schedule": Section("schedules", "class", self.fetcher("schedule")),
+            "broken": Section("assignments", "class", self.fetcher("broken")),
+        }
+        self.ctx = {"student": "s1", "class": "11th"}
+
+    def fetcher(self, name):
+        def fetch(ctx):
+            self.fetched.append(name)
+            if name == "broken":
+                raise RuntimeError("Mongo timed out")
+            return {"section": name, "class": ctx["class"]}
+        return fetch
+
+    def load(self, names=("profile", "schedule"), params=None):
+        return load_sections(self.sections, list(names), self.ctx, params or {"date": "2025-03-03"})
+
+    def test_misses_are_filled_then_served_with_two_mgets(self):
+        data, errors, etag = self.load()
+        self.assertEqual((sorted(self.fetched), errors), (["profile", "schedule"], {}))
+        self.assertEqual(json.loads(data["schedule"]), {"section": "schedule", "class": "11th"})
+
+        self.fetched.clear()
+        redis_client = connections.redis()
+        with mock.patch.object(redis_client, "mget", wraps=redis_client.mget) as mget:
+            cached, _errors, cached_etag = self.load()
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(mget.call_count, 2)  # Versions, then bodies
+        self.assertEqual((cached, cached_etag), (data, etag))
+
+    def test_a_bump_refetches_only_its_section(self):
+        _data, _errors, etag = self.load()
+        self.fetched.clear()
+        bump_version("schedules", "11th")
+        _data, _errors, new_etag = self.load()
+        self.assertEqual(self.fetched, ["schedule"])
+        self.assertNotEqual(new_etag, etag)
+        self.assertNotEqual(self.load(params={"date": "2025-03-04"})[2], new_etag)
+
+    def test_failing_section_is_reported_not_raised(self):
+        with self.assertLogs("app.dashboard", "ERROR"):
+            data, errors, _etag = self.load(("profile", "broken"))
+        self.assertEqual(set(data), {"profile"})
+        self.assertEqual(errors, {"broken": "Mongo timed out"})
+
+    def test_render_splices_the_encoded_sections(self):
+        body = render_dashboard({"date": "2025-03-03"}, {"profile": b'{"name":"Asha"}', "schedule": b"[]"})
+        self.assertEqual(json.loads(body), {"date": "2025-03-03", "profile": {"name": "Asha"}, "schedule": []})
+
+
+class DashboardViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.db = use_fakes()
+        self.db.schedules.insert_one(slot("Mon", "09:00", "10:00"))
+        self.factory = APIRequestFactory()
+        self.params = {"student_id": str(ObjectId()), "class_grade": "11th", "sections": "schedule,assignments",
+                       "date": "2025-03-03"}
+
+    def get(self, **headers):
+        return StudentDashboardView.as_view()(self.factory.get("/", self.params, **headers))
+
+    def test_etag_and_304(self):
+        first = self.get()
+        body = json.loads(first.content)
+        self.assertEqual((body["day"], [s["subject"] for s in body["schedule"]]), ("Monday", ["Maths"]))
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        self.db.schedules.insert_one(slot("Mon", "11:00", "12:00", subject="Physics"))
+        bump_version("schedules", "11th")
+        second = self.get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([s["subject"] for s in json.loads(second.content)["schedule"]], ["Maths", "Physics"])
+
+    def test_unknown_section(self):
+        self.params["sections"] = "schedule,grades"
+        self.assertEqual(self.get().status_code, 400)
+
+
+
+class AsyncCursor:
+    """ Just enough of pymongo's async cursors over a mongomock cursor """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return list(self.cursor)[:length]
+
+
+class AsyncCollection:
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self.collection.aggregate(*args, **kwargs))
+
+
+class AsyncDatabase:
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.db[name])
+
+
+class AsyncStudentReadTests(SimpleTestCase):
+    """ The async views under ASYNC_STUDENT_READS answer like the sync ones and share their cache entries """
+
+    def setUp(self):
+        patch_mongomock()
+        self.db = mongomock.MongoClient().studentApp_test
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server)
+        connections.use(self.db, self.redis)
+        conns = mock.Mock(db=AsyncDatabase(self.db), redis=fakeredis.aioredis.FakeRedis(server=server))
+        patcher = mock.patch.object(async_db, "loop_connections", return_value=conns)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.student_id = self.db.students.insert_one(
+            {"name": "Asha", "username": "asha", "password": "x", "class_grade": "11th"}).inserted_id
+        self.db.assignments.insert_one({"class_grade": "11th", "title": "Essay", "description": "",
+                                        "due_date": "2025-03-10", "created_at": datetime.datetime(2025, 3, 1)})
+        self.db.schedules.insert_many([slot("Tue", "09:00", "10:00"), slot("Mon", "11:00", "12:00", subject="Physics")])
+        self.db.videos_lectures.insert_one({"class": "11th", "subject": "Maths", "chapter": "Algebra",
+                                            "videos": [lecture("Intro")]})
+        self.endpoints = [
+            (StudentProfileView, AsyncStudentProfileView, {"student_id": str(self.student_id)}),
+            (StudentListAssignmentsView, AsyncStudentListAssignmentsView, {"student_id": str(self.student_id),
+                                                                          "class_grade": "11th"}),
+            (StudentScheduleView, AsyncStudentScheduleView, {"class_grade": "11th", "fields": "subject,day"}),
+            (StudentListVideosLecturesView, AsyncStudentListVideosLecturesView, {"class_grade": "11th"}),
+        ]
+
+    def sync_get(self, view, params, **headers):
+        response = view.as_view()(APIRequestFactory().get("/", params, **headers))
+        response.render()
+        return response
+
+    def async_get(self, view, params, **headers):
+        return asyncio.run(view.as_view()(RequestFactory().get("/", params, **headers)))
+
+    def test_same_payloads_as_the_sync_views(self):
+        for sync_view, async_view, params in self.endpoints:
+            with self.subTest(view=async_view.__name__):
+                self.redis.flushall()
+                expected = self.sync_get(sync_view, params)
+                self.redis.flushall()
+                response = self.async_get(async_view, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_cache_entries_are_shared(self):
+        for sync_view, async_view, params in self.endpoints:
+            with self.subTest(view=async_view.__name__):
+                expected = self.sync_get(sync_view, params)
+                with mock.patch.object(AsyncCollection, "__init__", side_effect=AssertionError("Mongo was read")):
+                    response = self.async_get(async_view, params)
+                self.assertEqual((response.content, response["ETag"]), (expected.content, expected["ETag"]))
+                self.assertEqual(self.async_get(async_view, params, HTTP_IF_NONE_MATCH=expected["ETag"]).status_code, 304)
+
+    def test_validation(self):
+        self.assertEqual(self.async_get(AsyncStudentProfileView, {"student_id": "nope"}).status_code, 400)
+        self.assertEqual(self.async_get(AsyncStudentListAssignmentsView, {"student_id": str(self.student_id),
+                                                                         "class_grade": "13th"}).status_code, 400)
+        self.assertEqual(self.async_get(AsyncStudentScheduleView, {"class_grade": "11th", "fields": "password"}).status_code, 400)
+        self.assertEqual(self.async_get(AsyncStudentListVideosLecturesView, {}).status_code, 400)
+
+    def test_bad_token(self):
+        response = self.async_get(AsyncStudentScheduleView, {"class_grade": "11th"}, HTTP_AUTHORIZATION="Bearer garbage")
+        self.assertEqual(response.status_code, 401)
+
+    def test_routes_follow_the_setting(self):
+        try:
+            for enabled, expected in ((True, AsyncStudentScheduleView), (False, StudentScheduleView)):
+                with self.subTest(enabled=enabled), override_settings(ASYNC_STUDENT_READS=enabled):
+                    importlib.reload(urls)
+                    clear_url_caches()
+                    self.assertIs(resolve("/student/schedule/", urls).func.view_class, expected)
+        finally:
+            importlib.reload(urls)
+            clear_url_caches()
+
+
+
+class DriveClientManagerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.manager = DriveClientManager("unused.json", parent_folder_id="root", folder_ttl=60)
+        self.lookups = []
+
+    def slow_lookup(self, class_grade):
+        self.lookups.append(class_grade)
+        time.sleep(0.05)  # Long enough for every other thread to reach the class lock
+        return f"folder-{class_grade}"
+
+    def test_concurrent_first_submissions_share_one_lookup(self):
+        grades = ["11th"] * 8 + ["12th"] * 4
+        barrier = threading.Barrier(len(grades))
+        results = []
+
+        def submit(class_grade):
+            barrier.wait()
+            results.append((class_grade, self.manager.get_class_folder(class_grade)))
+
+        with mock.patch.object(self.manager, "_lookup_or_create_folder", side_effect=self.slow_lookup):
+            threads = [threading.Thread(target=submit, args=(grade,)) for grade in grades]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(self.lookups), ["11th", "12th"])
+        self.assertEqual(sorted(results), sorted((grade, f"folder-{grade}") for grade in grades))
+        self.assertEqual(self.manager.stats["folder_cache_hits"], len(grades) - 2)
+
+    def test_folder_ids_expire_after_the_ttl(self):
+        now = [1000.0]
+        with mock.patch.object(self.manager, "_lookup_or_create_folder", side_effect=self.slow_lookup), \
+                mock.patch("app.storage.time.monotonic", side_effect=lambda: now[0]):
+            self.manager.get_class_folder("11th")
+            now[0] += 59
+            self.manager.get_class_folder("11th")
+            self.assertEqual(self.lookups, ["11th"])
+            now[0] += 2
+            self.manager.get_class_folder("11th")
+            self.assertEqual(self.lookups, ["11th", "11th"])
+
+            self.manager.forget_folder("11th")
+            self.manager.get_class_folder("11th")
+            self.assertEqual(len(self.lookups), 3)
+
+    def test_lookup_creates_a_missing_folder(self):
+        service = mock.Mock()
+        service.files().list().execute.return_value = {"files": []}
+        service.files().create().execute.return_value = {"id": "new-folder"}
+        with mock.patch.object(self.manager, "get_service", return_value=service):
+            self.assertEqual(self.manager.get_class_folder("11th"), "new-folder")
+            service.files().list().execute.return_value = {"files": [{"id": "existing", "name": "12th"}]}
+            self.assertEqual(self.manager.get_class_folder("12th"), "existing")
+        self.assertEqual((self.manager.stats["folder_lookups"], self.manager.stats["folders_created"]), (2, 1))
+
+    def test_upload_into_a_deleted_folder_forgets_it(self):
+        service = mock.Mock()
+        service.files().create().execute.side_effect = HttpError(mock.Mock(status=404), b"File not found")
+        with mock.patch.object(self.manager, "get_service", return_value=service), \
+                mock.patch.object(self.manager, "_lookup_or_create_folder", side_effect=self.slow_lookup):
+            with self.assertRaises(HttpError):
+                GoogleDriveStorage(self.manager).upload(io.BytesIO(b"pdf"), "essay.pdf", "application/pdf", "11th")
+            self.assertIsNone(self.manager._cached_folder("11th"))
+
+
+
+class LectureTreePipelineTests(SimpleTestCase):
+
+    def test_pipeline_matches_the_python_grouping(self):
+        patch_mongomock()
+        collection = mongomock.MongoClient().studentApp_bench.videos_lectures
+        collection.insert_many([
+            {"class": "11th", "subject": "Maths", "chapter": "Algebra",
+             "videos": [lecture("Intro"), lecture("Sets", pdf=True)]},
+            {"class": "11th", "subject": "Maths", "chapter": "Calculus", "videos": []},
+            {"class": "11th", "chapter": "Loose", "videos": [{**lecture("Notes", pdf=True), "video_url": ""}]},
+            {"class": "11th", "subject": "Physics", "videos": [lecture("Motion")]},
+            {"class": "12th", "subject": "Maths", "chapter": "Algebra", "videos": [lecture("Other class")]},
+        ])
+        query = {"class": "11th"}
+        tree = first_or_none(collection.aggregate(student_lecture_tree_pipeline(query)))
+        self.assertEqual(tree, python_lecture_tree(collection.find(query)))
+        self.assertEqual(set(tree), {"Maths", "Physics", "Unknown Subject"})
+        self.assertEqual(tree["Maths"]["Calculus"], {"videos": [], "pdfs": []})
+
+    def test_bench_command_on_mongomock(self):
+        out = io.StringIO()
+        call_command("bench_lecture_tree", backend="mongomock", videos=40, subjects=2, chapters=4, repeat=1, stdout=out)
+        self.assertIn("pipeline", out.getvalue())  # Raises CommandError when the two outputs differ
+
+    def test_bench_command_refuses_the_app_database(self):
+        with self.assertRaisesMessage(CommandError, "_bench"):
+            call_command("bench_lecture_tree", backend="mongomock", database="studentApp", stdout=io.StringIO())
+
+
+
+class RendererTests(SimpleTestCase):
+
+    def setUp(self):
+        self.oid = ObjectId()
+        self.doc = {
+            "_id": self.oid,
+            "submitted_at": datetime.datetime(2025, 3, 1, 10, 5, 7, 123456),
+            "graded_at": datetime.datetime(2025, 3, 2, 8, 0, tzinfo=datetime.timezone.utc),
+            "due_date": datetime.date(2025, 3, 10),
+            "file": Binary(b"\x00pdf"),
+            "score": Decimal128("9.5"),
+            "tags": [{"by": self.oid}],
+            "name": "Åsa",
+        }
+        self.expected = {
+            "_id": str(self.oid),
+            "submitted_at": "2025-03-01T10:05:07.123456",
+            "graded_at": "2025-03-02T08:00:00+00:00",
+            "due_date": "2025-03-10",
+            "file": "AHBkZg==",
+            "score": "9.5",
+            "tags": [{"by": str(self.oid)}],
+            "name": "Åsa",
+        }
+
+    def test_round_trip(self):
+        self.assertEqual(json.loads(dumps(self.doc)), self.expected)
+
+    @skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_stdlib_fallback_gives_the_same_json(self):
+        with mock.patch.object(renderers, "orjson", None):
+            fallback = dumps(self.doc)
+        self.assertEqual(fallback, dumps(self.doc))
+
+    def test_renderers(self):
+        renderer = MongoJSONRenderer()
+        self.assertEqual(json.loads(renderer.render([self.doc])), [self.expected])
+        indented = renderer.render(self.doc, "application/json; indent=2", {})
+        self.assertEqual((json.loads(indented), indented.count(b"\n") > 1), (self.expected, True))
+        self.assertEqual(renderer.render(None), b"")
+
+        lines = NDJSONRenderer().render([self.doc, {"_id": self.oid}]).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [self.expected, {"_id": str(self.oid)}])
+
+    def test_mongo_json_response(self):
+        self.assertEqual(json.loads(MongoJsonResponse(self.doc).content), self.expected)
+        self.assertEqual(json.loads(MongoJsonResponse([self.oid], safe=False).content), [str(self.oid)])
+        with self.assertRaises(TypeError):
+            MongoJsonResponse([self.oid])
@@ -0,0 +1,144 @@
+# app/timetable.py
+# Schedule slots as minute-of-week intervals.
+#
+# Every schedule document gets start_minute/end_minute (Monday 00:00 = 0) next to
+# its day/start_time/end_time strings. Slots of a class never overlap, which is
+# what makes both lookups here cheap:
+#   - conflict check: only the latest slot starting before the new one ends can
+#     overlap it, so it is one index seek on (class_grade, start_minute). The
+#     create checks again after its insert and backs out on an overlap, so two
+#     concurrent creates can't both keep overlapping slots.
+#   - "now/next": each process keeps the sorted slots of a class in memory and
+#     bisects them; the copy is reloaded when the class's cache version changes
+#     (every schedule write bumps it, see app/cache.py), so a request costs one
+#     Redis GET instead of a Mongo query.
+# `manage.py normalize_schedules` fills the minutes in for older documents.
+import bisect
+import datetime
+import logging
+import threading
+from collections import namedtuple
+
+import redis
+from pymongo import ASCENDING, DESCENDING
+
+from .cache import get_version
+
+logger = logging.getLogger(__name__)
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+TIME_FORMATS = ("%H:%M", "%H:%M:%S")  # <input type="time"> sends HH:MM, or HH:MM:SS with a step
+
+SLOT_PROJECTION = {
+    "class_grade": 1, "subject": 1, "day": 1, "start_time": 1, "end_time": 1, "start_minute": 1, "end_minute": 1,
+}
+
+
+class InvalidSlot(ValueError):
+    pass
+
+
+def parse_day(value):
+    """ Index of a day name (any case) in DAYS """
+    for index, day in enumerate(DAYS):
+        if isinstance(value, str) and value.strip().lower() in (day.lower(), day[:3].lower()):
+            return index
+    raise InvalidSlot(f"Invalid day: {value!r}")
+
+
+def parse_time(value):
+    """ Minutes since midnight of an HH:MM time """
+    for time_format in TIME_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(str(value).strip(), time_format)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    raise InvalidSlot(f"Invalid time: {value!r}, use HH:MM")
+
+
+def normalize(day, start_time, end_time):
+    """ Canonical day/times plus the minute-of-week interval; raises InvalidSlot """
+    index, start, end = parse_day(day), parse_time(start_time), parse_time(end_time)
+    if end <= start:
+        raise InvalidSlot("end_time must be after start_time")
+    offset = index * MINUTES_PER_DAY
+    return {
+        "day": DAYS[index],
+        "start_time": f"{start // 60:02d}:{start % 60:02d}",
+        "end_time": f"{end // 60:02d}:{end % 60:02d}",
+        "start_minute": offset + start,
+        "end_minute": offset + end,
+    }
+
+
+def find_conflict(collection, class_grade, start_minute, end_minute):
+    """ A slot of the class overlapping [start_minute, end_minute), or None """
+    latest = collection.find_one(
+        {"class_grade": class_grade, "start_minute": {"$lt": end_minute}}, SLOT_PROJECTION,
+        sort=[("start_minute", DESCENDING)],
+    )
+    if latest is not None and latest.get("end_minute", 0) > start_minute:
+        return latest
+    return None
+
+
+def find_overlap(collection, class_grade, slot_id, start_minute, end_minute):
+    """
+    Another slot of the class overlapping the just inserted `slot_id`, or None.
+    Two creates can both pass find_conflict before either inserts, so the create
+    checks again afterwards. This doesn't assume the other slots are disjoint,
+    since such a concurrent slot may not be backed out yet.
+    """
+    return collection.find_one({
+        "class_grade": class_grade, "_id": {"$ne": slot_id},
+        "start_minute": {"$lt": end_minute}, "end_minute": {"$gt": start_minute},
+    }, SLOT_PROJECTION)
+
+
+def minute_of_week(moment):
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+class Timetable(namedtuple("Timetable", "version starts slots")):
+    """ The slots of one class sorted by start_minute, with their starts for bisect """
+
+    def at(self, minute):
+        """ (current slot or None, next slot or None, minutes until the next one starts) """
+        if not self.slots:
+            return None, None, None
+        i = bisect.bisect_right(self.starts, minute)
+        current = self.slots[i - 1] if i and self.slots[i - 1]["end_minute"] > minute else None
+        upcoming = self.slots[i] if i < len(self.slots) else self.slots[0]  # After the last one: next week's first
+        return current, upcoming, (upcoming["start_minute"] - minute) % MINUTES_PER_WEEK
+
+
+def load_timetable(collection, class_grade, version):
+    slots = list(collection.find(
+        {"class_grade": class_grade, "start_minute": {"$exists": True}}, SLOT_PROJECTION,
+    ).sort([("start_minute", ASCENDING)]))
+    return Timetable(version, [slot["start_minute"] for slot in slots], slots)
+
+
+_timetables = {}
+_timetables_lock = threading.Lock()
+
+
+def get_timetable(collection, class_grade):
+    """ In-memory timetable of a class, reloaded from Mongo when its schedule version moved """
+    try:
+        version = get_version("schedules", class_grade)
+    except redis.RedisError as e:
+        logger.warning("Cache unavailable for the timetable of %s: %s", class_grade, e)
+        return load_timetable(collection, class_grade, None)  # Can't tell if a copy is stale
+
+    timetable = _timetables.get(class_grade)
+    if timetable is None or timetable.version != version:
+        with _timetables_lock:  # One reload per class at a time, the others wait for it
+            timetable = _timetables.get(class_grade)
+            if timetable is None or timetable.version != version:
+                timetable = load_timetable(collection, class_grade, version)
+                _timetables[class_grade] = timetable
+    return timetable
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     CreateStudentView,
+    BulkImportStudentsView,
     StudentLoginView,
     AdminDeleteStudentView,
     AdminCreateAssignmentView,
@@ -18,21 +20,41 @@ from .views import (
     ListStudentsView,
     ListSubmissionsView,
     AdminDeleteSubmissionView,
+    AdminBulkUpdateSubmissionsView,
+    AdminBulkDeleteSubmissionsView,
     CreateScheduleView,
     ListSchedulesView,
     StudentScheduleView,
+    StudentScheduleNowView,
     AdminDeleteScheduleView, 
     AdminLoginView,
     AdminViewQueries,
     AdminDeleteQuery,
     StudentQueryView,
-    StudentProfileView
+    StudentProfileView,
+    TokenRefreshView,
+    AdminSlowQueriesView,
+    SearchView,
+    StudentDashboardView,
+    AdminSubmissionAnalyticsView,
+    AdminSubmissionEventsView,
 )
+from .async_views import (
+    AsyncStudentProfileView,
+    AsyncStudentListAssignmentsView,
+    AsyncStudentScheduleView,
+    AsyncStudentListVideosLecturesView,
+)
+
+# Under ASGI the student read endpoints can be served by native async views;
+# WSGI deployments keep the sync ones.
+ASYNC_READS = settings.ASYNC_STUDENT_READS
 
 urlpatterns = [
     # Admin Endpoints
     path('admin/login/', AdminLoginView.as_view(), name='admin-login'),
     path('admin/create-student/', CreateStudentView.as_view(), name='create_student'),  # StudentRecordCreate.jsx
+    path('admin/bulk-import-students/', BulkImportStudentsView.as_view(), name='bulk_import_students'),  # CSV / JSONL upload
     path('admin/views-student/', ListStudentsView.as_view(), name='views_student'),  # ViewRecord.jsx
     path('admin/delete-student/<str:student_id>/', AdminDeleteStudentView.as_view(), name='delete-student'),  # delete record
     path('admin/create-assignment/', AdminCreateAssignmentView.as_view(), name='create_assignment'),  # Assignment.jsx
@@ -55,18 +77,30 @@ urlpatterns = [
     path('admin/subjects/', ListSubjectsByClassView.as_view(), name='list-subjects-by-class'),
 
     path("admin/delete-submission/<str:submission_id>/", AdminDeleteSubmissionView.as_view(), name="delete_submission"),
+    path("admin/submission-analytics/", AdminSubmissionAnalyticsView.as_view(), name="submission_analytics"),  # counts from the rollups
+    path("admin/submissions/events/", AdminSubmissionEventsView.as_view(), name="submission_events"),  # SSE live feed
+    path("admin/bulk-update-submission-status/", AdminBulkUpdateSubmissionsView.as_view(), name="bulk_update_submission_status"),
+    path("admin/bulk-delete-submissions/", AdminBulkDeleteSubmissionsView.as_view(), name="bulk_delete_submissions"),
     path('admin/create-schedule/', CreateScheduleView.as_view(), name='create_schedule'),  # CreateSchedule.jsx
     path("admin/list-schedule/", ListSchedulesView.as_view(), name="list_schedule"),
     path('admin/delete-schedule/<str:schedule_id>/', AdminDeleteScheduleView.as_view(), name='delete_schedule'),
     path("admin/view-queries/", AdminViewQueries.as_view(), name="view_queries"),
     path("admin/delete-query/<str:query_id>/", AdminDeleteQuery.as_view(), name="delete_query"),
+    path("admin/search/", SearchView.as_view(), name="search"),  # ?q=&scope=queries|assignments
+    path("admin/slow-queries/", AdminSlowQueriesView.as_view(), name="slow_queries"),  # top slow Mongo operations
 
     # Student Endpoints
     path('student/login/', StudentLoginView.as_view(), name='student_login'),
-    path('student/profile/', StudentProfileView.as_view(), name='student-profile'),
-    path('student/list-assignments/', StudentListAssignmentsView.as_view(), name='list_assignments'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),  # student and admin refresh tokens
+    path('student/profile/', (AsyncStudentProfileView if ASYNC_READS else StudentProfileView).as_view(), name='student-profile'),
+    path('student/dashboard/', StudentDashboardView.as_view(), name='student_dashboard'),  # App start: one round-trip
+    path('student/list-assignments/', (AsyncStudentListAssignmentsView if ASYNC_READS else StudentListAssignmentsView).as_view(),
+         name='list_assignments'),
     path('student/submit-assignment/', StudentSubmitAssignmentView.as_view(), name='submit_assignment'),
-    path('student/list-videos-lectures/', StudentListVideosLecturesView.as_view(), name='list_videos_lectures'),
-    path('student/schedule/', StudentScheduleView.as_view(), name='student_schedule'), 
+    path('student/list-videos-lectures/',
+         (AsyncStudentListVideosLecturesView if ASYNC_READS else StudentListVideosLecturesView).as_view(),
+         name='list_videos_lectures'),
+    path('student/schedule/', (AsyncStudentScheduleView if ASYNC_READS else StudentScheduleView).as_view(), name='student_schedule'), 
+    path('student/schedule/now/', StudentScheduleNowView.as_view(), name='student_schedule_now'),  # current and next class
     path("student/upload-query/", StudentQueryView.as_view(), name="upload_query"),
 ]
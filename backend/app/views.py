@@ -1,33 +1,59 @@
 # app/views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
 from bson import ObjectId # ✅ Required to handle MongoDB ObjectId
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
-from bson.objectid import ObjectId
 from rest_framework.parsers import MultiPartParser, FormParser
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2 import service_account
-import io, os, datetime
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+import io, datetime, time
 from django.conf import settings
 from django.views import View
-from bson import Binary
 from urllib.parse import urljoin
 from urllib.parse import urlparse
-import datetime
-import uuid
+from pymongo.errors import DuplicateKeyError
+import logging
 import json
+import csv
+
 VALID_CLASS_GRADES = [
     "11th", "12th", "FY BCom", "SY BCom", "TY BCom", 
     "CA Foundation", "CA Intermediate", "CA Final"
 ]
 from .db import (
-    get_students_collection, get_admins_collection, get_assignments_collection,get_submissions_collection,
+    connect_to_mongo, get_students_collection, get_admins_collection, get_assignments_collection,get_submissions_collection,
     get_schedules_collection, get_videos_lectures_collection,get_queries_collection
 )
+from .pagination import paginated_response, get_page_size, InvalidCursor, DESCENDING
+from .search import search_page, MAX_TERMS_LENGTH
+from .cache import read_through_cache, bump_version, etag_matches, with_etag
+from .streaming import wants_stream, stream_response
+from .storage import get_storage_backend
+from .submission_worker import spool_submission, UPLOADING
+from .bulk_import import detect_format, iter_rows, import_students
+from .projection import FieldSet, InvalidFields
+from .lecture_videos import DuplicateVideo, add_videos, delete_video, delete_chapter
+from .lectures import admin_video_tree_pipeline, student_lecture_tree_pipeline, lecture_summary_pipeline, first_or_none
+from .dashboard import Section, load_sections, render_dashboard, school_now
+from .rollups import (
+    GROUP_FIELDS as ROLLUP_FIELDS, apply as apply_rollups, bulk_delete, bulk_set_status, record_insert, record_delete,
+    record_status_change, status_change_deltas, summary as rollup_summary,
+)
+from .slow_queries import top_offenders, threshold_ms
+from .timetable import InvalidSlot, find_conflict, find_overlap, get_timetable, minute_of_week, normalize as normalize_slot
+from .events import (
+    SUBMISSION_CREATED, SUBMISSION_DELETED, BULK_STATUS_CHANGED, BULK_DELETED,
+    publish, publish_bulk, publish_status_change, submission_event, event_stream, aevent_stream, get_setting as get_event_setting,
+)
+from .authentication import issue_tokens, revoke, is_revoked, revoke_jti, request_claims, identity_param, STUDENT, ADMIN
+
+logger = logging.getLogger(__name__)
 
 #-----admin----
 
@@ -41,10 +67,11 @@ class AdminLoginView(View):
             password = data.get("password")
 
             # Find admin in MongoDB
-            admin = get_admins_collection().find_one({"email": email, "password": password})
+            admin = get_admins_collection().find_one({"email": email, "password": password}, {"_id": 1, "email": 1})
             
             if admin:
-                return JsonResponse({"message": "Login successful!"}, status=200)
+                tokens = issue_tokens(ADMIN, admin["_id"], email=admin["email"])
+                return JsonResponse({"message": "Login successful!", **tokens}, status=200)
             else:
                 return JsonResponse({"detail": "Invalid email or password"}, status=401)
         
@@ -55,6 +82,35 @@ class AdminLoginView(View):
         return JsonResponse({"detail": "Method not allowed"}, status=405)
 
 
+class TokenRefreshView(APIView):
+    """ New access token (and rotated refresh token) for a student/admin refresh token """
+    authentication_classes = []
+
+    def post(self, request):
+        raw = request.data.get("refresh")
+        if not raw:  # RefreshToken(None) would mint a brand new token
+            return Response({"detail": "refresh is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            refresh = RefreshToken(raw)
+        except TokenError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if is_revoked(refresh):
+            return Response({"detail": "Token has been revoked"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # The old refresh token is retired in Redis instead of the SQL blacklist app
+            revoke_jti(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
 #------StudentCreteListDelete---       
 
 class CreateStudentView(APIView):
@@ -87,8 +143,11 @@ class CreateStudentView(APIView):
             "created_at": datetime.datetime.now().isoformat(),
         }
 
-        # Insert the student into the collection
-        result = students.insert_one(student)
+        # Insert the student into the collection; the unique index catches a concurrent create of the same username
+        try:
+            result = students.insert_one(student)
+        except DuplicateKeyError:
+            return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             'id': str(result.inserted_id),
@@ -97,6 +156,42 @@ class CreateStudentView(APIView):
             'class_grade': class_grade
         }, status=status.HTTP_201_CREATED)
 
+def format_student(student):
+    student["id"] = student.pop("_id")  # ObjectId is encoded by the renderer
+    return student
+
+# ?fields= allowlists: response field -> Mongo field. password is never sent, not even when asked for.
+STUDENT_FIELDS = FieldSet(
+    {"id": "_id", "name": "name", "username": "username", "class_grade": "class_grade", "created_at": "created_at"},
+    default=("id", "name", "username", "class_grade"),
+)
+
+class BulkImportStudentsView(APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        file = request.FILES.get("file")
+        if not file:
+            return Response({"error": "A CSV or JSONL file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = detect_format(file.name, request.data.get("format"))
+        if fmt is None:
+            return Response({"error": "Unsupported format. Use .csv or .jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            chunk_size = int(request.data.get("chunk_size", 1000))
+        except ValueError:
+            return Response({"error": "Invalid chunk_size"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_students(iter_rows(file.file, fmt), VALID_CLASS_GRADES, max(1, chunk_size))
+        except UnicodeDecodeError:
+            return Response({"error": "File must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as e:
+            return Response({"error": f"Malformed CSV: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_200_OK)
+
 class ListStudentsView(APIView):
     def get(self, request):
         class_grade = request.query_params.get('class_grade')  # Get class_grade from query params
@@ -108,10 +203,20 @@ class ListStudentsView(APIView):
                 return Response({'error': 'Invalid class_grade.'}, status=400)
             query["class_grade"] = class_grade  # Apply the class filter if provided
 
-        student_list = list(students.find(query))  # Fetch students based on the query
-        for student in student_list:
-            student["id"] = str(student["_id"])  # Convert ObjectId to string
-            del student["_id"]  # Remove the ObjectId field
+        try:
+            projection, format_doc = STUDENT_FIELDS.resolve(request.query_params, format_student)
+        except InvalidFields as e:
+            return Response({'error': str(e)}, status=400)
+
+        if wants_stream(request):
+            return stream_response(request, students.find(query, projection), format_doc)
+
+        # Paginated when the client sends limit/cursor (or legacy mode is off)
+        page = paginated_response(request, students, query, format_doc, projection=projection)
+        if page is not None:
+            return page
+
+        student_list = [format_doc(student) for student in students.find(query, projection)]
 
         return Response(student_list, status=status.HTTP_200_OK)
 
@@ -122,6 +227,8 @@ class AdminDeleteStudentView(APIView):
             result = students.delete_one({"_id": ObjectId(student_id)})
 
             if result.deleted_count == 1:
+                bump_version("students", student_id)
+                revoke(STUDENT, student_id)  # Outstanding tokens stop working straight away
                 return Response({"message": "✅ Student deleted successfully!"}, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "❌ Student not found!"}, status=status.HTTP_404_NOT_FOUND)
@@ -131,6 +238,12 @@ class AdminDeleteStudentView(APIView):
 
 #------quries----
 
+def format_query(q):
+    q["id"] = q.pop("_id")  # ObjectId is encoded by the renderer
+    return q
+
+QUERY_FIELDS = FieldSet({"id": "_id", "studentName": "studentName", "class_grade": "class_grade", "query": "query"})
+
 class AdminViewQueries(APIView):
     def get(self, request):
         class_grade = request.query_params.get("class_grade")
@@ -138,11 +251,19 @@ class AdminViewQueries(APIView):
 
         query_filter = {"class_grade": class_grade} if class_grade else {}
 
-        queries = list(queries_collection.find(query_filter, {"_id": 1, "studentName": 1, "class_grade": 1, "query": 1}))
+        try:
+            projection, format_doc = QUERY_FIELDS.resolve(request.query_params, format_query)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if wants_stream(request):
+            return stream_response(request, queries_collection.find(query_filter, projection), format_doc)
+
+        page = paginated_response(request, queries_collection, query_filter, format_doc, projection=projection)
+        if page is not None:
+            return page
 
-        for q in queries:
-            q["id"] = str(q["_id"])  # Convert ObjectId to string
-            del q["_id"]  # Remove MongoDB default ID
+        queries = [format_doc(q) for q in queries_collection.find(query_filter, projection)]
 
         return Response(queries, status=status.HTTP_200_OK)
 
@@ -185,6 +306,7 @@ class AdminCreateAssignmentView(APIView):
         }
 
         result = assignments.insert_one(data)
+        bump_version("assignments", class_grade)
         data["_id"] = str(result.inserted_id)
         return Response(data, status=201)
 
@@ -194,15 +316,27 @@ class AdminDeleteAssignmentView(APIView):
         if not ObjectId.is_valid(assignment_id):
             return Response({"error": "Invalid assignment ID"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Delete the assignment
+        # Delete the assignment (returning its class so cached lists can be invalidated)
         assignments_collection = get_assignments_collection()
-        result = assignments_collection.delete_one({'_id': ObjectId(assignment_id)})
+        deleted = assignments_collection.find_one_and_delete(
+            {'_id': ObjectId(assignment_id)}, projection={"class_grade": 1}
+        )
 
-        if result.deleted_count == 0:
+        if deleted is None:
             return Response({"error": "Assignment not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        bump_version("assignments", deleted.get("class_grade"))
         return Response({"message": "Assignment deleted successfully"}, status=status.HTTP_200_OK)
    
+def format_assignment(assignment):
+    # ObjectId / datetime are encoded by the renderer (app/renderers.py)
+    return assignment
+
+ASSIGNMENT_FIELDS = FieldSet({
+    "_id": "_id", "class_grade": "class_grade", "title": "title",
+    "description": "description", "due_date": "due_date", "created_at": "created_at",
+})
+
 class AdminListAssignmentView(APIView):
     def get(self, request):
         class_grade = request.query_params.get("class_grade")
@@ -213,18 +347,105 @@ class AdminListAssignmentView(APIView):
                 return Response({"error": "Invalid class_grade"}, status=400)
             query["class_grade"] = class_grade
 
+        try:
+            projection, format_doc = ASSIGNMENT_FIELDS.resolve(request.query_params, format_assignment)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=400)
+
         assignments = get_assignments_collection()
-        results = list(assignments.find(query))
-        for r in results:
-            r["_id"] = str(r["_id"])
+
+        if wants_stream(request):
+            return stream_response(request, assignments.find(query, projection), format_doc)
+
+        page = paginated_response(request, assignments, query, format_doc, projection=projection)
+        if page is not None:
+            return page
+
+        results = [format_doc(r) for r in assignments.find(query, projection)]
 
         return Response(results, status=200)
 
+#-----search------
+SEARCH_SCOPES = {
+    # scope -> (collection getter, FieldSet, formatter)
+    "queries": (get_queries_collection, QUERY_FIELDS, format_query),
+    "assignments": (get_assignments_collection, ASSIGNMENT_FIELDS, format_assignment),
+}
+
+class SearchView(APIView):
+    """
+    GET ?q=<terms>&scope=queries|assignments[&class_grade=][&limit=][&cursor=][&fields=]
+    Text-index search ranked by relevance; every result carries its `score`.
+    """
+
+    def get(self, request):
+        terms = request.query_params.get("q", "").strip()
+        scope = request.query_params.get("scope", "queries")
+        class_grade = request.query_params.get("class_grade")
+
+        if not terms:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(terms) > MAX_TERMS_LENGTH:
+            return Response({"error": f"q is limited to {MAX_TERMS_LENGTH} characters"}, status=status.HTTP_400_BAD_REQUEST)
+        if scope not in SEARCH_SCOPES:
+            return Response({"error": "scope must be one of: " + ", ".join(SEARCH_SCOPES)}, status=status.HTTP_400_BAD_REQUEST)
+        if class_grade and class_grade not in VALID_CLASS_GRADES:
+            return Response({"error": "Invalid class_grade"}, status=status.HTTP_400_BAD_REQUEST)
+
+        get_collection, fields, format_doc = SEARCH_SCOPES[scope]
+        try:
+            projection, format_doc = fields.resolve(request.query_params, format_doc)
+            limit = get_page_size(request)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "Invalid limit."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            docs, next_cursor = search_page(get_collection(), terms, class_grade, projection, limit,
+                                            cursor=request.query_params.get("cursor"))
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        for doc in docs:
+            score = doc.pop("score")
+            results.append({**format_doc(doc), "score": round(score, 4)})
+        return Response({"results": results, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
 #-----Submission-------
 
 BASE_URL = "https://student-backend-8oa3.onrender.com"  # Used only for local files, not Cloudinary
 
 
+def format_submission(submission):
+    # _id and submitted_at stay ObjectId / datetime, the renderer encodes them
+    raw_file_url = submission.get("file_url", "")
+    full_file_url = raw_file_url if raw_file_url.startswith("http") else urljoin(BASE_URL, raw_file_url)
+
+    return {
+        "_id": submission.get("_id", ""),
+        "student_name": submission.get("student_name", ""),
+        "class": submission.get("class_grade", ""),  # ✅ fixed here
+        "assignment_title": submission.get("assignment_title", ""),
+        "filename": submission.get("filename", ""),
+        "file_url": full_file_url,
+        "viewable_url": full_file_url,
+        "download_url": full_file_url,
+        "content_type": submission.get("content_type", ""),
+        "submitted_at": submission.get("submitted_at"),
+        "status": submission.get("status", "Pending")
+    }
+
+URL_FIELDS = ("file_url",)
+SUBMISSION_FIELDS = FieldSet({
+    "_id": "_id", "student_name": "student_name", "class": "class_grade",
+    "assignment_title": "assignment_title", "filename": "filename",
+    "file_url": URL_FIELDS, "viewable_url": URL_FIELDS, "download_url": URL_FIELDS,
+    "content_type": "content_type", "submitted_at": "submitted_at", "status": "status",
+})
+
 class ListSubmissionsView(APIView):
     def get(self, request):
         class_grade = request.query_params.get("class_grade")
@@ -236,33 +457,24 @@ class ListSubmissionsView(APIView):
         # ✅ Fix field name from 'class' to 'class_grade'
         query = {"class_grade": class_grade} if class_grade else {}
 
-        submission_list = list(submissions_collection.find(query).sort("submitted_at", -1))
-
-        formatted_submissions = []
+        try:
+            projection, format_doc = SUBMISSION_FIELDS.resolve(request.query_params, format_submission)
+        except InvalidFields as e:
+            return Response({'error': str(e)}, status=400)
 
-        for submission in submission_list:
-            submitted_at = submission.get("submitted_at")
-            if isinstance(submitted_at, datetime.datetime):
-                submitted_at = submitted_at.isoformat()
+        if wants_stream(request):
+            cursor = submissions_collection.find(query, projection).sort("submitted_at", -1)
+            return stream_response(request, cursor, format_doc)
 
-            raw_file_url = submission.get("file_url", "")
-            full_file_url = raw_file_url if raw_file_url.startswith("http") else urljoin(BASE_URL, raw_file_url)
+        # Newest first; ties on submitted_at are broken by _id for the cursor
+        page = paginated_response(request, submissions_collection, query, format_doc,
+                                  sort_field="submitted_at", direction=DESCENDING, projection=projection)
+        if page is not None:
+            return page
 
-            formatted = {
-                "_id": str(submission.get("_id", "")),
-                "student_name": submission.get("student_name", ""),
-                "class": submission.get("class_grade", ""),  # ✅ fixed here
-                "assignment_title": submission.get("assignment_title", ""),
-                "filename": submission.get("filename", ""),
-                "file_url": full_file_url,
-                "viewable_url": full_file_url,
-                "download_url": full_file_url,
-                "content_type": submission.get("content_type", ""),
-                "submitted_at": submitted_at,
-                "status": submission.get("status", "Pending")
-            }
+        submission_list = submissions_collection.find(query, projection).sort("submitted_at", -1)
 
-            formatted_submissions.append(formatted)
+        formatted_submissions = [format_doc(submission) for submission in submission_list]
 
         return Response(formatted_submissions, status=status.HTTP_200_OK)
 
@@ -289,15 +501,22 @@ class AdminUpdateSubmissionView(APIView):
             else:
                 query = {"_id": submission_id}
 
-            result = submissions.update_one(query, {"$set": {"status": update_data["status"]}})
+            # The previous status is needed to move the submission between rollup groups
+            before = submissions.find_one_and_update(
+                {**query, "status": {"$ne": update_data["status"]}},
+                {"$set": {"status": update_data["status"]}},
+                projection={field: 1 for field in ROLLUP_FIELDS},
+            )
 
-            if result.modified_count > 0:
+            if before is not None:
+                record_status_change(connect_to_mongo(), before, update_data["status"])
+                publish_status_change(before, update_data["status"])
                 return JsonResponse({"message": "Submission status updated successfully."}, status=200)
             else:
                 return JsonResponse({"error": "Submission not found or already updated."}, status=404)
 
         except Exception as e:
-            print("Error in AdminUpdateSubmissionView:", str(e))
+            logger.exception("Error in AdminUpdateSubmissionView: %s", e)
             return JsonResponse({"error": str(e)}, status=500)
 
 class AdminDeleteSubmissionView(APIView):
@@ -310,17 +529,120 @@ class AdminDeleteSubmissionView(APIView):
             else:
                 query = {"_id": submission_id}
 
-            result = submissions.delete_one(query)
+            deleted = submissions.find_one_and_delete(query, projection={field: 1 for field in ROLLUP_FIELDS})
 
-            if result.deleted_count > 0:
+            if deleted is not None:
+                record_delete(connect_to_mongo(), deleted)
+                publish(SUBMISSION_DELETED, deleted.get("class_grade"), submission_event(deleted))
                 return JsonResponse({"message": f"Submission {submission_id} deleted."}, status=200)
             else:
                 return JsonResponse({"error": "Submission not found."}, status=404)
 
         except Exception as e:
-            print("Error in AdminDeleteSubmissionView:", str(e))
+            logger.exception("Error in AdminDeleteSubmissionView: %s", e)
             return JsonResponse({"error": str(e)}, status=500)
 
+MAX_BULK_IDS = 5000
+BULK_FILTER_FIELDS = ("class_grade", "assignment_title", "status")
+
+def to_submission_id(submission_id):
+    """ Submissions may have ObjectId or plain string _ids """
+    return ObjectId(submission_id) if ObjectId.is_valid(submission_id) else submission_id
+
+def bulk_submission_query(data):
+    """ Mongo filter for {"ids": [...]} or {"filter": {...}}, returns (query, error) """
+    ids = data.get("ids")
+    mongo_filter = data.get("filter")
+
+    if ids is not None and mongo_filter is not None:
+        return None, "Provide either 'ids' or 'filter', not both."
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            return None, "'ids' must be a non-empty list."
+        if len(ids) > MAX_BULK_IDS:
+            return None, f"At most {MAX_BULK_IDS} ids per request."
+        return {"_id": {"$in": [to_submission_id(str(i)) for i in ids]}}, None
+
+    if isinstance(mongo_filter, dict):
+        query = {k: v for k, v in mongo_filter.items() if k in BULK_FILTER_FIELDS and isinstance(v, str) and v}
+        if not query:
+            return None, "'filter' needs at least one of: " + ", ".join(BULK_FILTER_FIELDS)
+        if query.get("class_grade") and query["class_grade"] not in VALID_CLASS_GRADES:
+            return None, "Invalid class_grade."
+        return query, None
+
+    return None, "Provide either 'ids' or 'filter'."
+
+class AdminSubmissionAnalyticsView(APIView):
+    """ Submission counts by status, class and assignment, read from the rollups """
+
+    def get(self, request):
+        class_grade = request.query_params.get("class_grade")
+        if class_grade and class_grade not in VALID_CLASS_GRADES:
+            return Response({"error": "Invalid class_grade"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            rollup_summary(connect_to_mongo(), class_grade, request.query_params.get("assignment_title")),
+            status=status.HTTP_200_OK,
+        )
+
+class AdminBulkUpdateSubmissionsView(APIView):
+    def patch(self, request):
+        new_status = request.data.get("status")
+        if not new_status:
+            return Response({"error": "'status' field is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        query, error = bulk_submission_query(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        matched, moved = bulk_set_status(get_submissions_collection(), query, new_status)
+        apply_rollups(connect_to_mongo(), status_change_deltas(moved, new_status)[0])
+        publish_bulk(BULK_STATUS_CHANGED, moved, status=new_status)
+
+        return Response({
+            "matched_count": matched,
+            "modified_count": sum(moved.values())
+        }, status=status.HTTP_200_OK)
+
+class AdminBulkDeleteSubmissionsView(APIView):
+    def delete(self, request):
+        query, error = bulk_submission_query(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        removed = bulk_delete(get_submissions_collection(), query)
+        apply_rollups(connect_to_mongo(), {group: -count for group, count in removed.items()})
+        publish_bulk(BULK_DELETED, removed)
+
+        return Response({"deleted_count": sum(removed.values())}, status=status.HTTP_200_OK)
+
+class AdminSubmissionEventsView(View):
+    """
+    Server-Sent Events feed of submission changes, optionally for one ?class_grade=.
+    A plain Django view: DRF content negotiation would reject Accept: text/event-stream.
+    EventSource reconnects with Last-Event-ID (or ?last_event_id=) and gets what it missed.
+    """
+
+    def get(self, request):
+        class_grade = request.GET.get("class_grade")
+        if class_grade and class_grade not in VALID_CLASS_GRADES:
+            return JsonResponse({"error": "Invalid class_grade"}, status=400)
+
+        max_seconds = get_event_setting("SSE_MAX_SECONDS")
+        try:
+            duration = min(max(float(request.GET.get("duration", max_seconds)), 0), max_seconds)
+        except ValueError:
+            return JsonResponse({"error": "'duration' must be a number of seconds"}, status=400)
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        # Under ASGI the feed is a coroutine; under WSGI it holds this worker thread
+        stream = aevent_stream if isinstance(request, ASGIRequest) else event_stream
+        response = StreamingHttpResponse(stream(class_grade, last_event_id, duration), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx would otherwise buffer the events
+        return response
+
 #  --VideosLecture-
 
 class VideoCreateView(APIView):
@@ -336,14 +658,6 @@ class VideoCreateView(APIView):
         if not videos or not isinstance(videos, list):
             return Response({"error": "At least one video is required"}, status=400)
 
-        collection = get_videos_lectures_collection()
-
-        existing_doc = collection.find_one({
-            "class": data["class"],
-            "subject": data["subject"],
-            "chapter": data["chapter"]
-        })
-
         for video in videos:
             if not video.get("video_name") or not video.get("video_url"):
                 return Response({"error": "Each video must have a name and URL"}, status=400)
@@ -356,66 +670,35 @@ class VideoCreateView(APIView):
             except ValueError:
                 return Response({"error": "Invalid video URL format"}, status=400)
 
-        if existing_doc:
-            # Check for duplicates
-            existing_video_names = [v["video_name"] for v in existing_doc["videos"]]
-            for video in videos:
-                if video["video_name"] in existing_video_names:
-                    return Response({"error": f"Duplicate video name: {video['video_name']}"}, status=400)
-
-            # Push all videos
-            collection.update_one(
-                {"_id": existing_doc["_id"]},
-                {"$push": {"videos": {"$each": videos}}}
-            )
-        else:
-            collection.insert_one({
-                "class": data["class"],
-                "subject": data["subject"],
-                "chapter": data["chapter"],
-                "videos": videos,
-                "created_at": datetime.datetime.utcnow()
-            })
+        # One document per video; the unique index rejects duplicate names in the same insert
+        try:
+            add_videos(connect_to_mongo(), data["class"], data["subject"], data["chapter"], videos)
+        except DuplicateVideo as e:
+            return Response({"error": str(e)}, status=400)
 
+        bump_version("videos_lectures", data["class"])
         return Response({"message": "Videos added successfully"}, status=201)
 
 class VideoDeleteView(APIView):
     def delete(self, request):
         data = request.data
-        collection = get_videos_lectures_collection()
 
-        result = collection.update_one(
-            {
-                "class": data["class"],
-                "subject": data["subject"],
-                "chapter": data["chapter"]
-            },
-            {
-                "$pull": {
-                    "videos": {
-                        "video_name": data["video_name"]
-                    }
-                }
-            }
-        )
-
-        if result.modified_count:
+        if delete_video(connect_to_mongo(), data["class"], data["subject"], data["chapter"], data["video_name"]):
+            bump_version("videos_lectures", data["class"])
             return Response({"message": "Video deleted"}, status=200)
         return Response({"error": "Video not found"}, status=404)
 
 class ChapterDeleteView(APIView):
     def delete(self, request, class_name, subject, chapter):
-        collection = get_videos_lectures_collection()
-        result = collection.delete_one({
-            "class": class_name,
-            "subject": subject,
-            "chapter": chapter
-        })
-
-        if result.deleted_count:
+        if delete_chapter(connect_to_mongo(), class_name, subject, chapter):
+            bump_version("videos_lectures", class_name)
             return Response({"message": "Chapter deleted"}, status=200)
         return Response({"error": "Chapter not found"}, status=404)
 
+VIDEO_FIELDS = FieldSet({
+    "video_name": "video_name", "video_url": "video_url", "pdf_url": "pdf_url", "description": "description",
+})
+
 class VideoListView(APIView):
     def get(self, request):
         selected_class = request.GET.get("class")
@@ -434,26 +717,18 @@ class VideoListView(APIView):
         if selected_chapter:
             query["chapter"] = selected_chapter
 
-        data = list(collection.find(query))
-
-        if not data:
-            return Response({"message": "No videos found for the given filters."}, status=404)
-
-        response = {}
-        for doc in data:
-            subject = doc.get("subject")
-            chapter = doc.get("chapter")
-            videos = doc.get("videos", [])
-
-            if subject not in response:
-                response[subject] = {}
+        try:
+            video_fields = VIDEO_FIELDS.parse(request.GET)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=400)
 
-            if chapter not in response[subject]:
-                response[subject][chapter] = []
+        # Grouped into subject -> chapter -> videos by Mongo, only the requested per-video fields
+        tree = first_or_none(collection.aggregate(admin_video_tree_pipeline(query, video_fields), allowDiskUse=True))
 
-            response[subject][chapter].extend(videos)
+        if not tree:
+            return Response({"message": "No videos found for the given filters."}, status=404)
 
-        return Response(response, status=200)
+        return Response(tree, status=200)
 
 class ListSubjectsByClassView(APIView):
     def get(self, request):
@@ -472,6 +747,13 @@ class ListSubjectsByClassView(APIView):
 
 
 #------Schedule---
+def schedule_conflict(conflict):
+    return JsonResponse({
+        "error": f"Overlaps {conflict.get('subject')} on {conflict.get('day')} "
+                 f"{conflict.get('start_time')}-{conflict.get('end_time')}.",
+        "conflict_id": str(conflict["_id"]),
+    }, status=409)
+
 class CreateScheduleView(APIView):
     def post(self, request):
         schedules = get_schedules_collection()
@@ -480,19 +762,41 @@ class CreateScheduleView(APIView):
         if class_grade not in VALID_CLASS_GRADES:
             return JsonResponse({"error": "Invalid class_grade."}, status=400)
 
+        try:
+            slot = normalize_slot(request.data.get("day"), request.data.get("start_time"), request.data.get("end_time"))
+        except InvalidSlot as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        conflict = find_conflict(schedules, class_grade, slot["start_minute"], slot["end_minute"])
+        if conflict is not None:
+            return schedule_conflict(conflict)
+
         schedule_data = {
             "class_grade": class_grade,
             "subject": request.data.get("subject"),
-            "day": request.data.get("day"),
-            "start_time": request.data.get("start_time"),
-            "end_time": request.data.get("end_time"),
+            **slot,
         }
 
         inserted = schedules.insert_one(schedule_data)
+        # A concurrent create may have passed the check above too; the later check of the two sees both
+        conflict = find_overlap(schedules, class_grade, inserted.inserted_id, slot["start_minute"], slot["end_minute"])
+        if conflict is not None:
+            schedules.delete_one({"_id": inserted.inserted_id})
+            return schedule_conflict(conflict)
+        bump_version("schedules", class_grade)
         schedule_data["_id"] = str(inserted.inserted_id)
 
         return JsonResponse(schedule_data, safe=False, status=201)
 
+def format_schedule(schedule):
+    # ObjectId is encoded by the renderer (app/renderers.py)
+    return schedule
+
+SCHEDULE_FIELDS = FieldSet({
+    "_id": "_id", "class_grade": "class_grade", "subject": "subject",
+    "day": "day", "start_time": "start_time", "end_time": "end_time",
+})
+
 class ListSchedulesView(APIView):
     def get(self, request):
         class_grade = request.query_params.get('class_grade')
@@ -503,11 +807,21 @@ class ListSchedulesView(APIView):
                 return Response({'error': 'Invalid class_grade.'}, status=400)
             query["class_grade"] = class_grade
 
+        try:
+            projection, format_doc = SCHEDULE_FIELDS.resolve(request.query_params, format_schedule)
+        except InvalidFields as e:
+            return Response({'error': str(e)}, status=400)
+
         schedules = get_schedules_collection()
-        schedule_list = list(schedules.find(query))
 
-        for schedule in schedule_list:
-            schedule["_id"] = str(schedule["_id"])
+        if wants_stream(request):
+            return stream_response(request, schedules.find(query, projection), format_doc)
+
+        page = paginated_response(request, schedules, query, format_doc, projection=projection)
+        if page is not None:
+            return page
+
+        schedule_list = [format_doc(schedule) for schedule in schedules.find(query, projection)]
 
         return Response(schedule_list, status=status.HTTP_200_OK)
 
@@ -519,30 +833,49 @@ class AdminDeleteScheduleView(APIView):
                 return HttpResponseBadRequest("❌ Invalid schedule ID format.")
 
             schedules = get_schedules_collection()
-            result = schedules.delete_one({"_id": ObjectId(schedule_id)})
+            deleted = schedules.find_one_and_delete({"_id": ObjectId(schedule_id)}, projection={"class_grade": 1})
 
-            if result.deleted_count > 0:
+            if deleted is not None:
+                bump_version("schedules", deleted.get("class_grade"))
                 return JsonResponse({"message": f"✅ Schedule with ID {schedule_id} deleted successfully."}, status=200)
             else:
                 return JsonResponse({"message": "❌ Schedule not found."}, status=404)
 
         except Exception as e:
-            print("❌ Error in AdminDeleteScheduleView:", str(e))
+            logger.exception("Error in AdminDeleteScheduleView: %s", e)
             return JsonResponse({"error": str(e)}, status=500)
 
 
+#-----diagnostics------
+class AdminSlowQueriesView(APIView):
+    """ Slowest Mongo operation shapes by total time (recorded when settings.SLOW_QUERY_MS > 0) """
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), 100)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        offenders = top_offenders(
+            connect_to_mongo(), limit=max(limit, 1),
+            collection=request.query_params.get("collection"), view=request.query_params.get("view"),
+        )
+        return Response({"threshold_ms": threshold_ms(), "offenders": offenders}, status=status.HTTP_200_OK)
+
+
 
 
 
 #        ---------------------------------STUDENT SIDE----------------------------------------
 
 class StudentLoginView(APIView):
+    authentication_classes = []  # An expired token from a previous session must not block logging in
+
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
 
         # Log the received request data for debugging
-        print(f"Received username: {username}, password: {password}")
 
         # Retrieve the student collection from MongoDB
         students = get_students_collection()
@@ -551,7 +884,7 @@ class StudentLoginView(APIView):
         student = students.find_one({'username': username})
 
         if student:
-            print(f"Found student: {student['username']}")
+            logger.debug("Found student: %s", student["username"])
             # Compare plain text passwords directly
             if password == student['password']:  # Plain text comparison
                 student_data = {
@@ -559,29 +892,61 @@ class StudentLoginView(APIView):
                     'username': student['username'],
                     'class_grade': student['class_grade']
                 }
-                print(f"Login successful for {student['username']}")
+                # Identity travels in the token, so student endpoints don't need to look it up
+                student_data.update(issue_tokens(
+                    STUDENT, student['_id'],
+                    student_id=str(student['_id']),
+                    username=student['username'],
+                    class_grade=student['class_grade'],
+                    name=student.get('name', ''),
+                ))
+                logger.info("Login successful for %s", student["username"])
                 return Response(student_data)
             else:
-                print("Password mismatch")
+                logger.info("Password mismatch for %s", username)
                 return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         else:
-            print(f"Student with username {username} not found")
+            logger.info("Student with username %s not found", username)
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-class StudentProfileView(APIView):
-    VALID_CLASS_GRADES = {
-        "11th": "11th",
-        "12th": "12th",
-        "FY BCom": "FY BCom",
-        "SY BCom": "SY BCom",
-        "TY BCom": "TY BCom",
-        "CA Foundation": "CA Foundation",
-        "CA Intermediate": "CA Intermediate",
-        "CA Final": "CA Final"
+PROFILE_CLASS_GRADES = {
+    "11th": "11th",
+    "12th": "12th",
+    "FY BCom": "FY BCom",
+    "SY BCom": "SY BCom",
+    "TY BCom": "TY BCom",
+    "CA Foundation": "CA Foundation",
+    "CA Intermediate": "CA Intermediate",
+    "CA Final": "CA Final"
+}
+
+def profile_from_claims(claims):
+    """ The profile document rebuilt from a student token, instead of a find_one """
+    return {
+        "_id": claims["student_id"],
+        "name": claims.get("name", ""),
+        "username": claims.get("username", ""),
+        "class_grade": claims.get("class_grade", ""),
+    }
+
+def format_profile(student):
+    raw_grade = student.get("class_grade", "")
+    return {
+        "id": student["_id"],
+        "name": student.get("name", ""),
+        "username": student.get("username", ""),
+        "class_grade": PROFILE_CLASS_GRADES.get(raw_grade, raw_grade),
     }
 
+PROFILE_FIELDS = FieldSet({"id": "_id", "name": "name", "username": "username", "class_grade": "class_grade"})
+
+class StudentProfileView(APIView):
+    VALID_CLASS_GRADES = PROFILE_CLASS_GRADES
+
+    # Versioned per student: AdminDeleteStudentView bumps ("students", student_id)
+    @read_through_cache("student-profile", "students", params=("fields",), class_param="student_id")
     def get(self, request):
-        student_id = request.query_params.get("student_id")
+        student_id = identity_param(request, "student_id")
 
         if not student_id:
             return Response({"error": "Student ID is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -591,30 +956,33 @@ class StudentProfileView(APIView):
         try:
             # Check if the student_id is a valid ObjectId
             student_id = ObjectId(student_id)
-        except Exception as e:
+        except Exception:
             return Response({"error": "Invalid Student ID format"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Try to fetch the student from the database
-        student = students_collection.find_one({"_id": student_id})
+        try:
+            projection, format_doc = PROFILE_FIELDS.resolve(request.query_params, format_profile)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if student:
-            raw_grade = student.get("class_grade", "")
-            class_grade = self.VALID_CLASS_GRADES.get(raw_grade, raw_grade)
+        # Token requests carry every profile field as claims
+        claims = request_claims(request)
+        if claims is not None:
+            return Response(format_doc(profile_from_claims(claims)), status=status.HTTP_200_OK)
 
-            student_data = {
-                "id": str(student["_id"]),
-                "name": student.get("name", ""),
-                "username": student.get("username", ""),
-                "class_grade": class_grade,
-            }
-            return Response(student_data, status=status.HTTP_200_OK)
+        # Try to fetch the student from the database (never the password)
+        student = students_collection.find_one({"_id": student_id}, projection)
+
+        if student:
+            return Response(format_doc(student), status=status.HTTP_200_OK)
 
         return Response({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
 
 class StudentListAssignmentsView(APIView):
+    # student_id is only validated, the result depends on the class alone
+    @read_through_cache("student-assignments", "assignments", params=("fields",), required=("student_id",))
     def get(self, request):
-        student_id = request.query_params.get("student_id")
-        class_grade = request.query_params.get("class_grade")
+        student_id = identity_param(request, "student_id")
+        class_grade = identity_param(request, "class_grade")
 
         if not student_id or not class_grade:
             return Response({"error": "Student ID and class_grade are required."}, status=status.HTTP_400_BAD_REQUEST)
@@ -627,17 +995,25 @@ class StudentListAssignmentsView(APIView):
         if class_grade not in VALID_CLASS_GRADES:
             return Response({"error": "Invalid class_grade format."}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            projection, format_doc = ASSIGNMENT_FIELDS.resolve(request.query_params, format_assignment)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         assignments_collection = get_assignments_collection()
-        assignments = assignments_collection.find({"class_grade": class_grade})
+        assignments = assignments_collection.find({"class_grade": class_grade}, projection)
 
-        assignment_list = []
-        for assignment in assignments:
-            assignment['_id'] = str(assignment['_id'])
-            assignment_list.append(assignment)
+        assignment_list = [format_doc(assignment) for assignment in assignments]
 
         return Response(assignment_list, status=status.HTTP_200_OK)
 
 
+def wants_async_submission(request):
+    """ Async upload when enabled globally or requested with `Prefer: respond-async` """
+    if getattr(settings, "ASYNC_SUBMISSIONS", False):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
 class StudentSubmitAssignmentView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
@@ -666,82 +1042,48 @@ class StudentSubmitAssignmentView(APIView):
         except ValueError:
             return JsonResponse({"error": "Invalid due_date format. Use YYYY-MM-DD."}, status=400)
 
-        # Google Drive integration setup
-        SCOPES = ['https://www.googleapis.com/auth/drive']
-        SERVICE_ACCOUNT_FILE = settings.GOOGLE_DRIVE_CREDENTIALS_FILE
+        if wants_async_submission(request):
+            return self.accept_for_upload(student_name, student_class, assignment_title, due_date, file)
 
         # Retry logic for Google Drive upload
+        storage = get_storage_backend()
         for attempt in range(3):
             try:
-                # Load credentials and build the Google Drive service
-                credentials = service_account.Credentials.from_service_account_file(
-                    SERVICE_ACCOUNT_FILE, scopes=SCOPES
+                file.seek(0)
+                viewable_url, download_url = storage.upload(
+                    io.BytesIO(file.read()), file.name, file.content_type, student_class
                 )
-                drive_service = build('drive', 'v3', credentials=credentials)
-
-                PARENT_FOLDER_ID = "1WAPvWKDfCMLk8reA3qQbROQA5Nlw5FgI"  # Replace with your root folder ID
-
-                # Check if folder exists, if not create it
-                # 1. List all folders to check if folder for the class exists
-                query = f"mimeType = 'application/vnd.google-apps.folder' and name = '{student_class}' and '{PARENT_FOLDER_ID}' in parents"
-                results = drive_service.files().list(q=query, fields="files(id, name)").execute()
-                folders = results.get('files', [])
-
-                if folders:
-                    # If folder exists, get the first matching folder's ID
-                    class_folder = folders[0]['id']
-                else:
-                    # If no folder exists, create a new one
-                    metadata = {
-                        'name': student_class,
-                        'mimeType': 'application/vnd.google-apps.folder',
-                        'parents': [PARENT_FOLDER_ID]
-                    }
-                    folder = drive_service.files().create(body=metadata, fields='id').execute()
-                    class_folder = folder['id']
-
-                # Upload the assignment file to the folder
-                file_stream = io.BytesIO(file.read())
-                media = MediaIoBaseUpload(file_stream, mimetype=file.content_type, resumable=True)
-                metadata = {'name': file.name, 'parents': [class_folder]}
-
-                uploaded_file = drive_service.files().create(
-                    body=metadata, media_body=media,
-                    fields='id,webViewLink,webContentLink'
-                ).execute()
-
-                # Get the file URLs for viewing and downloading
-                viewable_url = uploaded_file.get('webViewLink')
-                download_url = uploaded_file.get('webContentLink')
-
                 break  # Exit loop if successful
 
             except Exception as e:
                 if attempt < 2:
                     time.sleep(2)  # Retry after 2 seconds
                     continue
-                print("❌ Google Drive Upload Error:", e)
+                logger.exception("Google Drive upload error: %s", e)
                 return JsonResponse({"error": "Failed to upload to Google Drive"}, status=500)
 
         # Save the submission in MongoDB
+        submission = {
+            "student_name": student_name,
+            "class_grade": student_class,
+            "assignment_title": assignment_title,
+            "due_date": due_date,
+            "filename": file.name,
+            "file_url": viewable_url,
+            "viewable_url": viewable_url,
+            "download_url": download_url,
+            "content_type": file.content_type,
+            "submitted_at": datetime.datetime.utcnow().isoformat(),
+            "status": "Pending"
+        }
         try:
             submissions = get_submissions_collection()
-            submissions.insert_one({
-                "student_name": student_name,
-                "class_grade": student_class,
-                "assignment_title": assignment_title,
-                "due_date": due_date,
-                "filename": file.name,
-                "file_url": viewable_url,
-                "viewable_url": viewable_url,
-                "download_url": download_url,
-                "content_type": file.content_type,
-                "submitted_at": datetime.datetime.utcnow().isoformat(),
-                "status": "Pending"
-            })
+            submissions.insert_one(submission)
         except Exception as e:
-            print("❌ MongoDB Insert Error:", e)
+            logger.exception("MongoDB insert error: %s", e)
             return JsonResponse({"error": "Failed to save submission"}, status=500)
+        record_insert(connect_to_mongo(), submission)
+        publish(SUBMISSION_CREATED, student_class, submission_event(submission))
 
         # Return success message with the URLs
         return JsonResponse({
@@ -750,12 +1092,51 @@ class StudentSubmitAssignmentView(APIView):
             "download_url": download_url
         }, status=201)
 
+    def accept_for_upload(self, student_name, student_class, assignment_title, due_date, file):
+        """ Async mode: spool the file, record it as "Uploading" and let the worker upload it """
+        submissions = get_submissions_collection()
+        submission = {
+            "student_name": student_name,
+            "class_grade": student_class,
+            "assignment_title": assignment_title,
+            "due_date": due_date,
+            "filename": file.name,
+            "file_url": "",
+            "viewable_url": "",
+            "download_url": "",
+            "content_type": file.content_type,
+            "submitted_at": datetime.datetime.utcnow().isoformat(),
+            "status": UPLOADING
+        }
+        try:
+            inserted = submissions.insert_one(submission)
+        except Exception as e:
+            logger.exception("MongoDB insert error: %s", e)
+            return JsonResponse({"error": "Failed to save submission"}, status=500)
+
+        submission_id = inserted.inserted_id
+        try:
+            spool_submission(submission_id, file, student_class)
+        except OSError as e:
+            logger.exception("Spool error: %s", e)
+            submissions.delete_one({"_id": submission_id})
+            return JsonResponse({"error": "Failed to save submission"}, status=500)
+        record_insert(connect_to_mongo(), submission)  # Only once the job is really queued
+        publish(SUBMISSION_CREATED, student_class, submission_event(submission))
+
+        return JsonResponse({
+            "message": "Assignment received, upload in progress",
+            "submission_id": str(submission_id),
+            "status": UPLOADING
+        }, status=202)
+
 
 #videos
 class StudentListVideosLecturesView(APIView):
+    @read_through_cache("student-lectures", "videos_lectures", params=("subject",))
     def get(self, request):
         subject = request.GET.get("subject")
-        class_grade = request.GET.get("class_grade")
+        class_grade = identity_param(request, "class_grade")
 
         if not class_grade:
             return Response({"error": "class_grade is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -768,58 +1149,14 @@ class StudentListVideosLecturesView(APIView):
             query["subject"] = subject
 
         try:
-            data = list(collection.find(query))
+            # Format the response in Mongo: subject -> chapter -> videos/pdf
+            response = first_or_none(collection.aggregate(student_lecture_tree_pipeline(query), allowDiskUse=True))
         except Exception as e:
             return Response({"error": f"Error fetching data: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if not data:
+        if not response:
             return Response({"message": "No lectures found.", "data": {}}, status=status.HTTP_200_OK)
 
-        # Format the response: subject -> chapter -> videos/pdf
-        response = {}
-
-        for doc in data:
-            subject_name = doc.get("subject", "Unknown Subject")
-            chapter = doc.get("chapter", "Unknown Chapter")
-            videos = doc.get("videos", [])
-
-            if subject_name not in response:
-                response[subject_name] = {}
-
-            if chapter not in response[subject_name]:
-                response[subject_name][chapter] = {
-                    "videos": [],
-                    "pdfs": []
-                }
-
-            for video in videos:
-                video_name = video.get("video_name", "Untitled")
-                video_url = video.get("video_url", "")
-                pdf_url = video.get("pdf_url", "")
-                description = video.get("description", "")
-
-                base_data = {
-                    "_id": str(doc.get("_id")),
-                    "title": video_name,
-                    "description": description
-                }
-
-                if video_url:
-                    response[subject_name][chapter]["videos"].append({
-                        **base_data,
-                        "video_url": video_url,
-                        "pdf_url": "",
-                        "type": "video"
-                    })
-
-                if pdf_url:
-                    response[subject_name][chapter]["pdfs"].append({
-                        **base_data,
-                        "video_url": "",
-                        "pdf_url": pdf_url,
-                        "type": "pdf"
-                    })
-
         return Response({"message": "Lectures fetched successfully", "data": response}, status=status.HTTP_200_OK)
 
 
@@ -856,8 +1193,9 @@ class StudentQueryView(APIView):
         )
 
 class StudentScheduleView(APIView):
+    @read_through_cache("student-schedule", "schedules", params=("fields",))
     def get(self, request):
-        class_grade = request.query_params.get('class_grade')
+        class_grade = identity_param(request, "class_grade")
         schedules = get_schedules_collection()
 
         if not class_grade:
@@ -866,13 +1204,16 @@ class StudentScheduleView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            projection, format_doc = SCHEDULE_FIELDS.resolve(request.query_params, format_schedule)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             # No int() conversion here
             query = {'class_grade': class_grade}
-            schedule_list = list(schedules.find(query))
-
-            for schedule in schedule_list:
-                schedule["_id"] = str(schedule["_id"])
+            cursor = schedules.find(query, projection).sort([("start_minute", 1), ("_id", 1)])  # Week order
+            schedule_list = [format_doc(schedule) for schedule in cursor]
 
             return Response(schedule_list, status=status.HTTP_200_OK)
         except Exception as e:
@@ -880,3 +1221,123 @@ class StudentScheduleView(APIView):
                 {"error": "Failed to fetch schedule.", "details": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+def public_slot(slot, **extra):
+    return {**format_schedule({k: v for k, v in slot.items() if k in SCHEDULE_FIELDS.default}), **extra}
+
+class StudentScheduleNowView(APIView):
+    """
+    The class going on right now and the next one, from the in-memory timetable
+    (app/timetable.py). ?at=YYYY-MM-DDTHH:MM lets the App use the student's local time.
+    """
+
+    def get(self, request):
+        class_grade = identity_param(request, "class_grade")
+        if not class_grade:
+            return Response({"error": "Class grade is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if class_grade not in VALID_CLASS_GRADES:
+            return Response({"error": "Invalid class_grade"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            at = datetime.datetime.fromisoformat(request.query_params["at"]) if request.query_params.get("at") else school_now()
+        except ValueError:
+            return Response({"error": "Invalid 'at', use YYYY-MM-DDTHH:MM"}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_aware(at):
+            at = at.astimezone(school_now().tzinfo)  # The slots are school local time; a naive ?at= already is
+
+        minute = minute_of_week(at)
+        current, upcoming, starts_in = get_timetable(get_schedules_collection(), class_grade).at(minute)
+        return Response({
+            "current": public_slot(current, ends_in_minutes=current["end_minute"] - minute) if current else None,
+            "next": public_slot(upcoming, starts_in_minutes=starts_in) if upcoming else None,
+        }, status=status.HTTP_200_OK)
+
+
+#-----dashboard------
+def dashboard_profile(ctx):
+    if ctx["claims"] is not None:
+        return format_profile(profile_from_claims(ctx["claims"]))
+    student = get_students_collection().find_one(
+        {"_id": ObjectId(ctx["student"])}, PROFILE_FIELDS.projection(PROFILE_FIELDS.default)
+    )
+    if student is None:
+        raise LookupError("Student not found")
+    return format_profile(student)
+
+def dashboard_assignments(ctx):
+    # due_date is stored as YYYY-MM-DD, so string order is date order
+    cursor = get_assignments_collection().find(
+        {"class_grade": ctx["class"], "due_date": {"$gte": ctx["date"]}},
+        ASSIGNMENT_FIELDS.projection(ASSIGNMENT_FIELDS.default),
+    ).sort([("due_date", 1), ("_id", 1)])
+    return [format_assignment(assignment) for assignment in cursor]
+
+def dashboard_schedule(ctx):
+    cursor = get_schedules_collection().find(
+        {"class_grade": ctx["class"], "day": ctx["day"]}, SCHEDULE_FIELDS.projection(SCHEDULE_FIELDS.default),
+    ).sort([("start_time", 1), ("_id", 1)])
+    return [format_schedule(schedule) for schedule in cursor]
+
+def dashboard_lectures(ctx):
+    return list(get_videos_lectures_collection().aggregate(lecture_summary_pipeline({"class": ctx["class"]}), allowDiskUse=True))
+
+DASHBOARD_SECTIONS = {
+    "profile": Section("students", "student", dashboard_profile),
+    "assignments": Section("assignments", "class", dashboard_assignments),  # pending: due today or later
+    "schedule": Section("schedules", "class", dashboard_schedule),  # today's classes
+    "lectures": Section("videos_lectures", "class", dashboard_lectures),  # per-subject counts
+}
+
+class StudentDashboardView(APIView):
+    """
+    Profile, pending assignments, today's schedule and a lecture summary in one response.
+    ?sections=profile,schedule limits the response to those sections; ?date=YYYY-MM-DD
+    lets the App use the student's local date instead of the server's.
+    """
+
+    def get(self, request):
+        student_id = identity_param(request, "student_id")
+        class_grade = identity_param(request, "class_grade")
+
+        if not student_id or not class_grade:
+            return Response({"error": "Student ID and class_grade are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ObjectId.is_valid(student_id):
+            return Response({"error": "Invalid Student ID format"}, status=status.HTTP_400_BAD_REQUEST)
+        if class_grade not in VALID_CLASS_GRADES:
+            return Response({"error": "Invalid class_grade format."}, status=status.HTTP_400_BAD_REQUEST)
+
+        raw_sections = request.query_params.get("sections")
+        names = list(DASHBOARD_SECTIONS)
+        if raw_sections:
+            names = list(dict.fromkeys(name.strip() for name in raw_sections.split(",") if name.strip()))
+            unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+            if unknown or not names:
+                return Response({"error": "Unknown sections: " + ", ".join(unknown) + ". Allowed: " + ", ".join(DASHBOARD_SECTIONS)},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            date = datetime.date.fromisoformat(request.query_params["date"]) if request.query_params.get("date") else school_now().date()
+        except ValueError:
+            return Response({"error": "date must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ctx = {
+            "student": student_id, "class": class_grade, "claims": request_claims(request),
+            "date": date.isoformat(), "day": date.strftime("%A"),
+        }
+        # Only the date changes what a section holds (besides the data versions)
+        data, errors, etag = load_sections(DASHBOARD_SECTIONS, names, ctx, {"date": ctx["date"]})
+
+        if etag and not errors:
+            matched = etag_matches(request, etag)
+            if matched:
+                return with_etag(HttpResponseNotModified(), matched)
+
+        meta = {"date": ctx["date"], "day": ctx["day"]}
+        if errors:
+            meta["errors"] = errors
+        response = HttpResponse(render_dashboard(meta, {name: data[name] for name in names if name in data}),
+                                content_type="application/json")
+        if etag and not errors:
+            with_etag(response, etag)
+        return response
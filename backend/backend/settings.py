@@ -16,6 +16,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # ✅ This correctly finds the credentials.json in root folder
 GOOGLE_DRIVE_CREDENTIALS_FILE = '/etc/secrets/credentials.json'
+# Seconds a class -> Drive folder ID mapping is trusted before it is looked up again
+DRIVE_FOLDER_CACHE_TTL = int(os.environ.get("DRIVE_FOLDER_CACHE_TTL", 3600))
+
+# Assignment uploads: "drive" (Google Drive) or "fake" (local directory, for offline dev)
+SUBMISSION_STORAGE = os.environ.get("SUBMISSION_STORAGE", "drive")
+FAKE_DRIVE_ROOT = os.environ.get("FAKE_DRIVE_ROOT", str(BASE_DIR / "fake_drive"))
+
+# When True, submissions are spooled and answered with 202; `manage.py run_submission_worker`
+# uploads them. Clients can also opt in per request with `Prefer: respond-async`.
+ASYNC_SUBMISSIONS = os.environ.get("ASYNC_SUBMISSIONS", "False") == "True"
+SUBMISSION_SPOOL_DIR = os.environ.get("SUBMISSION_SPOOL_DIR", str(BASE_DIR / "submission_spool"))
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -46,7 +57,9 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'app.instrumentation.MetricsMiddleware',  # Outermost: times the whole stack (see GET /metrics)
     'corsheaders.middleware.CorsMiddleware',
+    'app.compression.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -107,16 +120,91 @@ CORS_ALLOW_CREDENTIALS = True  # Important for CSRF & Cookies
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'app.authentication.ClaimsJWTAuthentication',  # Login tokens, resolved from claims without a DB lookup
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # ✅ Allow access to public APIs
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.MongoJSONRenderer',  # ObjectId / datetime aware, orjson when installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'app.renderers.NDJSONRenderer',  # Accept: application/x-ndjson streams list endpoints
+    ],
 }
 
 
+# MongoDB / Redis connection pools (per worker process, see app/db.py)
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 2))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 2))
+
+# List endpoints: keyset pagination via ?limit=&cursor=
+# Keep True until the admin and mobile apps send `limit`, so old clients still get plain lists
+LEGACY_LIST_RESPONSES = os.environ.get("LEGACY_LIST_RESPONSES", "True") == "True"
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 500))
+# ?stream=1 or Accept: application/x-ndjson; documents fetched per cursor batch (override with ?batch_size=)
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 500))
+
+# Redis read-through cache for student endpoints (seconds); entries are also
+# invalidated immediately by per-class version counters bumped on writes
+READ_CACHE_TTL = int(os.environ.get("READ_CACHE_TTL", 300))
+
+# gzip (and brotli, if the `brotli` package is installed) for API responses of at
+# least this many bytes; cached responses keep their compressed bytes in Redis
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# Threads per worker process that load the sections of GET /api/student/dashboard/ concurrently
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", 4))
+
+# Where the school is: "today" on the dashboard and "now" for the timetable are its
+# local date/time. TIME_ZONE stays UTC for stored datetimes.
+SCHOOL_TIME_ZONE = os.environ.get("SCHOOL_TIME_ZONE", "Asia/Kolkata")
+
+# Live submission feed (GET /api/admin/submissions/events/, Server-Sent Events, app/events.py).
+# The last SUBMISSION_EVENTS_MAXLEN events are kept in Redis for Last-Event-ID resume.
+# A feed is closed after SSE_MAX_SECONDS (the browser reconnects and resumes) and sends a
+# keepalive comment every SSE_HEARTBEAT_SECONDS. Under WSGI every open feed holds a worker
+# thread, so use threaded workers or run under ASGI, where a feed is just a coroutine.
+SUBMISSION_EVENTS_MAXLEN = int(os.environ.get("SUBMISSION_EVENTS_MAXLEN", 1000))
+SSE_MAX_SECONDS = int(os.environ.get("SSE_MAX_SECONDS", 300))
+SSE_HEARTBEAT_SECONDS = int(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 2000))
+
+# GET /metrics (Prometheus text format). Scrapers must send
+# `Authorization: Bearer <METRICS_TOKEN>`; while it is empty the endpoint answers
+# 403, unless DEBUG is on.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Slow-query log (app/slow_queries.py): find/aggregate/update/delete slower than
+# SLOW_QUERY_MS go to the capped `slow_queries` collection (0 disables it). With
+# SLOW_QUERY_EXPLAIN (on by default) each shape is also explained for the docs
+# examined vs returned, off the request path and at most once per interval (seconds).
+SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", 500))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "True") == "True"
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 600))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get("SLOW_QUERY_LOG_BYTES", 16 * 1024 * 1024))
+
+# The app modules log through logging.getLogger(__name__) ("app.cache", "app.events", ...)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"plain": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"}},
+    "handlers": {"console": {"class": "logging.StreamHandler", "formatter": "plain"}},
+    "loggers": {"app": {"handlers": ["console"], "level": os.environ.get("APP_LOG_LEVEL", "INFO")}},
+}
+
+# Serve the student read endpoints (profile, assignments, schedule, lectures) with
+# the async views in app/async_views.py. Only enable when running under ASGI
+# (e.g. `uvicorn backend.asgi:application`); WSGI workers should keep the sync views.
+ASYNC_STUDENT_READS = os.environ.get("ASYNC_STUDENT_READS", "False") == "True"
 
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -19,6 +19,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
 
+from app.instrumentation import metrics_view
+
 def home(request):
     return JsonResponse({"message": "🎓 Student API is running!"})
 
@@ -26,4 +28,5 @@ urlpatterns = [
     path('', home),  # Handles root `/`
     path('admin/', admin.site.urls),
     path('api/', include('app.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape target
 ]
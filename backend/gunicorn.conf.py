@@ -0,0 +1,9 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn backend.wsgi` when started from this directory.
+
+
+def post_worker_init(worker):
+    # Each worker builds its own Mongo client / Redis pool after the fork and
+    # connects before accepting requests, so the first request is not slow.
+    from app.db import warm_up
+    warm_up()